@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+OAuth credential manager against a local fake OAuth server.
+
+Starts a token endpoint on localhost speaking Google's refresh_token grant
+with --latency-ms of artificial delay, and counts the requests it serves.
+Credentials are stored on in-memory storage, so nothing else is needed.
+
+Reports how long a stampede of --concurrency callers on an expired token
+takes and how many provider requests it causes, then the cost of a cached
+lookup. Correctness (single flight, expiry, prefetch, encryption, upstream
+errors) is covered by tests/test_credentials.py.
+
+Usage (from backend/):
+    python benchmarks/credential_refresh_bench.py --concurrency 1000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cryptography.fernet import Fernet
+
+from services.credentials import CredentialManager, OAuthProvider, TokenCipher
+from storage.memory import MemoryClient
+
+
+class FakeOAuthServer:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                server.requests += 1
+                time.sleep(server.latency)
+                body = {"access_token": f"token-{server.requests}", "expires_in": 3600}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._respond()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/token"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+async def main(args):
+    fake = FakeOAuthServer(args.latency_ms / 1000)
+    providers = {"google": OAuthProvider("google", fake.url, "id", "secret", "refresh_token")}
+    cipher = TokenCipher(Fernet.generate_key().decode())
+    db = MemoryClient()["credentials_bench"]
+    manager = CredentialManager(db, providers, cipher)
+    await manager.ensure_indexes()
+    await db.user_credentials.insert_one(
+        {"user_id": "u1", "provider": "google", "access_token": "stale", "refresh_token": "r1",
+         "expires_at": datetime.utcnow() - timedelta(minutes=5)}
+    )
+
+    start = time.perf_counter()
+    tokens = await asyncio.gather(*(manager.get_access_token("u1", "google") for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    print(f"stampede: {args.concurrency} callers, {fake.requests} provider requests, "
+          f"{len(set(tokens))} distinct tokens, {elapsed * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    for _ in range(args.lookups):
+        await manager.get_access_token("u1", "google")
+    per_lookup = (time.perf_counter() - start) / args.lookups * 1e6
+    print(f"cached lookup: {per_lookup:.2f} us")
+
+    print()
+    print(json.dumps(manager.metrics.snapshot(), indent=2))
+    fake.httpd.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    asyncio.run(main(parser.parse_args()))
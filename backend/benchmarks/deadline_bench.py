@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tail latency under injected Mongo latency, with and without deadlines.
+
+Drives an app whose handler makes one Mongo call. Most calls are fast, but
+--slow-fraction of them stall for --slow-ms. The same load runs against the
+bare app and then against the app wrapped in DeadlineMiddleware. With the
+middleware, stalled calls are cut off at the route budget (504), overload is
+shed early (503), and p99 stays near the budget instead of near --slow-ms.
+
+By default the Mongo call is simulated and honours the request deadline the
+way maxTimeMS does. With --mongo the handler queries a real server, and
+latency is injected server-side with a $where sleep, so the real maxTimeMS
+path is exercised. Needs MONGO_URL.
+
+Usage (from backend/):
+    python benchmarks/deadline_bench.py --requests 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+from fastapi import FastAPI
+from pymongo.errors import ExecutionTimeout, PyMongoError
+
+import utils.deadline as deadline_module
+from utils.deadline import DeadlineMiddleware, database_error_handler
+
+
+def make_app(args, with_deadlines: bool, collection=None) -> object:
+    app = FastAPI()
+    app.add_exception_handler(PyMongoError, database_error_handler)
+
+    async def simulated_call(latency: float) -> None:
+        # What maxTimeMS does server-side: give up once the budget is gone
+        left = deadline_module.remaining()
+        if left is not None and latency > left:
+            await asyncio.sleep(max(left, 0))
+            raise ExecutionTimeout("operation exceeded time limit", 50)
+        await asyncio.sleep(latency)
+
+    async def mongo_call(latency: float) -> None:
+        sleep_ms = int(latency * 1000)
+        await collection.find_one({"$where": f"sleep({sleep_ms}) || true"})
+
+    @app.get("/api/item")
+    async def item():
+        slow = random.random() < args.slow_fraction
+        latency = (args.slow_ms if slow else args.fast_ms) / 1000
+        await (mongo_call if collection is not None else simulated_call)(latency)
+        return {"ok": True}
+
+    if with_deadlines:
+        deadline_module.ROUTE_DEADLINES_MS["/api/item"] = args.budget_ms
+        return DeadlineMiddleware(app, max_in_flight=args.max_in_flight)
+    return app
+
+
+async def run_load(app, args) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies, statuses = [], {}
+    pending = iter(range(args.requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def user():
+            for _ in pending:
+                start = time.perf_counter()
+                response = await client.get("/api/item")
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        await asyncio.gather(*(user() for _ in range(args.concurrency)))
+
+    latencies.sort()
+    pick = lambda pct: latencies[min(len(latencies) - 1, int(len(latencies) * pct))]
+    return {"p50": pick(0.5), "p99": pick(0.99), "max": latencies[-1], "statuses": statuses}
+
+
+async def main(args):
+    collection = None
+    if args.mongo:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+        collection = client[args.db].latency_probe
+        await collection.delete_many({})
+        await collection.insert_one({"probe": True})
+
+    print(f"{'mode':<16} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+    for label, with_deadlines in (("no deadlines", False), ("deadlines", True)):
+        result = await run_load(make_app(args, with_deadlines, collection), args)
+        print(
+            f"{label:<16} {result['p50']:>8.1f} {result['p99']:>8.1f} {result['max']:>8.1f}  "
+            f"{dict(sorted(result['statuses'].items()))}"
+        )
+
+    if collection is not None:
+        await collection.database.client.drop_database(args.db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--fast-ms", type=float, default=5)
+    parser.add_argument("--slow-ms", type=float, default=3000)
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--budget-ms", type=int, default=250)
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--mongo", action="store_true", help="inject latency on a real mongod")
+    parser.add_argument("--db", default="crm_bench_deadlines")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Lead scoring throughput per core.
+
+Generates synthetic leads with touchpoint and comment activity, then times
+the CPU part of a scoring run: feature extraction, model scoring and
+feature hashing, batch by batch as LeadScorer does. BLAS is pinned to one
+thread so the result is leads per second per core. Mongo reads and writes
+are not included.
+
+Usage (from backend/):
+    python benchmarks/lead_scoring_bench.py --leads 200000 --batch-size 5000
+"""
+
+import os
+
+# Before NumPy loads, so matrix products stay on one core
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from services.lead_scoring import (
+    DEFAULT_RULE_WEIGHTS, FEATURES, MAX_RECENCY_DAYS, ActivityStats, LogisticModel,
+    WeightedRulesModel, build_features, feature_hashes
+)
+
+
+def make_leads(count: int, now: datetime) -> list:
+    rng = random.Random(7)
+    sources = ["google_ads", "referral", "organic", "facebook_ads", "partner", None]
+    domains = ["gmail.com", "acme.io", "label.fm", "yahoo.com", "studio.co"]
+    return [
+        {
+            "id": f"lead-{i}",
+            "status": rng.choice(["New", "New", "Qualified", "Won"]),
+            "source": rng.choice(sources),
+            "email": f"user{i}@{rng.choice(domains)}",
+            "phone": "555-0100" if rng.random() < 0.4 else None,
+            "created_at": now - timedelta(days=rng.randint(0, 700)),
+        }
+        for i in range(count)
+    ]
+
+
+def make_activity(size: int, rng: np.random.Generator) -> ActivityStats:
+    stats = ActivityStats(size)
+    stats.total[:] = rng.poisson(4, size)
+    stats.recent[:] = np.minimum(stats.total, rng.poisson(1, size))
+    stats.days_since_last[:] = np.where(stats.total > 0, rng.integers(0, 365, size), MAX_RECENCY_DAYS)
+    return stats
+
+
+def main(args):
+    now = datetime.utcnow()
+    leads = make_leads(args.leads, now)
+    rng = np.random.default_rng(7)
+    batches = []
+    for i in range(0, len(leads), args.batch_size):
+        batch = leads[i:i + args.batch_size]
+        batches.append((batch, make_activity(len(batch), rng), make_activity(len(batch), rng)))
+
+    models = [
+        WeightedRulesModel(DEFAULT_RULE_WEIGHTS),
+        LogisticModel({name: rng.normal() for name in FEATURES}, -1.0),
+    ]
+    print(f"{args.leads} leads, batches of {args.batch_size}, 1 thread")
+    print(f"{'model':<10} {'features':>10} {'score':>10} {'hash':>10} {'leads/s':>12}")
+    for model in models:
+        timings = {"features": 0.0, "score": 0.0, "hash": 0.0}
+        for batch, touchpoints, comments in batches:
+            start = time.perf_counter()
+            X = build_features(batch, touchpoints, comments, now)
+            built = time.perf_counter()
+            model.score(X)
+            scored = time.perf_counter()
+            feature_hashes(X)
+            timings["features"] += built - start
+            timings["score"] += scored - built
+            timings["hash"] += time.perf_counter() - scored
+        total = sum(timings.values())
+        print(
+            f"{model.name:<10} {timings['features']:>9.3f}s {timings['score']:>9.3f}s "
+            f"{timings['hash']:>9.3f}s {args.leads / total:>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--leads", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    main(parser.parse_args())
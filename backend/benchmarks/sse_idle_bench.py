@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Idle SSE connection cost, measured over real HTTP connections.
+
+Starts the app under uvicorn in a child process with in-memory storage,
+registers one user per tenant, then opens N /api/events streams with httpx
+and holds them idle. Reports the server's resident memory per open
+connection (StreamingResponse task group, disconnect listener, ASGI and HTTP
+buffers and the auth dependency all included), the time to fan one lead
+comment out to a tenant's streams, and how long one heartbeat sweep takes to
+reach every stream.
+
+Linux only: server memory is read from /proc/<pid>/status. Both processes
+raise their open-file limit to the hard limit, which must exceed N.
+
+Usage (from backend/):
+    python benchmarks/sse_idle_bench.py --connections 10000 --tenants 30
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+OPEN_BATCH = 500
+# httpx scans its pool on every request, so streams are spread over many small clients
+STREAMS_PER_CLIENT = 100
+
+
+def raise_file_limit() -> None:
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    raise RuntimeError("VmRSS not reported")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, heartbeat: float) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "STORAGE_BACKEND": "memory",
+        "DB_NAME": "sse_bench",
+        "EVENTS_HEARTBEAT_SECONDS": str(heartbeat),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", "--backlog", "4096"],
+        cwd=BACKEND_DIR, env=env, preexec_fn=raise_file_limit
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen) -> None:
+    for _ in range(200):
+        if server.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            await client.get("/openapi.json")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def register(client: httpx.AsyncClient, tenant: int) -> str:
+    credentials = {"email": f"sse-bench-{tenant}@example.com", "password": "bench-secret"}
+    response = await client.post("/api/auth/register", json=credentials)
+    response.raise_for_status()
+    response = await client.post("/api/auth/login", json=credentials)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+class Stream:
+    """One held-open /api/events connection counting the frames it receives"""
+
+    def __init__(self, token: str, lead_id: str = None):
+        self.params = {"access_token": token}
+        if lead_id:
+            self.params["lead_id"] = lead_id
+        self.opened = asyncio.Event()
+        self.events = 0
+        self.pings = 0
+        self.last_frame_at = 0.0
+
+    async def run(self, client: httpx.AsyncClient) -> None:
+        async with client.stream("GET", "/api/events", params=self.params) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_raw():
+                self.last_frame_at = time.perf_counter()
+                self.opened.set()
+                self.events += chunk.count(b"\nevent: ")
+                self.pings += chunk.count(b": ping")
+
+
+async def wait_for(condition, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise RuntimeError("timed out waiting for streams")
+        await asyncio.sleep(0.005)
+
+
+async def main(args):
+    raise_file_limit()
+    port = free_port()
+    server = start_server(port, args.heartbeat)
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(30, read=None)
+    stream_clients = [
+        httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout)
+        for _ in range(-(-args.connections // STREAMS_PER_CLIENT))
+    ]
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+            await wait_ready(client, server)
+            tokens = [await register(client, tenant) for tenant in range(args.tenants)]
+
+            # Warm the server (imports, caches, allocator) before the baseline
+            warm = [Stream(token) for token in tokens]
+            tasks = [asyncio.create_task(stream.run(client)) for stream in warm]
+            await asyncio.gather(*(stream.opened.wait() for stream in warm))
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.sleep(0.5)
+            before = rss_kib(server.pid)
+
+            streams, tasks = [], []
+            start = time.perf_counter()
+            for i in range(args.connections):
+                # Every fourth stream follows a single lead, the rest the whole tenant
+                stream = Stream(tokens[i % args.tenants], f"lead-{i % 50}" if i % 4 == 0 else None)
+                streams.append(stream)
+                tasks.append(asyncio.create_task(stream.run(stream_clients[i // STREAMS_PER_CLIENT])))
+                if len(tasks) % OPEN_BATCH == 0:
+                    await asyncio.gather(*(s.opened.wait() for s in streams[-OPEN_BATCH:]))
+            await asyncio.gather(*(stream.opened.wait() for stream in streams))
+            opened_in = time.perf_counter() - start
+            await asyncio.sleep(1)
+            after = rss_kib(server.pid)
+
+            print(f"open connections:        {len(streams)} over {args.tenants} tenants in {opened_in:.1f} s")
+            print(f"server RSS:              {before / 1024:.1f} MiB idle -> {after / 1024:.1f} MiB held open")
+            print(f"memory per connection:   {(after - before) / len(streams):.2f} KiB (server side, end to end)")
+
+            tenant_wide = [s for i, s in enumerate(streams) if i % args.tenants == 0 and s.params.get("lead_id") is None]
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/leads/lead-unmatched/comments", json={"content": "bench"},
+                headers={"Authorization": f"Bearer {tokens[0]}"}
+            )
+            response.raise_for_status()
+            await wait_for(lambda: all(s.events for s in tenant_wide), 60)
+            print(f"fanout to one tenant:    {(time.perf_counter() - start) * 1000:.1f} ms for {len(tenant_wide)} streams")
+
+            await wait_for(lambda: all(s.pings for s in streams), args.heartbeat + 60)
+            first = min(s.last_frame_at for s in streams)
+            last = max(s.last_frame_at for s in streams)
+            print(f"heartbeat sweep:         {(last - first) * 1000:.1f} ms from first to last of {len(streams)} pings")
+
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for stream_client in stream_clients:
+            await stream_client.aclose()
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--tenants", type=int, default=30)
+    parser.add_argument("--heartbeat", type=float, default=10, help="server heartbeat interval in seconds")
+    asyncio.run(main(parser.parse_args()))
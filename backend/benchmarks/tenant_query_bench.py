@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Per-tenant query latency vs. total tenant count.
+
+Seeds a scratch collection with a fixed number of leads per tenant, grows the
+tenant count step by step and times TenantRepository queries for a random
+tenant at each step. With tenant-prefixed indexes the p50/p99 columns should
+stay flat while the collection grows by orders of magnitude.
+
+Usage (from backend/):
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/tenant_query_bench.py
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from services.tenant_repository import TenantRepository, ensure_tenant_indexes
+
+STATUSES = ["New", "Qualified", "Won"]
+
+
+def make_leads(tenant_id: str, count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "tenant_id": tenant_id,
+            "status": random.choice(STATUSES),
+            "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 90)),
+        }
+        for _ in range(count)
+    ]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def time_queries(db, tenants: list, queries: int) -> list:
+    samples = []
+    for _ in range(queries):
+        repo = TenantRepository(db, "leads", random.choice(tenants))
+        start = time.perf_counter()
+        await repo.find({"status": "Qualified"}).sort("created_at", -1).to_list(50)
+        await repo.count_documents({"status": "New"})
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main(args):
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client[args.db]
+    await db.leads.drop()
+    await ensure_tenant_indexes(db)
+
+    tenants = []
+    print(f"{'tenants':>8} {'documents':>10} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for target in args.steps:
+        while len(tenants) < target:
+            tenant_id = str(uuid.uuid4())
+            tenants.append(tenant_id)
+            await db.leads.insert_many(make_leads(tenant_id, args.leads_per_tenant))
+        samples = await time_queries(db, tenants, args.queries)
+        print(
+            f"{len(tenants):>8} {len(tenants) * args.leads_per_tenant:>10} "
+            f"{percentile(samples, 0.5):>8.2f} {percentile(samples, 0.99):>8.2f} "
+            f"{statistics.mean(samples):>8.2f}"
+        )
+
+    await client.drop_database(args.db)
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default="crm_bench_tenants")
+    parser.add_argument("--leads-per-tenant", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List
+from datetime import datetime
+
+from utils.profiling import PROFILE_MAX_SECONDS
+
+class AdminStats(BaseModel):
+    total_users: int
+    total_admins: int
+    total_clients: int
+    active_clients: int
+    suspended_clients: int
+    total_subusers: int
+    active_subusers: int
+    suspended_subusers: int
+    active_users: int
+    suspended_users: int
+    logins_last_24h: int
+    logins_last_7d: int
+    new_users_last_7d: int
+    generated_at: datetime
+
+class ArchiveQueryResult(BaseModel):
+    dataset: str
+    start: datetime
+    end: datetime
+    hot_cutoff: datetime
+    rows: List[Dict[str, Any]]
+
+class ProfileStart(BaseModel):
+    seconds: float = Field(30, gt=0, le=PROFILE_MAX_SECONDS)
+    sample_rate: float = Field(1.0, gt=0, le=1)
+    stacks: bool = True
+
+class ProfileStatus(BaseModel):
+    active: bool
+    seconds_left: float
+    sample_rate: float
+    traces: int
+    stack_samples: int
+    sampling_stacks: bool
+    routes: List[Dict[str, Any]] = []
@@ -0,0 +1,54 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Any
+from datetime import datetime
+import uuid
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str
+    payload: dict = Field(default_factory=dict)
+    status: str = Field(default=JobStatus.QUEUED)
+    priority: int = Field(default=0)  # higher runs first
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    lease_expires_at: Optional[datetime] = None
+    locked_by: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    result: Optional[Any] = None
+    tenant_id: Optional[str] = None
+    created_by: Optional[str] = None
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    result: Optional[Any] = None
+
+class QueueMetrics(BaseModel):
+    depth: dict  # status -> count
+    ready: int
+    oldest_ready_age_seconds: Optional[float] = None
+    wait_ms_p50: Optional[float] = None
+    wait_ms_p95: Optional[float] = None
+    run_ms_p50: Optional[float] = None
+    run_ms_p95: Optional[float] = None
+    sampled_jobs: int = 0
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+import uuid
+
+class LeadComment(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    lead_ref: str
+    content: str
+    author_id: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class LeadCommentCreate(BaseModel):
+    content: str = Field(min_length=1, max_length=5000)
+
+class LeadScore(BaseModel):
+    lead_ref: str
+    score: float
+    model: str
+    scored_at: datetime
+    name: Optional[str] = None
+    email: Optional[str] = None
+    status: Optional[str] = None
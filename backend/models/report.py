@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import date, datetime
+
+class ReportInfo(BaseModel):
+    name: str
+    title: str
+
+class ReportResult(BaseModel):
+    name: str
+    title: str
+    start: date
+    end: date
+    rows: List[dict]
+    totals: dict
+    computed_at: datetime
+    cached: bool = False
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import datetime
+import uuid
+
+class StatusCheck(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    client_name: str
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+class StatusCheckCreate(BaseModel):
+    client_name: str
+
+class StatusResolution:
+    RAW = "raw"
+    MINUTE = "minute"
+    HOUR = "hour"
+
+class StatusPoint(BaseModel):
+    client_name: str
+    timestamp: datetime
+    count: int
+
+class StatusSeries(BaseModel):
+    resolution: str
+    start: datetime
+    end: datetime
+    points: List[StatusPoint]
@@ -29,6 +29,7 @@ class User(BaseModel):
     
     # Subuser-specific fields (if role is subuser)
     parent_client_id: Optional[str] = None
+    role_name: Optional[str] = None
     permissions: Optional[dict] = Field(default_factory=dict)
 
 class UserCreate(BaseModel):
@@ -56,6 +57,7 @@ class UserResponse(BaseModel):
     company: Optional[str] = None
     phone: Optional[str] = None
     client_settings: Optional[dict] = None
+    role_name: Optional[str] = None
     permissions: Optional[dict] = None
 
 class UserUpdate(BaseModel):
@@ -64,6 +66,7 @@ class UserUpdate(BaseModel):
     company: Optional[str] = None
     phone: Optional[str] = None
     client_settings: Optional[dict] = None
+    role_name: Optional[str] = None
     permissions: Optional[dict] = None
 
 class Token(BaseModel):
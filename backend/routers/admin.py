@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import PlainTextResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.admin import AdminStats, ArchiveQueryResult, ProfileStart, ProfileStatus
+from routers.auth import require_admin
+from services.admin_stats import AdminStatsService
+from services.archive import ArchiveService
+from services.credentials import get_credential_manager
+from services.user_cache import CachedUser
+from utils.profiling import profiler
+from dependencies import get_database
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/stats", response_model=AdminStats)
+async def get_admin_stats(
+    _: CachedUser = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """User totals for the admin dashboard (cached for a few seconds)"""
+    return await AdminStatsService(db).get()
+
+@router.get("/credentials/metrics")
+async def get_credential_metrics(
+    _: CachedUser = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """OAuth token cache hit rate and provider refresh latency for this process"""
+    return get_credential_manager(db).metrics.snapshot()
+
+@router.get("/archive/{dataset}", response_model=ArchiveQueryResult)
+async def query_archive(
+    dataset: str,
+    request: Request,
+    start: datetime,
+    end: datetime,
+    limit: int = Query(1000, ge=1, le=10000),
+    _: CachedUser = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Audit log or status check rows over a range, reading cold archives where needed.
+
+    Extra query parameters (e.g. ``client_name``) are equality filters.
+    """
+    service = ArchiveService(db)
+    filters = {
+        key: value for key, value in request.query_params.items()
+        if key not in ("start", "end", "limit")
+    }
+    # Stored times are naive UTC
+    start, end = (v.astimezone(timezone.utc).replace(tzinfo=None) if v.tzinfo else v for v in (start, end))
+    rows = await service.query(dataset, start, end, filters, limit)
+    return ArchiveQueryResult(
+        dataset=dataset,
+        start=start,
+        end=end,
+        hot_cutoff=service.hot_cutoff(service.get_dataset(dataset)),
+        rows=rows
+    )
+
+@router.post("/profile", response_model=ProfileStatus)
+async def start_profiling(
+    options: ProfileStart,
+    _: CachedUser = Depends(require_admin)
+):
+    """Trace a fraction of requests, and optionally sample stacks, for a while"""
+    profiler.start(options.seconds, options.sample_rate, options.stacks)
+    return ProfileStatus(**profiler.status())
+
+@router.get("/profile", response_model=ProfileStatus)
+async def get_profiling_status(_: CachedUser = Depends(require_admin)):
+    """Session state and the mean span breakdown per traced route"""
+    return ProfileStatus(**profiler.status(), routes=profiler.summary())
+
+@router.delete("/profile", response_model=ProfileStatus)
+async def stop_profiling(_: CachedUser = Depends(require_admin)):
+    profiler.stop()
+    return ProfileStatus(**profiler.status())
+
+@router.get("/profile/traces")
+async def get_profile_traces(
+    limit: int = Query(100, ge=1, le=500),
+    _: CachedUser = Depends(require_admin)
+):
+    """Most recent traced requests, newest first"""
+    return list(profiler.traces)[::-1][:limit]
+
+@router.get("/profile/flamegraph", response_class=PlainTextResponse)
+async def get_flamegraph(
+    source: str = Query("stacks", pattern="^(stacks|spans)$"),
+    _: CachedUser = Depends(require_admin)
+):
+    """Collapsed stacks for flamegraph.pl or speedscope.
+
+    ``stacks`` are sampled event-loop stacks (sample counts); ``spans`` are
+    traced request time per route and category (microseconds).
+    """
+    if source == "spans":
+        return profiler.span_stacks()
+    return profiler.sampler.collapsed()
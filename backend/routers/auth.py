@@ -1,25 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
-from models.user import UserLogin, UserCreate, UserResponse, Token
+from models.user import UserLogin, UserCreate, UserResponse, UserRole, Token
 from services.auth_service import AuthService
+from services.permissions import permission_bit
+from services.tenant_repository import TenantRepository
+from services.user_cache import CachedUser
 from utils.auth import AuthUtils
+from utils.etag import etag_matches, not_modified
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # Import database dependency
 from dependencies import get_database
 
-# Dependency to get current user from JWT token
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncIOMotorDatabase = Depends(get_database)
-) -> UserResponse:
-    """Get current authenticated user from JWT token"""
-    token = credentials.credentials
-    
+async def _principal_from_token(token: str, db: AsyncIOMotorDatabase) -> CachedUser:
+    """Resolve a JWT to the cached principal"""
     # Verify token and get payload
     payload = AuthUtils.verify_token(token)
     user_id = payload.get("sub")
@@ -30,17 +30,89 @@ async def get_current_user(
             detail="Invalid authentication credentials"
         )
     
-    # Get user from database
+    # Get user from cache, falling back to the database
     auth_service = AuthService(db)
-    user = await auth_service.get_user_by_id(user_id)
+    principal = await auth_service.get_cached_user(user_id)
     
-    if not user:
+    if not principal:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    return UserResponse(**user.dict())
+    return principal
+
+# Dependency to get the cached principal from JWT token
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> CachedUser:
+    """Get current authenticated user cache entry from JWT token"""
+    return await _principal_from_token(credentials.credentials, db)
+
+# Dependency for EventSource streams, which cannot send an Authorization header
+async def get_stream_principal(
+    access_token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> CachedUser:
+    """Get current user from the bearer header or an access_token query parameter"""
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await _principal_from_token(token, db)
+
+# Dependency to get current user from JWT token
+async def get_current_user(principal: CachedUser = Depends(get_current_principal)) -> UserResponse:
+    """Get current authenticated user from JWT token"""
+    return principal.response
+
+def require(permission: str):
+    """Dependency factory guarding a route with a "module:action" permission"""
+    bit = permission_bit(permission)
+
+    async def check_permission(principal: CachedUser = Depends(get_current_principal)) -> CachedUser:
+        if not principal.permissions & bit:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Missing permission: {permission}"
+            )
+        return principal
+
+    return check_permission
+
+async def require_admin(principal: CachedUser = Depends(get_current_principal)) -> CachedUser:
+    """Dependency restricting a route to platform admins"""
+    if principal.user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return principal
+
+def tenant_repository(collection: str):
+    """Dependency factory for a repository scoped to the caller's tenant"""
+    async def get_repository(
+        principal: CachedUser = Depends(get_current_principal),
+        db: AsyncIOMotorDatabase = Depends(get_database)
+    ) -> TenantRepository:
+        return TenantRepository(db, collection, principal.tenant_id)
+
+    return get_repository
+
+def _conditional_user_response(request: Request, principal: CachedUser) -> Response:
+    """304 when the client's ETag is current, otherwise the cached JSON body"""
+    if etag_matches(request, principal.etag):
+        return not_modified(principal.etag)
+    return Response(
+        content=principal.body,
+        media_type="application/json",
+        headers={"ETag": principal.etag, "Cache-Control": "private, no-cache"}
+    )
 
 @router.post("/login", response_model=Token)
 async def login(
@@ -61,14 +133,14 @@ async def register(
     return await auth_service.create_user(user_data)
 
 @router.get("/profile", response_model=UserResponse)
-async def get_profile(current_user: UserResponse = Depends(get_current_user)):
+async def get_profile(request: Request, principal: CachedUser = Depends(get_current_principal)):
     """Get current user profile"""
-    return current_user
+    return _conditional_user_response(request, principal)
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: UserResponse = Depends(get_current_user)):
+async def get_me(request: Request, principal: CachedUser = Depends(get_current_principal)):
     """Get current user info (alias for profile)"""
-    return current_user
+    return _conditional_user_response(request, principal)
 
 @router.post("/create-admin", response_model=UserResponse)
 async def create_admin(db: AsyncIOMotorDatabase = Depends(get_database)):
@@ -0,0 +1,41 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from routers.auth import get_stream_principal
+from services.events import event_bus
+from services.permissions import permission_bit
+from services.user_cache import CachedUser
+
+router = APIRouter(tags=["events"])
+
+LEADS_READ = permission_bit("leads:read")
+
+@router.get("/events")
+async def stream_events(
+    lead_id: Optional[List[str]] = Query(default=None),
+    last_event_id: Optional[str] = Header(default=None),
+    principal: CachedUser = Depends(get_stream_principal)
+):
+    """Server-sent events for the caller's tenant, optionally only for some leads.
+
+    Reconnecting clients send Last-Event-ID (EventSource does this itself) and
+    receive what they missed, or a ``reset`` event if it is no longer buffered.
+    """
+    if not principal.tenant_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Tenant scope required"
+        )
+    if not principal.permissions & LEADS_READ:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Missing permission: leads:read"
+        )
+
+    subscriber = event_bus.subscribe(principal.tenant_id, lead_id)
+    return StreamingResponse(
+        event_bus.stream(subscriber, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
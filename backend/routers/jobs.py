@@ -0,0 +1,46 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.job import JobResponse, QueueMetrics
+from models.user import UserRole
+from routers.auth import get_current_principal, require_admin
+from services.job_queue import JobQueue
+from services.user_cache import CachedUser
+from dependencies import get_database
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/metrics", response_model=QueueMetrics)
+async def get_queue_metrics(
+    _: CachedUser = Depends(require_admin),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Queue depth and job latency (admin only)"""
+    return await JobQueue(db).metrics()
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(
+    limit: int = 50,
+    principal: CachedUser = Depends(get_current_principal),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Recent jobs created by the current user (all jobs for admins)"""
+    created_by = None if principal.user.role == UserRole.ADMIN else principal.user.id
+    jobs = await JobQueue(db).list_jobs(created_by=created_by, limit=min(limit, 200))
+    return [JobResponse(**job.dict()) for job in jobs]
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    principal: CachedUser = Depends(get_current_principal),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get job status"""
+    job = await JobQueue(db).get_job(job_id)
+    if principal.user.role != UserRole.ADMIN and job.created_by != principal.user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return JobResponse(**job.dict())
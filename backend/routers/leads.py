@@ -0,0 +1,54 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+
+from models.lead import LeadComment, LeadCommentCreate, LeadScore
+from routers.auth import require, tenant_repository
+from services.events import notify
+from services.tenant_repository import TenantRepository
+from services.user_cache import CachedUser
+
+router = APIRouter(prefix="/leads", tags=["leads"])
+
+@router.get("/scores", response_model=List[LeadScore])
+async def list_lead_scores(
+    limit: int = Query(50, ge=1, le=500),
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    _: CachedUser = Depends(require("leads:read")),
+    scores: TenantRepository = Depends(tenant_repository("lead_scores")),
+    leads: TenantRepository = Depends(tenant_repository("leads"))
+):
+    """Highest-scoring leads first, read off the (tenant, score) index"""
+    query = {"score": {"$gte": min_score}} if min_score is not None else {}
+    cursor = scores.find(query, {"_id": 0, "lead_ref": 1, "score": 1, "model": 1, "scored_at": 1})
+    ranked = await cursor.sort("score", -1).limit(limit).to_list(limit)
+    details = {
+        doc["id"]: doc
+        for doc in await leads.find(
+            {"id": {"$in": [row["lead_ref"] for row in ranked]}},
+            {"_id": 0, "id": 1, "name": 1, "email": 1, "status": 1}
+        ).to_list(limit)
+    }
+    return [LeadScore(**row, **{k: v for k, v in details.get(row["lead_ref"], {}).items() if k != "id"}) for row in ranked]
+
+@router.get("/{lead_ref}/comments", response_model=List[LeadComment])
+async def list_lead_comments(
+    lead_ref: str,
+    _: CachedUser = Depends(require("leads:read")),
+    comments: TenantRepository = Depends(tenant_repository("lead_comments"))
+):
+    """List comments on a lead, newest first"""
+    cursor = comments.find({"lead_ref": lead_ref}, {"_id": 0, "tenant_id": 0}).sort("created_at", -1)
+    return [LeadComment(**doc) for doc in await cursor.to_list(500)]
+
+@router.post("/{lead_ref}/comments", response_model=LeadComment)
+async def add_lead_comment(
+    lead_ref: str,
+    comment_data: LeadCommentCreate,
+    principal: CachedUser = Depends(require("leads:write")),
+    comments: TenantRepository = Depends(tenant_repository("lead_comments"))
+):
+    """Add a comment to a lead and push it to subscribed streams"""
+    comment = LeadComment(lead_ref=lead_ref, content=comment_data.content, author_id=principal.user.id)
+    await comments.insert_one(comment.dict())
+    notify(comments.tenant_id, "lead_comments.insert", comment.model_dump(mode="json"), lead_id=lead_ref)
+    return comment
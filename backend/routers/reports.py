@@ -0,0 +1,33 @@
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from models.report import ReportInfo, ReportResult
+from routers.auth import require
+from services.reports import REPORTS, ReportEngine
+from services.user_cache import CachedUser
+from dependencies import get_database
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+DEFAULT_RANGE_DAYS = 30
+
+@router.get("", response_model=List[ReportInfo])
+async def list_reports(_: CachedUser = Depends(require("reports:read"))):
+    """List available reports"""
+    return [ReportInfo(name=d.name, title=d.title) for d in REPORTS.values()]
+
+@router.get("/{name}", response_model=ReportResult)
+async def get_report(
+    name: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    principal: CachedUser = Depends(require("reports:read")),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a report for the caller's tenant over [start, end] (default: last 30 days)"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    engine = ReportEngine(db, principal.tenant_id)
+    return await engine.generate(name, start, end)
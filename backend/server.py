@@ -1,27 +1,45 @@
-from fastapi import FastAPI, APIRouter, Depends
+from fastapi import FastAPI, APIRouter, Depends, Request, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorDatabase
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List
-import uuid
-from datetime import datetime
+from typing import List, Optional
+from datetime import datetime, timedelta
 
 # Import authentication modules
 from routers.auth import router as auth_router
+from routers.jobs import router as jobs_router
+from routers.reports import router as reports_router
+from routers.leads import router as leads_router
+from routers.events import router as events_router
+from routers.admin import router as admin_router
 from services.auth_service import AuthService
+from services.job_queue import JobQueue
+from services.reports import ReportEngine
+from services.events import EVENTS_SOURCE, watch_change_streams
+from services.status_service import StatusService
+from services.admin_stats import AdminStatsService
+from services.archive import ArchiveService
+from services.lead_scoring import LeadScorer
+from services.credentials import get_credential_manager
+from models.status import StatusCheck, StatusCheckCreate, StatusSeries
 from dependencies import set_database, get_database
+from storage.backends import open_storage, unsupported_operation_handler
+from storage.memory import UnsupportedOperation
+from services.tenant_repository import ensure_tenant_indexes
+from utils.etag import make_weak_etag, etag_matches, not_modified
+from utils.deadline import DeadlineMiddleware, database_error_handler
+from utils.profiling import ProfilingMiddleware, command_timer, install_route_spans
+from pymongo.errors import PyMongoError
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection (or in-memory storage with STORAGE_BACKEND=memory)
+client, db = open_storage(os.environ['DB_NAME'], event_listeners=[command_timer])
 
 # Set up database dependency
 set_database(db)
@@ -37,15 +55,6 @@ app = FastAPI(
 api_router = APIRouter(prefix="/api")
 
 
-# Define Models
-class StatusCheck(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    client_name: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-class StatusCheckCreate(BaseModel):
-    client_name: str
-
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -53,22 +62,58 @@ async def root():
 
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
-    return status_obj
+    return await StatusService(db).record(input.client_name)
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
+async def get_status_checks(request: Request, response: Response):
+    # Checks are only appended or expired, so the newest and oldest identify the list
+    newest = await db.status_checks.find_one(
+        {}, {"_id": 0, "id": 1, "timestamp": 1}, sort=[("timestamp", -1)]
+    )
+    oldest = await db.status_checks.find_one(
+        {}, {"_id": 0, "id": 1}, sort=[("timestamp", 1)]
+    )
+    etag = make_weak_etag(
+        "status", newest and newest.get("id"), newest and newest.get("timestamp"),
+        oldest and oldest.get("id")
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
     status_checks = await db.status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
-# Include authentication router
+@api_router.get("/status/series", response_model=StatusSeries)
+async def get_status_series(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    client_name: Optional[str] = None
+):
+    """Status check counts over [start, end), downsampled to fit the range"""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=1)
+    return await StatusService(db).series(start, end, client_name)
+
+# Include feature routers
 api_router.include_router(auth_router)
+api_router.include_router(jobs_router)
+api_router.include_router(reports_router)
+api_router.include_router(leads_router)
+api_router.include_router(events_router)
+api_router.include_router(admin_router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Per-route deadlines and load shedding; inside CORS so 503s carry CORS headers
+app.add_middleware(DeadlineMiddleware)
+app.add_exception_handler(PyMongoError, database_error_handler)
+app.add_exception_handler(UnsupportedOperation, unsupported_operation_handler)
+# Outside the deadline middleware so traces include time spent queued
+app.add_middleware(ProfilingMiddleware)
+install_route_spans()
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -84,6 +129,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Long-running tasks started with the app and cancelled on shutdown
+background_tasks: List[asyncio.Task] = []
+
 @app.on_event("startup")
 async def startup_db_client():
     """Initialize database and create admin user"""
@@ -92,16 +140,32 @@ async def startup_db_client():
         await db.command("ping")
         logger.info("Connected to MongoDB successfully")
         
+        # Time-series status checks; its timestamp index backs the /status ETag
+        await StatusService(db).ensure_collections()
+        await ensure_tenant_indexes(db)
+        await JobQueue(db).ensure_indexes()
+        await ReportEngine.ensure_indexes(db)
+        await AdminStatsService(db).ensure_indexes()
+        await ArchiveService(db).ensure_indexes()
+        await LeadScorer(db).ensure_indexes()
+        await get_credential_manager(db).ensure_indexes()
+        
         # Create admin user if not exists
         auth_service = AuthService(db)
         admin_user = await auth_service.create_admin_user()
         logger.info(f"Admin user ensured: {admin_user.email}")
         
+        if EVENTS_SOURCE == "change_stream":
+            background_tasks.append(asyncio.create_task(watch_change_streams(db)))
+            logger.info("Event stream fed from Mongo change streams")
+        
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
         raise e
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
     client.close()
     logger.info("Database connection closed")
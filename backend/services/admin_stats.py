@@ -0,0 +1,101 @@
+from typing import Optional
+from datetime import datetime, timedelta
+import os
+import time
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+
+from models.admin import AdminStats
+from models.user import UserRole
+from utils.single_flight import SingleFlight
+
+ADMIN_STATS_TTL_SECONDS = float(os.environ.get("ADMIN_STATS_TTL_SECONDS", "10"))
+
+# Every field the stats read; the pipeline below is covered by this index
+STATS_INDEX = [
+    ("role", ASCENDING),
+    ("is_active", ASCENDING),
+    ("last_login", DESCENDING),
+    ("created_at", DESCENDING),
+]
+
+_cached: Optional[AdminStats] = None
+_cached_until = 0.0
+_flight = SingleFlight()
+
+
+def _count(facet: list) -> int:
+    return facet[0]["count"] if facet else 0
+
+
+class AdminStatsService:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.users_collection = db.users
+
+    async def ensure_indexes(self) -> None:
+        await self.users_collection.create_index(STATS_INDEX, name="admin_stats")
+
+    async def compute(self) -> AdminStats:
+        """Every dashboard figure from one $facet aggregation over users"""
+        now = datetime.utcnow()
+        day_ago = now - timedelta(days=1)
+        week_ago = now - timedelta(days=7)
+        pipeline = [
+            # The role predicate plus projection lets the planner answer from
+            # the admin_stats index without fetching user documents
+            {"$match": {"role": {"$in": [UserRole.ADMIN, UserRole.CLIENT, UserRole.SUBUSER]}}},
+            {"$project": {"_id": 0, "role": 1, "is_active": 1, "last_login": 1, "created_at": 1}},
+            {"$facet": {
+                "by_role": [
+                    {"$group": {"_id": {"role": "$role", "active": "$is_active"}, "count": {"$sum": 1}}},
+                ],
+                "logins_24h": [{"$match": {"last_login": {"$gte": day_ago}}}, {"$count": "count"}],
+                "logins_7d": [{"$match": {"last_login": {"$gte": week_ago}}}, {"$count": "count"}],
+                "new_7d": [{"$match": {"created_at": {"$gte": week_ago}}}, {"$count": "count"}],
+            }},
+        ]
+        result = (await self.users_collection.aggregate(pipeline).to_list(1))[0]
+
+        counts = {}
+        for row in result["by_role"]:
+            counts[(row["_id"]["role"], row["_id"].get("active") is not False)] = row["count"]
+
+        def total(role: str, active: Optional[bool] = None) -> int:
+            return sum(
+                count for (r, a), count in counts.items()
+                if r == role and (active is None or a == active)
+            )
+
+        active_users = sum(count for (_, a), count in counts.items() if a)
+        suspended_users = sum(count for (_, a), count in counts.items() if not a)
+        return AdminStats(
+            total_users=active_users + suspended_users,
+            total_admins=total(UserRole.ADMIN),
+            total_clients=total(UserRole.CLIENT),
+            active_clients=total(UserRole.CLIENT, True),
+            suspended_clients=total(UserRole.CLIENT, False),
+            total_subusers=total(UserRole.SUBUSER),
+            active_subusers=total(UserRole.SUBUSER, True),
+            suspended_subusers=total(UserRole.SUBUSER, False),
+            active_users=active_users,
+            suspended_users=suspended_users,
+            logins_last_24h=_count(result["logins_24h"]),
+            logins_last_7d=_count(result["logins_7d"]),
+            new_users_last_7d=_count(result["new_7d"]),
+            generated_at=now
+        )
+
+    async def get(self) -> AdminStats:
+        """Cached stats; concurrent refreshes after expiry share one aggregation"""
+        if _cached is not None and time.monotonic() < _cached_until:
+            return _cached
+
+        async def refresh() -> AdminStats:
+            global _cached, _cached_until
+            stats = await self.compute()
+            _cached, _cached_until = stats, time.monotonic() + ADMIN_STATS_TTL_SECONDS
+            return stats
+
+        return await _flight.do("admin_stats", refresh)
@@ -0,0 +1,398 @@
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+import pandas as pd
+import pyarrow.parquet as pq
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from services.job_queue import job_handler
+from services.status_service import STATUS_RAW_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = Path(os.environ.get("ARCHIVE_DIR", Path(__file__).resolve().parent.parent / "archive"))
+ARCHIVE_BATCH_SIZE = 50000
+ARCHIVE_COMPRESSION = "zstd"
+DAY_FORMAT = "%Y-%m-%d"
+
+
+class ArchiveDataset:
+    """A collection whose old documents move to Parquet files"""
+
+    def __init__(
+        self,
+        name: str,
+        time_field: str,
+        retention: timedelta,
+        delete_after_archive: bool,
+        filter_fields: tuple = ()
+    ):
+        self.name = name
+        self.time_field = time_field
+        self.retention = retention
+        # Collections with their own TTL (status_checks) only need copying
+        self.delete_after_archive = delete_after_archive
+        # Equality filters accepted by range queries
+        self.filter_fields = filter_fields
+
+
+DATASETS: Dict[str, ArchiveDataset] = {
+    dataset.name: dataset
+    for dataset in [
+        ArchiveDataset(
+            "audit_logs", "created_at",
+            timedelta(days=int(os.environ.get("AUDIT_LOG_HOT_DAYS", "90"))),
+            delete_after_archive=True,
+            filter_fields=("user_id", "action"),
+        ),
+        ArchiveDataset(
+            # Archive a day before the time-series TTL would drop the points. hot_cutoff
+            # floors to the day, so a day is only archivable once its end is past the
+            # retention; one more day keeps its first points alive until then.
+            "status_checks", "timestamp",
+            timedelta(seconds=STATUS_RAW_TTL_SECONDS) - timedelta(days=2),
+            delete_after_archive=False,
+            filter_fields=("client_name",),
+        ),
+    ]
+}
+
+
+def _json_columns(docs: List[dict]) -> List[str]:
+    """Fields holding a nested value in any of the documents"""
+    return sorted({
+        key for doc in docs for key, value in doc.items()
+        if key != "_id" and isinstance(value, (dict, list))
+    })
+
+
+def _flatten(doc: dict, json_columns: List[str]) -> dict:
+    """Make a Mongo document columnar: stringify ids, JSON-encode the nested columns.
+
+    Every value of a JSON column is encoded, scalars included, so decoding
+    on read is unambiguous.
+    """
+    row = {}
+    for key, value in doc.items():
+        if key == "_id":
+            row[key] = str(value)
+        elif key in json_columns and value is not None:
+            row[key] = json.dumps(value, default=str)
+        else:
+            row[key] = value
+    return row
+
+
+def _unflatten(row: dict, json_columns: List[str]) -> dict:
+    for key in json_columns:
+        if row.get(key) is not None:
+            row[key] = json.loads(row[key])
+    return row
+
+
+class ArchiveStore:
+    """Date-partitioned Parquet files plus a manifest per dataset.
+
+    Layout: ARCHIVE_DIR/<dataset>/date=YYYY-MM-DD/part-<id>.parquet, with
+    ARCHIVE_DIR/<dataset>/manifest.json listing each file's time bounds so
+    range queries open only overlapping files.
+    """
+
+    def __init__(self, root: Path = ARCHIVE_DIR):
+        self.root = Path(root)
+
+    def _manifest_path(self, dataset: str) -> Path:
+        return self.root / dataset / "manifest.json"
+
+    def _load(self, dataset: str) -> dict:
+        path = self._manifest_path(dataset)
+        if not path.exists():
+            return {"dataset": dataset, "files": [], "days": []}
+        with open(path) as f:
+            return json.load(f)
+
+    def manifest(self, dataset: str) -> List[dict]:
+        return self._load(dataset)["files"]
+
+    def _save(self, manifest: dict) -> None:
+        path = self._manifest_path(manifest["dataset"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def write_partition(self, dataset: ArchiveDataset, day: str, docs: List[dict]) -> dict:
+        """Write one compressed Parquet file and record it in the manifest"""
+        json_columns = _json_columns(docs)
+        frame = pd.DataFrame([_flatten(doc, json_columns) for doc in docs])
+        frame[dataset.time_field] = pd.to_datetime(frame[dataset.time_field])
+        frame = frame.sort_values(dataset.time_field)
+
+        directory = self.root / dataset.name / f"date={day}"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"part-{uuid.uuid4().hex[:12]}.parquet"
+        frame.to_parquet(path, engine="pyarrow", compression=ARCHIVE_COMPRESSION, index=False)
+
+        entry = {
+            "path": str(path.relative_to(self.root / dataset.name)),
+            "day": day,
+            "min_time": frame[dataset.time_field].min().isoformat(),
+            "max_time": frame[dataset.time_field].max().isoformat(),
+            "rows": len(frame),
+            "json_columns": json_columns,
+            "bytes": path.stat().st_size,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        manifest = self._load(dataset.name)
+        manifest["files"].append(entry)
+        self._save(manifest)
+        return entry
+
+    def complete_day(self, dataset: str, day: str) -> None:
+        manifest = self._load(dataset)
+        if day not in manifest["days"]:
+            manifest["days"].append(day)
+            self._save(manifest)
+
+    def archived_days(self, dataset: str) -> set:
+        """Days whose archival finished; files of other days may be partial"""
+        return set(self._load(dataset)["days"])
+
+    def drop_partial_day(self, dataset: str, day: str) -> None:
+        """Remove files left by an interrupted run so the day can be rewritten"""
+        manifest = self._load(dataset)
+        partial = [entry for entry in manifest["files"] if entry["day"] == day]
+        if not partial:
+            return
+        manifest["files"] = [entry for entry in manifest["files"] if entry["day"] != day]
+        self._save(manifest)
+        for entry in partial:
+            (self.root / dataset / entry["path"]).unlink(missing_ok=True)
+
+    def archived_ids(self, dataset: str, day: str) -> Set[str]:
+        """Document ids already written for a day, read from the _id column only"""
+        ids: Set[str] = set()
+        for entry in self.manifest(dataset):
+            if entry["day"] == day:
+                table = pq.read_table(self.root / dataset / entry["path"], columns=["_id"], memory_map=True)
+                ids.update(table.column("_id").to_pylist())
+        return ids
+
+    def scan(
+        self,
+        dataset: ArchiveDataset,
+        start: datetime,
+        end: datetime,
+        filters: Optional[dict] = None,
+        limit: Optional[int] = None
+    ) -> List[dict]:
+        """Rows in [start, end) from archived files, pruned by the manifest.
+
+        Files are memory-mapped and the time and equality filters are pushed
+        down to row groups, so only matching pages are decoded.
+        """
+        predicates = [(dataset.time_field, ">=", pd.Timestamp(start)), (dataset.time_field, "<", pd.Timestamp(end))]
+        predicates += [(field, "==", value) for field, value in (filters or {}).items()]
+
+        rows: List[dict] = []
+        for entry in sorted(self.manifest(dataset.name), key=lambda e: e["min_time"]):
+            if entry["max_time"] < start.isoformat() or entry["min_time"] >= end.isoformat():
+                continue
+            path = self.root / dataset.name / entry["path"]
+            try:
+                table = pq.read_table(path, memory_map=True, filters=predicates)
+            except (KeyError, ValueError):
+                # Filter on a column this file does not have
+                continue
+            json_columns = entry.get("json_columns", [])
+            rows.extend(_unflatten(row, json_columns) for row in table.to_pylist())
+            if limit is not None and len(rows) >= limit:
+                return rows[:limit]
+        return rows
+
+
+class ArchiveService:
+    def __init__(self, db: AsyncIOMotorDatabase, store: Optional[ArchiveStore] = None):
+        self.db = db
+        self.store = store or ArchiveStore()
+
+    async def ensure_indexes(self) -> None:
+        for dataset in DATASETS.values():
+            if dataset.delete_after_archive:
+                await self.db[dataset.name].create_index(dataset.time_field)
+
+    @staticmethod
+    def get_dataset(name: str) -> ArchiveDataset:
+        dataset = DATASETS.get(name)
+        if not dataset:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Archive dataset not found"
+            )
+        return dataset
+
+    @staticmethod
+    def hot_cutoff(dataset: ArchiveDataset, now: Optional[datetime] = None) -> datetime:
+        """Start of the hot window, aligned to a day boundary"""
+        cutoff = (now or datetime.utcnow()) - dataset.retention
+        return datetime(cutoff.year, cutoff.month, cutoff.day)
+
+    async def _archive_day(self, dataset: ArchiveDataset, key: str, window: dict) -> int:
+        """Write a whole day, mark it complete, and only then delete it from Mongo.
+
+        Until the day is complete Mongo still holds every row, so files left
+        by an interrupted run are dropped and the day is rewritten from scratch.
+        """
+        collection = self.db[dataset.name]
+        await asyncio.to_thread(self.store.drop_partial_day, dataset.name, key)
+        ids = []
+        cursor = collection.find(window).sort(dataset.time_field, 1)
+        while True:
+            docs = await cursor.to_list(ARCHIVE_BATCH_SIZE)
+            if not docs:
+                break
+            # pandas/pyarrow encoding is CPU work; keep it off the event loop
+            await asyncio.to_thread(self.store.write_partition, dataset, key, docs)
+            ids.extend(doc["_id"] for doc in docs)
+        if not ids:
+            # An empty day stays unarchived so rows written to it later are still read from Mongo
+            return 0
+        await asyncio.to_thread(self.store.complete_day, dataset.name, key)
+        if dataset.delete_after_archive:
+            for i in range(0, len(ids), ARCHIVE_BATCH_SIZE):
+                await collection.delete_many({"_id": {"$in": ids[i:i + ARCHIVE_BATCH_SIZE]}})
+        return len(ids)
+
+    async def _archive_leftovers(self, dataset: ArchiveDataset, key: str, window: dict) -> int:
+        """Clear rows still in Mongo for a completed day.
+
+        They are either already archived (a run stopped between completing
+        the day and deleting it) or written late; only the latter are added.
+        """
+        collection = self.db[dataset.name]
+        if not await collection.find_one(window, {"_id": 1}):
+            return 0
+        archived = await asyncio.to_thread(self.store.archived_ids, dataset.name, key)
+        added = 0
+        cursor = collection.find(window).sort(dataset.time_field, 1)
+        while True:
+            docs = await cursor.to_list(ARCHIVE_BATCH_SIZE)
+            if not docs:
+                break
+            late = [doc for doc in docs if str(doc["_id"]) not in archived]
+            if late:
+                await asyncio.to_thread(self.store.write_partition, dataset, key, late)
+                added += len(late)
+            await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        return added
+
+    async def archive_dataset(self, dataset: ArchiveDataset, now: Optional[datetime] = None) -> dict:
+        """Move (or copy) whole days older than the retention window into Parquet"""
+        collection = self.db[dataset.name]
+        cutoff = self.hot_cutoff(dataset, now)
+        done = self.store.archived_days(dataset.name)
+        archived_rows = 0
+        archived_days = 0
+
+        oldest = await collection.find_one(
+            {dataset.time_field: {"$lt": cutoff}}, sort=[(dataset.time_field, 1)]
+        )
+        day = oldest and datetime(*oldest[dataset.time_field].timetuple()[:3])
+        while day is not None and day < cutoff:
+            next_day = day + timedelta(days=1)
+            key = day.strftime(DAY_FORMAT)
+            window = {dataset.time_field: {"$gte": day, "$lt": next_day}}
+            if key not in done:
+                day_rows = await self._archive_day(dataset, key, window)
+            elif dataset.delete_after_archive:
+                day_rows = await self._archive_leftovers(dataset, key, window)
+            else:
+                day_rows = 0
+            archived_rows += day_rows
+            archived_days += 1 if day_rows else 0
+            day = next_day
+
+        if archived_rows:
+            logger.info(f"Archived {archived_rows} {dataset.name} rows over {archived_days} days")
+        return {"dataset": dataset.name, "rows": archived_rows, "days": archived_days, "cutoff": cutoff}
+
+    async def query(
+        self,
+        name: str,
+        start: datetime,
+        end: datetime,
+        filters: Optional[dict] = None,
+        limit: int = 1000
+    ) -> List[dict]:
+        """Documents in [start, end): Parquet for archived days, Mongo for the rest"""
+        dataset = self.get_dataset(name)
+        if end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must be after start"
+            )
+        unknown = set(filters or {}) - set(dataset.filter_fields)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot filter {name} on {', '.join(sorted(unknown))}"
+            )
+        rows: List[dict] = []
+        for archived, segment_start, segment_end in self._segments(dataset, start, end):
+            remaining = limit - len(rows)
+            if remaining <= 0:
+                break
+            if archived:
+                rows.extend(await asyncio.to_thread(
+                    self.store.scan, dataset, segment_start, segment_end, filters, remaining
+                ))
+            else:
+                query = {dataset.time_field: {"$gte": segment_start, "$lt": segment_end}, **(filters or {})}
+                cursor = self.db[dataset.name].find(query, {"_id": 0}).sort(dataset.time_field, 1)
+                rows.extend(await cursor.to_list(remaining))
+        for row in rows:
+            row.pop("_id", None)
+        return rows
+
+    def _segments(self, dataset: ArchiveDataset, start: datetime, end: datetime) -> List[Tuple[bool, datetime, datetime]]:
+        """Split [start, end) into consecutive runs read from Parquet (True) or Mongo (False).
+
+        Only days whose archival completed come from Parquet. Everything else,
+        including days past the hot cutoff that no run has reached yet, is
+        still in Mongo.
+        """
+        segments: List[Tuple[bool, datetime, datetime]] = []
+        position = start
+        for key in sorted(self.store.archived_days(dataset.name)):
+            day = datetime.strptime(key, DAY_FORMAT)
+            lo, hi = max(start, day), min(end, day + timedelta(days=1))
+            if hi <= lo:
+                continue
+            if position < lo:
+                segments.append((False, position, lo))
+            if segments and segments[-1][0] and segments[-1][2] == lo:
+                segments[-1] = (True, segments[-1][1], hi)
+            else:
+                segments.append((True, lo, hi))
+            position = hi
+        if position < end:
+            segments.append((False, position, end))
+        return segments
+
+
+@job_handler("archive.run")
+async def archive_old_data(db: AsyncIOMotorDatabase, payload: dict) -> List[dict]:
+    """Scheduled archival of every dataset past its hot window"""
+    service = ArchiveService(db)
+    names = payload.get("datasets") or list(DATASETS)
+    return [await service.archive_dataset(DATASETS[name]) for name in names]
@@ -4,6 +4,7 @@ from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from models.user import User, UserCreate, UserLogin, UserResponse, Token
+from services.user_cache import CachedUser, user_cache
 from utils.auth import AuthUtils, get_token_expires_in
 
 class AuthService:
@@ -75,6 +76,7 @@ class AuthService:
             {"id": user.id},
             {"$set": {"last_login": datetime.utcnow()}}
         )
+        user_cache.invalidate(user.id)
         
         # Create access token
         access_token_expires = timedelta(minutes=60 * 24 * 7)  # 7 days
@@ -100,6 +102,16 @@ class AuthService:
             return User(**user_doc)
         return None
 
+    async def get_cached_user(self, user_id: str) -> Optional[CachedUser]:
+        """Get user by ID through the in-process user cache"""
+        entry = user_cache.get(user_id)
+        if entry is not None:
+            return entry
+        user = await self.get_user_by_id(user_id)
+        if user is None:
+            return None
+        return user_cache.put(user)
+
     async def get_user_profile(self, user_id: str) -> UserResponse:
         """Get user profile"""
         user = await self.get_user_by_id(user_id)
@@ -0,0 +1,269 @@
+from typing import Dict, Optional, Tuple
+from collections import deque
+from datetime import datetime, timedelta
+import asyncio
+import contextvars
+import logging
+import os
+import time
+
+import requests
+from cryptography.fernet import Fernet, InvalidToken
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# A cached token counts as expired this long before its real expiry
+REFRESH_MARGIN_SECONDS = float(os.environ.get("OAUTH_REFRESH_MARGIN_SECONDS", "60"))
+# Hits inside this window before expiry trigger a background refresh
+PREFETCH_SECONDS = float(os.environ.get("OAUTH_PREFETCH_SECONDS", "300"))
+# Tokens stored without an expiry are re-read from Mongo after this long
+NO_EXPIRY_CACHE_SECONDS = 3600.0
+REFRESH_TIMEOUT_SECONDS = 10.0
+# Fernet key for tokens at rest; without it tokens are stored as mirrored (plaintext)
+CREDENTIALS_ENCRYPTION_KEY = os.environ.get("CREDENTIALS_ENCRYPTION_KEY")
+ENCRYPTED_PREFIX = "fernet:"
+LATENCY_SAMPLES = 1000
+
+
+class OAuthProvider:
+    """How to refresh one provider's access tokens"""
+
+    def __init__(self, name: str, token_url: str, client_id: Optional[str], client_secret: Optional[str], grant_type: str, default_expires_in: Optional[int] = None):
+        self.name = name
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.grant_type = grant_type
+        self.default_expires_in = default_expires_in
+
+    def refresh(self, access_token: str, refresh_token: Optional[str]) -> dict:
+        """Blocking token request; returns the provider's validated JSON response"""
+        params = {"client_id": self.client_id, "client_secret": self.client_secret, "grant_type": self.grant_type}
+        if self.grant_type == "refresh_token":
+            if not refresh_token:
+                raise ValueError(f"No {self.name} refresh token stored")
+            params["refresh_token"] = refresh_token
+            response = requests.post(self.token_url, data=params, timeout=REFRESH_TIMEOUT_SECONDS)
+        else:
+            # Facebook: exchange the current long-lived token for a fresh one
+            params["fb_exchange_token"] = access_token
+            response = requests.get(self.token_url, params=params, timeout=REFRESH_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        data = response.json()
+        # A 200 without a usable token is as much an upstream failure as a 4xx
+        if not isinstance(data, dict) or not isinstance(data.get("access_token"), str) or not data["access_token"]:
+            raise ValueError(f"{self.name} token response has no access_token")
+        if data.get("expires_in") is not None:
+            try:
+                data["expires_in"] = float(data["expires_in"])
+            except (TypeError, ValueError):
+                raise ValueError(f"{self.name} token response has an invalid expires_in")
+        return data
+
+
+PROVIDERS: Dict[str, OAuthProvider] = {
+    provider.name: provider
+    for provider in [
+        OAuthProvider(
+            "google",
+            os.environ.get("GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token"),
+            os.environ.get("GOOGLE_ID"), os.environ.get("GOOGLE_SECRET"),
+            "refresh_token",
+        ),
+        OAuthProvider(
+            "facebook",
+            os.environ.get("FACEBOOK_TOKEN_URL", "https://graph.facebook.com/v18.0/oauth/access_token"),
+            os.environ.get("FACEBOOK_APP_ID"), os.environ.get("FACEBOOK_APP_SECRET"),
+            "fb_exchange_token", default_expires_in=60 * 24 * 3600,
+        ),
+    ]
+}
+
+
+class TokenCipher:
+    """Encrypts tokens at rest when a key is configured; passes plaintext through"""
+
+    def __init__(self, key: Optional[str] = CREDENTIALS_ENCRYPTION_KEY):
+        self._fernet = Fernet(key) if key else None
+
+    def encrypt(self, value: Optional[str]) -> Optional[str]:
+        if value is None or self._fernet is None:
+            return value
+        return ENCRYPTED_PREFIX + self._fernet.encrypt(value.encode()).decode()
+
+    def decrypt(self, value: Optional[str]) -> Optional[str]:
+        if value is None or not value.startswith(ENCRYPTED_PREFIX):
+            return value
+        if self._fernet is None:
+            raise ValueError("Encrypted credential found but CREDENTIALS_ENCRYPTION_KEY is not set")
+        try:
+            return self._fernet.decrypt(value[len(ENCRYPTED_PREFIX):].encode()).decode()
+        except InvalidToken:
+            raise ValueError("Credential could not be decrypted with CREDENTIALS_ENCRYPTION_KEY")
+
+
+class CachedToken:
+    __slots__ = ("token", "expires_at", "fetched_at")
+
+    def __init__(self, token: str, expires_at: Optional[datetime]):
+        self.token = token
+        self.expires_at = expires_at
+        self.fetched_at = datetime.utcnow()
+
+    def usable_until(self) -> datetime:
+        if self.expires_at is None:
+            return self.fetched_at + timedelta(seconds=NO_EXPIRY_CACHE_SECONDS)
+        return self.expires_at - timedelta(seconds=REFRESH_MARGIN_SECONDS)
+
+
+class CredentialMetrics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.refresh_failures = 0
+        self.refresh_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        ordered = sorted(self.refresh_latencies)
+        pick = lambda pct: round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000, 2) if ordered else None
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "refreshes": self.refreshes,
+            "background_refreshes": self.background_refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refresh_p50_ms": pick(0.5),
+            "refresh_p95_ms": pick(0.95),
+        }
+
+
+class CredentialManager:
+    """Decrypted provider access tokens, cached until shortly before expiry.
+
+    Misses for the same account share one load or refresh (single flight).
+    A hit within PREFETCH_SECONDS of expiry starts a background refresh, so
+    steady traffic never waits on the provider. Credentials live in the
+    user_credentials collection mirrored from the integrations setup pages.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, providers: Dict[str, OAuthProvider] = PROVIDERS, cipher: Optional[TokenCipher] = None):
+        self.db = db
+        self.collection = db.user_credentials
+        self.providers = providers
+        self.cipher = cipher or TokenCipher()
+        self.metrics = CredentialMetrics()
+        self._cache: Dict[Tuple[str, str], CachedToken] = {}
+        self._flight = SingleFlight()
+        self._prefetching: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index([("user_id", ASCENDING), ("provider", ASCENDING)], unique=True)
+
+    def invalidate(self, user_id: str, provider: str) -> None:
+        """Drop a cached token, e.g. after the provider rejected it"""
+        self._cache.pop((user_id, provider), None)
+
+    async def get_access_token(self, user_id: str, provider: str) -> str:
+        key = (user_id, provider)
+        now = datetime.utcnow()
+        entry = self._cache.get(key)
+        if entry is not None and entry.usable_until() > now:
+            self.metrics.hits += 1
+            if entry.expires_at is not None and entry.usable_until() - timedelta(seconds=PREFETCH_SECONDS) <= now:
+                self._refresh_in_background(key)
+            return entry.token
+
+        self.metrics.misses += 1
+        entry = await self._flight.do(key, lambda: self._load(key))
+        return entry.token
+
+    async def _load(self, key: Tuple[str, str], prefetch: bool = False) -> CachedToken:
+        """Cache the stored token if still usable (another worker may have refreshed it), else refresh.
+
+        A prefetch also refreshes a stored token within PREFETCH_SECONDS of
+        that point, but not one another worker already replaced.
+        """
+        user_id, provider = key
+        doc = await self.collection.find_one({"user_id": user_id, "provider": provider}, {"_id": 0})
+        if not doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No {provider} credentials connected"
+            )
+        entry = CachedToken(self.cipher.decrypt(doc["access_token"]), doc.get("expires_at"))
+        refresh_before = datetime.utcnow() + timedelta(seconds=PREFETCH_SECONDS if prefetch else 0)
+        if entry.usable_until() <= refresh_before:
+            entry = await self._refresh(key, entry.token, self.cipher.decrypt(doc.get("refresh_token")))
+        self._cache[key] = entry
+        return entry
+
+    async def _refresh(self, key: Tuple[str, str], access_token: str, refresh_token: Optional[str]) -> CachedToken:
+        user_id, provider_name = key
+        provider = self.providers.get(provider_name)
+        if provider is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported credential provider {provider_name}"
+            )
+        start = time.perf_counter()
+        try:
+            data = await asyncio.to_thread(provider.refresh, access_token, refresh_token)
+        except (requests.RequestException, ValueError) as e:
+            self.metrics.refresh_failures += 1
+            logger.warning(f"Refreshing {provider_name} token for {user_id} failed: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Could not refresh {provider_name} access token"
+            )
+        self.metrics.refreshes += 1
+        self.metrics.refresh_latencies.append(time.perf_counter() - start)
+
+        expires_in = data.get("expires_in", provider.default_expires_in)
+        expires_at = datetime.utcnow() + timedelta(seconds=expires_in) if expires_in else None
+        update = {
+            "access_token": self.cipher.encrypt(data["access_token"]),
+            "expires_at": expires_at,
+            "refreshed_at": datetime.utcnow(),
+        }
+        if data.get("refresh_token"):
+            # Providers may rotate the refresh token
+            update["refresh_token"] = self.cipher.encrypt(data["refresh_token"])
+        await self.collection.update_one({"user_id": user_id, "provider": provider_name}, {"$set": update})
+        return CachedToken(data["access_token"], expires_at)
+
+    def _refresh_in_background(self, key: Tuple[str, str]) -> None:
+        if key in self._prefetching or self._flight.in_flight(key):
+            return
+
+        async def refresh():
+            try:
+                await self._flight.do(key, lambda: self._load(key, prefetch=True))
+                self.metrics.background_refreshes += 1
+            except Exception as e:
+                # The cached token stays valid until its margin; the next miss retries
+                logger.warning(f"Background refresh of {key[1]} token for {key[0]} failed: {e}")
+
+        # Fresh context: the triggering request's deadline must not bound the refresh
+        task = asyncio.get_running_loop().create_task(refresh(), context=contextvars.Context())
+        self._prefetching[key] = task
+        task.add_done_callback(lambda _: self._prefetching.pop(key, None))
+
+
+_manager: Optional[CredentialManager] = None
+
+
+def get_credential_manager(db: AsyncIOMotorDatabase) -> CredentialManager:
+    """Process-wide manager, so every caller shares one token cache"""
+    global _manager
+    if _manager is None or _manager.db is not db:
+        _manager = CredentialManager(db)
+    return _manager
@@ -0,0 +1,250 @@
+from typing import AsyncIterator, Deque, Dict, FrozenSet, List, Optional, Set
+from collections import deque
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from services.reports import REPORT_SOURCES, mark_data_changed
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = float(os.environ.get("EVENTS_HEARTBEAT_SECONDS", "15"))
+# Recent events kept per tenant for Last-Event-ID resume
+REPLAY_BUFFER_SIZE = int(os.environ.get("EVENTS_REPLAY_BUFFER", "256"))
+# Undelivered events a slow subscriber may hold before it is dropped
+SUBSCRIBER_QUEUE_SIZE = 64
+# "memory" fans out in-process publishes; "change_stream" also tails Mongo
+EVENTS_SOURCE = os.environ.get("EVENTS_SOURCE", "memory")
+WATCHED_COLLECTIONS = ["lead_comments", "leads"]
+
+_HEARTBEAT = object()
+_CLOSED = object()
+
+
+class Event:
+    __slots__ = ("id", "seq", "tenant_id", "type", "lead_id", "data")
+
+    def __init__(self, seq: int, boot_id: str, tenant_id: str, type: str, lead_id: Optional[str], data: dict):
+        self.seq = seq
+        self.id = f"{boot_id}:{seq}"
+        self.tenant_id = tenant_id
+        self.type = type
+        self.lead_id = lead_id
+        self.data = data
+
+    def encode(self) -> bytes:
+        """Serialize as one SSE frame"""
+        payload = json.dumps(self.data, default=str, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n".encode("utf-8")
+
+
+class Subscriber:
+    """One open stream; kept small since most of them sit idle"""
+
+    __slots__ = ("tenant_id", "lead_ids", "queue")
+
+    def __init__(self, tenant_id: str, lead_ids: Optional[FrozenSet[str]]):
+        self.tenant_id = tenant_id
+        self.lead_ids = lead_ids
+        self.queue: asyncio.Queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def wants(self, event: Event) -> bool:
+        return self.lead_ids is None or event.lead_id in self.lead_ids
+
+
+class EventBus:
+    """In-process fanout of tenant events to SSE subscribers"""
+
+    def __init__(self, replay_size: int = REPLAY_BUFFER_SIZE):
+        # Event ids embed a per-process boot id, so a resume token from
+        # another process or an earlier run is recognised as unknown
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.replay_size = replay_size
+        self._seq: Dict[str, int] = {}  # per tenant, so gaps mean lost events
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._recent: Dict[str, Deque[Event]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, tenant_id: str, type: str, data: dict, lead_id: Optional[str] = None) -> Event:
+        """Deliver an event to the tenant's matching subscribers"""
+        seq = self._seq[tenant_id] = self._seq.get(tenant_id, 0) + 1
+        event = Event(seq, self.boot_id, tenant_id, type, lead_id, data)
+        recent = self._recent.get(tenant_id)
+        if recent is None:
+            recent = self._recent[tenant_id] = deque(maxlen=self.replay_size)
+        recent.append(event)
+
+        for subscriber in list(self._subscribers.get(tenant_id, ())):
+            if not subscriber.wants(event):
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too far behind; cut it loose and let it reconnect with Last-Event-ID
+                self._drop(subscriber)
+        return event
+
+    def subscribe(self, tenant_id: str, lead_ids: Optional[List[str]] = None) -> Subscriber:
+        subscriber = Subscriber(tenant_id, frozenset(lead_ids) if lead_ids else None)
+        self._subscribers.setdefault(tenant_id, set()).add(subscriber)
+        self._ensure_heartbeat()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subs = self._subscribers.get(subscriber.tenant_id)
+        if subs is not None:
+            subs.discard(subscriber)
+            if not subs:
+                del self._subscribers[subscriber.tenant_id]
+
+    def _drop(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(_CLOSED)
+
+    def replay(self, subscriber: Subscriber, last_event_id: Optional[str]) -> Optional[List[Event]]:
+        """Events missed since ``last_event_id``; None if they can no longer be replayed"""
+        if not last_event_id:
+            return []
+        boot_id, _, seq = last_event_id.partition(":")
+        if boot_id != self.boot_id or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq.get(subscriber.tenant_id, 0):
+            return None
+        recent = self._recent.get(subscriber.tenant_id, ())
+        if recent and recent[0].seq > seq + 1:
+            # Missed events already fell out of the buffer
+            return None
+        return [event for event in recent if event.seq > seq and subscriber.wants(event)]
+
+    def _ensure_heartbeat(self) -> None:
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+
+    async def _heartbeat(self) -> None:
+        """One timer for every subscriber instead of one per connection"""
+        while self._subscribers:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            for subs in list(self._subscribers.values()):
+                for subscriber in list(subs):
+                    if subscriber.queue.empty():
+                        subscriber.queue.put_nowait(_HEARTBEAT)
+
+    async def stream(self, subscriber: Subscriber, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """SSE frames for one subscriber until it disconnects or is dropped"""
+        try:
+            yield f"retry: {int(HEARTBEAT_SECONDS * 1000)}\n\n".encode("utf-8")
+            last_seq = 0
+            missed = self.replay(subscriber, last_event_id)
+            if missed is None:
+                # Resume point is gone; the client should refetch and carry on
+                yield b"event: reset\ndata: {}\n\n"
+            else:
+                for event in missed:
+                    last_seq = event.seq
+                    yield event.encode()
+
+            while True:
+                item = await subscriber.queue.get()
+                if item is _CLOSED:
+                    return
+                if item is _HEARTBEAT:
+                    yield b": ping\n\n"
+                elif item.seq > last_seq:
+                    # Skip anything already sent during replay
+                    yield item.encode()
+        finally:
+            self.unsubscribe(subscriber)
+
+
+# Shared by the event stream endpoint and everything that publishes
+event_bus = EventBus()
+
+
+def notify(tenant_id: str, type: str, data: dict, lead_id: Optional[str] = None) -> None:
+    """Publish a write made in this process.
+
+    With EVENTS_SOURCE=change_stream the write reaches the bus through the
+    change stream instead, so publishing here would deliver it twice.
+    """
+    if EVENTS_SOURCE != "change_stream":
+        event_bus.publish(tenant_id, type, data, lead_id)
+
+
+async def _mark_report_days(db: AsyncIOMotorDatabase, collection: str, change: dict) -> None:
+    """Mark the days a report source document was on, before and after the change"""
+    days = set()
+    for document in (change.get("fullDocumentBeforeChange"), change.get("fullDocument")):
+        when = (document or {}).get(REPORT_SOURCES[collection])
+        if isinstance(when, datetime) and document.get("tenant_id"):
+            days.add((document["tenant_id"], when.date()))
+    for tenant_id, day in days:
+        await mark_data_changed(db, tenant_id, collection, datetime.combine(day, datetime.min.time()))
+
+
+async def watch_change_streams(db: AsyncIOMotorDatabase, bus: EventBus = event_bus) -> None:
+    """Feed the bus from Mongo change streams (requires a replica set).
+
+    Use this when writes happen in other processes such as the job worker;
+    in-process writers can publish to the bus directly. Writes to report
+    source collections, which come from outside this backend, also mark
+    their day's report data as changed. Deletes and moves between days are
+    only seen where pre-images are enabled on those collections.
+    """
+    report_sources = [name for name in REPORT_SOURCES if name not in WATCHED_COLLECTIONS]
+    pipeline = [
+        {"$match": {"$or": [
+            {
+                "operationType": {"$in": ["insert", "update", "replace"]},
+                "ns.coll": {"$in": WATCHED_COLLECTIONS},
+                "fullDocument.tenant_id": {"$exists": True},
+            },
+            {
+                "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+                "ns.coll": {"$in": list(REPORT_SOURCES)},
+            },
+        ]}}
+    ]
+    resume_token = None
+    while True:
+        try:
+            async with db.watch(
+                pipeline, full_document="updateLookup", full_document_before_change="whenAvailable",
+                resume_after=resume_token
+            ) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    collection = change["ns"]["coll"]
+                    if collection in REPORT_SOURCES:
+                        await _mark_report_days(db, collection, change)
+                    document = change.get("fullDocument")
+                    if collection in report_sources or not document or "tenant_id" not in document:
+                        continue
+                    document.pop("_id", None)
+                    bus.publish(
+                        document["tenant_id"],
+                        f"{collection}.{change['operationType']}",
+                        document,
+                        lead_id=document.get("id") if collection == "leads" else document.get("lead_ref")
+                    )
+        except asyncio.CancelledError:
+            raise
+        except NotImplementedError as e:
+            # Storage without change streams (STORAGE_BACKEND=memory); retrying cannot help
+            logger.error(f"Change streams unavailable: {e}")
+            return
+        except Exception as e:
+            logger.error(f"Change stream interrupted, resuming: {e}")
+            await asyncio.sleep(1)
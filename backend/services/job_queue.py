@@ -0,0 +1,252 @@
+from typing import Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+import logging
+import os
+import random
+import time
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from models.job import Job, JobStatus, QueueMetrics
+
+logger = logging.getLogger(__name__)
+
+# A leased job is invisible to other workers until this long after its last heartbeat
+VISIBILITY_TIMEOUT_SECONDS = 60
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 60 * 60
+METRICS_SAMPLE_SIZE = 500
+# Succeeded and failed jobs are deleted this long after they finish
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+
+class JobHandler:
+    """A registered job type"""
+
+    def __init__(self, name: str, func: Callable, cpu_bound: bool, timeout: Optional[float]):
+        self.name = name
+        self.func = func
+        self.cpu_bound = cpu_bound
+        self.timeout = timeout
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(name: str, cpu_bound: bool = False, timeout: Optional[float] = None):
+    """Register a job handler.
+
+    I/O-bound handlers are ``async def handler(db, payload)`` and run on the
+    worker's event loop. CPU-bound handlers are plain module-level
+    ``def handler(payload)`` functions so they can be pickled into the
+    worker's process pool.
+    """
+    def decorator(func: Callable) -> Callable:
+        JOB_HANDLERS[name] = JobHandler(name, func, cpu_bound, timeout)
+        return func
+    return decorator
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class JobQueue:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.jobs_collection = db.jobs
+
+    async def ensure_indexes(self) -> None:
+        """Indexes backing leasing, lease recovery, listings and metrics"""
+        await self.jobs_collection.create_index(
+            [("status", ASCENDING), ("priority", DESCENDING), ("run_at", ASCENDING)]
+        )
+        await self.jobs_collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        await self.jobs_collection.create_index([("created_by", ASCENDING), ("created_at", DESCENDING)])
+        await self.jobs_collection.create_index([("status", ASCENDING), ("finished_at", DESCENDING)])
+        await self.jobs_collection.create_index("id", unique=True)
+        # Periodic jobs alone add thousands of documents a day; expire finished ones
+        await self.jobs_collection.create_index(
+            "finished_at",
+            expireAfterSeconds=JOB_RETENTION_SECONDS,
+            partialFilterExpression={"status": {"$in": [JobStatus.SUCCEEDED, JobStatus.FAILED]}},
+            name="finished_ttl"
+        )
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Optional[dict] = None,
+        priority: int = 0,
+        max_attempts: int = 5,
+        delay: float = 0,
+        tenant_id: Optional[str] = None,
+        created_by: Optional[str] = None
+    ) -> Job:
+        """Add a job to the queue"""
+        job = Job(
+            type=job_type,
+            payload=payload or {},
+            priority=priority,
+            max_attempts=max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+            tenant_id=tenant_id,
+            created_by=created_by
+        )
+        await self.jobs_collection.insert_one(job.dict())
+        return job
+
+    async def enqueue_periodic(self, job_type: str, interval: float, payload: Optional[dict] = None) -> bool:
+        """Enqueue at most one job per type per interval, however many schedulers run.
+
+        The job id is derived from the interval slot, so concurrent schedulers
+        collide on the unique index instead of double-enqueueing.
+        """
+        slot = int(time.time() // interval)
+        job = Job(id=f"{job_type}:{slot}", type=job_type, payload=payload or {})
+        try:
+            await self.jobs_collection.insert_one(job.dict())
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def lease(
+        self,
+        worker_id: str,
+        job_types: Optional[List[str]] = None,
+        visibility_timeout: float = VISIBILITY_TIMEOUT_SECONDS
+    ) -> Optional[Job]:
+        """Atomically claim the highest-priority ready job, if any"""
+        now = datetime.utcnow()
+        query = {
+            "$or": [
+                {"status": JobStatus.QUEUED, "run_at": {"$lte": now}},
+                # A worker died mid-job; its lease ran out
+                {"status": JobStatus.RUNNING, "lease_expires_at": {"$lte": now}},
+            ]
+        }
+        if job_types:
+            query["type"] = {"$in": job_types}
+
+        job_doc = await self.jobs_collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING,
+                    "locked_by": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=visibility_timeout),
+                    "started_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", DESCENDING), ("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        return Job(**job_doc) if job_doc else None
+
+    async def extend_lease(
+        self, job_id: str, worker_id: str, visibility_timeout: float = VISIBILITY_TIMEOUT_SECONDS
+    ) -> bool:
+        """Heartbeat; False means the lease was lost to another worker"""
+        now = datetime.utcnow()
+        result = await self.jobs_collection.update_one(
+            {"id": job_id, "locked_by": worker_id, "status": JobStatus.RUNNING},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=visibility_timeout), "updated_at": now}}
+        )
+        return result.modified_count == 1
+
+    async def complete(self, job: Job, worker_id: str, result=None) -> bool:
+        """Mark a leased job as succeeded"""
+        now = datetime.utcnow()
+        update = await self.jobs_collection.update_one(
+            {"id": job.id, "locked_by": worker_id, "status": JobStatus.RUNNING},
+            {"$set": {
+                "status": JobStatus.SUCCEEDED,
+                "result": result,
+                "finished_at": now,
+                "updated_at": now,
+                "lease_expires_at": None,
+                "last_error": None,
+            }}
+        )
+        return update.modified_count == 1
+
+    async def fail(self, job: Job, worker_id: str, error: str) -> bool:
+        """Requeue with backoff, or fail permanently once attempts run out"""
+        now = datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            fields = {"status": JobStatus.FAILED, "finished_at": now}
+        else:
+            fields = {
+                "status": JobStatus.QUEUED,
+                "run_at": now + timedelta(seconds=retry_delay(job.attempts)),
+                "locked_by": None,
+            }
+        fields.update({"last_error": error, "lease_expires_at": None, "updated_at": now})
+        update = await self.jobs_collection.update_one(
+            {"id": job.id, "locked_by": worker_id, "status": JobStatus.RUNNING},
+            {"$set": fields}
+        )
+        return update.modified_count == 1
+
+    async def get_job(self, job_id: str) -> Job:
+        """Get job by ID"""
+        job_doc = await self.jobs_collection.find_one({"id": job_id})
+        if not job_doc:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job not found"
+            )
+        return Job(**job_doc)
+
+    async def list_jobs(self, created_by: Optional[str] = None, limit: int = 50) -> List[Job]:
+        """Most recent jobs, optionally only those a user created"""
+        query = {"created_by": created_by} if created_by else {}
+        cursor = self.jobs_collection.find(query).sort("created_at", DESCENDING).limit(limit)
+        return [Job(**job_doc) for job_doc in await cursor.to_list(limit)]
+
+    async def metrics(self) -> QueueMetrics:
+        """Queue depth by status and wait/run latency of recent finished jobs"""
+        now = datetime.utcnow()
+        depth = {
+            row["_id"]: row["count"]
+            async for row in self.jobs_collection.aggregate(
+                [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+            )
+        }
+        ready_query = {"status": JobStatus.QUEUED, "run_at": {"$lte": now}}
+        ready = await self.jobs_collection.count_documents(ready_query)
+        oldest = await self.jobs_collection.find_one(
+            ready_query, {"_id": 0, "run_at": 1}, sort=[("run_at", ASCENDING)]
+        )
+
+        recent = await self.jobs_collection.find(
+            {"status": JobStatus.SUCCEEDED},
+            {"_id": 0, "created_at": 1, "started_at": 1, "finished_at": 1}
+        ).sort("finished_at", DESCENDING).limit(METRICS_SAMPLE_SIZE).to_list(METRICS_SAMPLE_SIZE)
+        wait_ms = [(doc["started_at"] - doc["created_at"]).total_seconds() * 1000 for doc in recent]
+        run_ms = [(doc["finished_at"] - doc["started_at"]).total_seconds() * 1000 for doc in recent]
+
+        return QueueMetrics(
+            depth=depth,
+            ready=ready,
+            oldest_ready_age_seconds=(now - oldest["run_at"]).total_seconds() if oldest else None,
+            wait_ms_p50=_percentile(wait_ms, 0.5),
+            wait_ms_p95=_percentile(wait_ms, 0.95),
+            run_ms_p50=_percentile(run_ms, 0.5),
+            run_ms_p95=_percentile(run_ms, 0.95),
+            sampled_jobs=len(recent)
+        )
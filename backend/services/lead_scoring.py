@@ -0,0 +1,315 @@
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, DeleteOne, UpdateOne
+
+from services.job_queue import job_handler
+from services.tenant_repository import TENANT_KEY, register_tenant_indexes
+
+logger = logging.getLogger(__name__)
+
+# Leads scored per feature-matrix batch
+SCORING_BATCH_SIZE = 5000
+# Overlap between runs so writes stamped just before a run are not missed
+SCORING_WATERMARK_LAG = timedelta(minutes=1)
+# JSON file with {"model": "rules" | "logistic", "weights": {...}, "bias": ..., "version": ...}
+LEAD_SCORING_MODEL_FILE = os.environ.get("LEAD_SCORING_MODEL_FILE")
+SCORING_STATE_ID = "lead_scores"
+RECENT_WINDOW = timedelta(days=30)
+# Recency features stop growing after this many days
+MAX_RECENCY_DAYS = 365.0
+
+FREE_EMAIL_DOMAINS = {"gmail.com", "yahoo.com", "hotmail.com", "outlook.com", "icloud.com", "aol.com", "proton.me"}
+PAID_SOURCES = {"google_ads", "facebook_ads", "meta_ads", "linkedin_ads", "tiktok_ads", "paid"}
+REFERRAL_SOURCES = {"referral", "partner", "word_of_mouth"}
+
+# Column order of the feature matrix; model weights are keyed by these names
+FEATURES = [
+    "status_qualified",
+    "status_won",
+    "business_email",
+    "has_phone",
+    "source_paid",
+    "source_referral",
+    "log_age_days",
+    "log_touchpoints",
+    "log_touchpoints_30d",
+    "days_since_touch",
+    "log_comments",
+    "log_comments_30d",
+]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+register_tenant_indexes("leads", [("id", ASCENDING)])
+register_tenant_indexes("lead_touchpoints", [("lead_ref", ASCENDING), ("occurred_at", -1)])
+register_tenant_indexes("lead_scores", [("lead_ref", ASCENDING)], [("score", DESCENDING)])
+
+
+class ActivityStats:
+    """Per-lead counts for one activity collection, aligned with a lead batch"""
+
+    def __init__(self, size: int):
+        self.total = np.zeros(size, dtype=np.float32)
+        self.recent = np.zeros(size, dtype=np.float32)
+        # Days since the latest activity; MAX_RECENCY_DAYS when there is none
+        self.days_since_last = np.full(size, MAX_RECENCY_DAYS, dtype=np.float32)
+
+
+def build_features(leads: Sequence[dict], touchpoints: ActivityStats, comments: ActivityStats, now: datetime) -> np.ndarray:
+    """Feature matrix (one row per lead, columns as FEATURES).
+
+    Only the per-lead attribute lookups are Python loops; everything else is
+    column-wise NumPy. Ages are whole days so an unchanged lead keeps the
+    same features for the rest of the day.
+    """
+    size = len(leads)
+    statuses = np.array([lead.get("status") or "" for lead in leads])
+    sources = [(lead.get("source") or "").lower() for lead in leads]
+    domains = [(lead.get("email") or "").rpartition("@")[2].lower() for lead in leads]
+    created = np.array(
+        [(now - (lead.get("created_at") or now)).days for lead in leads], dtype=np.float32
+    )
+
+    X = np.empty((size, len(FEATURES)), dtype=np.float32)
+    X[:, FEATURE_INDEX["status_qualified"]] = statuses == "Qualified"
+    X[:, FEATURE_INDEX["status_won"]] = statuses == "Won"
+    X[:, FEATURE_INDEX["business_email"]] = [bool(d) and d not in FREE_EMAIL_DOMAINS for d in domains]
+    X[:, FEATURE_INDEX["has_phone"]] = [bool(lead.get("phone")) for lead in leads]
+    X[:, FEATURE_INDEX["source_paid"]] = [s in PAID_SOURCES for s in sources]
+    X[:, FEATURE_INDEX["source_referral"]] = [s in REFERRAL_SOURCES for s in sources]
+    X[:, FEATURE_INDEX["log_age_days"]] = np.log1p(np.clip(created, 0, None))
+    X[:, FEATURE_INDEX["log_touchpoints"]] = np.log1p(touchpoints.total)
+    X[:, FEATURE_INDEX["log_touchpoints_30d"]] = np.log1p(touchpoints.recent)
+    X[:, FEATURE_INDEX["days_since_touch"]] = touchpoints.days_since_last / MAX_RECENCY_DAYS
+    X[:, FEATURE_INDEX["log_comments"]] = np.log1p(comments.total)
+    X[:, FEATURE_INDEX["log_comments_30d"]] = np.log1p(comments.recent)
+    return X
+
+
+def feature_hashes(X: np.ndarray) -> List[str]:
+    """Stable per-row fingerprint of the rounded features"""
+    rounded = np.ascontiguousarray(np.round(X, 4), dtype=np.float32)
+    return [hashlib.blake2b(row.tobytes(), digest_size=8).hexdigest() for row in rounded]
+
+
+class ScoringModel:
+    """Maps a feature matrix to scores in [0, 1]"""
+
+    name = "base"
+
+    def __init__(self, weights: Dict[str, float], bias: float = 0.0, version: int = 1):
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown lead features: {', '.join(sorted(unknown))}")
+        self.weights = np.array([weights.get(name, 0.0) for name in FEATURES], dtype=np.float32)
+        self.bias = np.float32(bias)
+        self.version = version
+
+    @property
+    def key(self) -> str:
+        """Changes whenever the model would score differently, forcing a full rescore"""
+        raw = f"{self.name}|{self.version}|{self.bias}|{self.weights.tobytes().hex()}"
+        return f"{self.name}-v{self.version}-{hashlib.sha256(raw.encode()).hexdigest()[:8]}"
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class WeightedRulesModel(ScoringModel):
+    """Points per feature, normalised by the maximum reachable points"""
+
+    name = "rules"
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        points = X @ self.weights + self.bias
+        return np.clip(points / max(float(self.weights.clip(min=0).sum()), 1e-9), 0.0, 1.0)
+
+
+class LogisticModel(ScoringModel):
+    """Conversion probability from logistic regression weights"""
+
+    name = "logistic"
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-(X @ self.weights + self.bias)))
+
+
+MODELS = {model.name: model for model in (WeightedRulesModel, LogisticModel)}
+
+DEFAULT_RULE_WEIGHTS = {
+    "status_qualified": 3.0,
+    "status_won": 5.0,
+    "business_email": 1.5,
+    "has_phone": 1.0,
+    "source_paid": 0.5,
+    "source_referral": 1.5,
+    "log_touchpoints": 1.0,
+    "log_touchpoints_30d": 1.5,
+    "days_since_touch": -2.0,
+    "log_comments": 0.5,
+    "log_comments_30d": 1.0,
+}
+
+
+def load_model() -> ScoringModel:
+    """The configured model, or the default weighted rules"""
+    if not LEAD_SCORING_MODEL_FILE:
+        return WeightedRulesModel(DEFAULT_RULE_WEIGHTS)
+    with open(LEAD_SCORING_MODEL_FILE) as f:
+        spec = json.load(f)
+    model_cls = MODELS.get(spec.get("model"))
+    if model_cls is None:
+        raise ValueError(f"Unknown lead scoring model {spec.get('model')!r}")
+    return model_cls(spec["weights"], spec.get("bias", 0.0), spec.get("version", 1))
+
+
+class LeadScorer:
+    """Incrementally (re)scores leads into lead_scores.
+
+    A lead is rescored when it, its touchpoints or its comments were written
+    since the last run, when its score is from an earlier day (ages and
+    recency move daily) or from a different model. Scores whose rounded
+    features did not change are not rewritten. Scores of deleted leads are
+    dropped by the daily pass.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, model: Optional[ScoringModel] = None):
+        self.db = db
+        self.model = model or load_model()
+
+    async def ensure_indexes(self) -> None:
+        # Cross-tenant change detection for the scoring job
+        await self.db.leads.create_index("updated_at")
+        await self.db.leads.create_index("created_at")
+        await self.db.lead_comments.create_index("created_at")
+        await self.db.lead_touchpoints.create_index("created_at")
+        await self.db.lead_scores.create_index([("scored_day", ASCENDING), ("model", ASCENDING)])
+
+    async def _changed_since(self, watermark: Optional[datetime], today: str) -> Dict[str, Set[str]]:
+        """Lead refs per tenant that need scoring"""
+        candidates: Dict[str, Set[str]] = {}
+
+        def add(tenant_id: Optional[str], lead_ref: Optional[str]) -> None:
+            if tenant_id and lead_ref:
+                candidates.setdefault(tenant_id, set()).add(lead_ref)
+
+        projection = {"_id": 0, TENANT_KEY: 1, "id": 1}
+        lead_query = {} if watermark is None else {
+            "$or": [{"updated_at": {"$gte": watermark}}, {"created_at": {"$gte": watermark}}]
+        }
+        async for doc in self.db.leads.find(lead_query, projection):
+            add(doc.get(TENANT_KEY), doc.get("id"))
+
+        if watermark is not None:
+            for collection in ("lead_comments", "lead_touchpoints"):
+                cursor = self.db[collection].find(
+                    {"created_at": {"$gte": watermark}}, {"_id": 0, TENANT_KEY: 1, "lead_ref": 1}
+                )
+                async for doc in cursor:
+                    add(doc.get(TENANT_KEY), doc.get("lead_ref"))
+
+        stale = {"$or": [{"scored_day": {"$ne": today}}, {"model": {"$ne": self.model.key}}]}
+        async for doc in self.db.lead_scores.find(stale, {"_id": 0, TENANT_KEY: 1, "lead_ref": 1}):
+            add(doc.get(TENANT_KEY), doc.get("lead_ref"))
+        return candidates
+
+    async def _activity(self, collection: str, time_field: str, tenant_id: str, refs: List[str], now: datetime) -> ActivityStats:
+        stats = ActivityStats(len(refs))
+        position = {ref: i for i, ref in enumerate(refs)}
+        cursor = self.db[collection].aggregate([
+            {"$match": {TENANT_KEY: tenant_id, "lead_ref": {"$in": refs}}},
+            {"$group": {
+                "_id": "$lead_ref",
+                "total": {"$sum": 1},
+                "recent": {"$sum": {"$cond": [{"$gte": [f"${time_field}", now - RECENT_WINDOW]}, 1, 0]}},
+                "last": {"$max": f"${time_field}"},
+            }},
+        ])
+        async for row in cursor:
+            i = position[row["_id"]]
+            stats.total[i] = row["total"]
+            stats.recent[i] = row["recent"]
+            if row.get("last"):
+                stats.days_since_last[i] = min((now - row["last"]).days, MAX_RECENCY_DAYS)
+        return stats
+
+    async def _score_batch(self, tenant_id: str, refs: List[str], now: datetime, today: str) -> Tuple[int, int]:
+        leads = await self.db.leads.find(
+            {TENANT_KEY: tenant_id, "id": {"$in": refs}}, {"_id": 0}
+        ).to_list(None)
+        existing = {
+            doc["lead_ref"]: doc
+            for doc in await self.db.lead_scores.find(
+                {TENANT_KEY: tenant_id, "lead_ref": {"$in": refs}},
+                {"_id": 0, "lead_ref": 1, "feature_hash": 1, "model": 1}
+            ).to_list(None)
+        }
+        found = [lead["id"] for lead in leads]
+        operations = [
+            DeleteOne({TENANT_KEY: tenant_id, "lead_ref": ref})
+            for ref in set(existing) - set(found)
+        ]
+
+        rescored = 0
+        if leads:
+            touchpoints = await self._activity("lead_touchpoints", "occurred_at", tenant_id, found, now)
+            comments = await self._activity("lead_comments", "created_at", tenant_id, found, now)
+
+            def compute():
+                X = build_features(leads, touchpoints, comments, now)
+                return self.model.score(X), feature_hashes(X)
+
+            scores, hashes = await asyncio.to_thread(compute)
+            for ref, score, feature_hash in zip(found, scores.tolist(), hashes):
+                update = {"scored_day": today, "scored_at": now}
+                previous = existing.get(ref)
+                if not previous or previous.get("feature_hash") != feature_hash or previous.get("model") != self.model.key:
+                    update.update({"score": round(score * 100, 2), "feature_hash": feature_hash, "model": self.model.key})
+                    rescored += 1
+                operations.append(UpdateOne(
+                    {TENANT_KEY: tenant_id, "lead_ref": ref},
+                    {"$set": update, "$setOnInsert": {TENANT_KEY: tenant_id, "lead_ref": ref}},
+                    upsert=True
+                ))
+
+        if operations:
+            await self.db.lead_scores.bulk_write(operations, ordered=False)
+        return len(found), rescored
+
+    async def run(self, now: Optional[datetime] = None) -> dict:
+        now = now or datetime.utcnow()
+        today = now.strftime("%Y-%m-%d")
+        state = await self.db.scoring_state.find_one({"_id": SCORING_STATE_ID}) or {}
+        candidates = await self._changed_since(state.get("watermark"), today)
+
+        examined = rescored = 0
+        for tenant_id, refs in candidates.items():
+            refs = sorted(refs)
+            for i in range(0, len(refs), SCORING_BATCH_SIZE):
+                batch_examined, batch_rescored = await self._score_batch(
+                    tenant_id, refs[i:i + SCORING_BATCH_SIZE], now, today
+                )
+                examined += batch_examined
+                rescored += batch_rescored
+
+        await self.db.scoring_state.update_one(
+            {"_id": SCORING_STATE_ID},
+            {"$set": {"watermark": now - SCORING_WATERMARK_LAG, "model": self.model.key}},
+            upsert=True
+        )
+        if rescored:
+            logger.info(f"Scored {examined} leads across {len(candidates)} tenants, {rescored} changed")
+        return {"examined": examined, "rescored": rescored, "tenants": len(candidates), "model": self.model.key}
+
+
+@job_handler("leads.score")
+async def score_leads(db: AsyncIOMotorDatabase, payload: dict) -> dict:
+    """Scheduled incremental lead scoring"""
+    return await LeadScorer(db).run()
@@ -0,0 +1,133 @@
+from typing import Dict, List, Optional
+
+from models.user import User, UserRole
+
+# Mirrors PERMISSION_MODULES / PERMISSION_ACTIONS in the frontend ClientDashboard.
+# Order matters: each (module, action) pair owns one bit, so only append.
+PERMISSION_MODULES = [
+    "dashboard",
+    "leads",
+    "campaigns",
+    "reports",
+    "integrations",
+    "attribution",
+    "analytics",
+    "user_management",
+]
+PERMISSION_ACTIONS = ["read", "write", "delete", "admin"]
+
+_MODULE_INDEX = {module: i for i, module in enumerate(PERMISSION_MODULES)}
+_ACTION_INDEX = {action: i for i, action in enumerate(PERMISSION_ACTIONS)}
+_MODULE_WIDTH = len(PERMISSION_ACTIONS)
+_MODULE_MASK = (1 << _MODULE_WIDTH) - 1
+
+ALL_PERMISSIONS = (1 << (len(PERMISSION_MODULES) * _MODULE_WIDTH)) - 1
+NO_PERMISSIONS = 0
+
+# Mirrors getRolePermissions() in frontend/src/utils/auth.ts
+ROLE_TEMPLATES: Dict[str, Dict[str, List[str]]] = {
+    "Social Media Manager": {
+        "dashboard": ["read"],
+        "leads": ["read", "write"],
+        "campaigns": ["read", "write"],
+        "reports": ["read"],
+        "integrations": ["read"],
+        "attribution": ["read"],
+        "analytics": ["read"],
+        "user_management": [],
+    },
+    "Analytics Viewer": {
+        "dashboard": ["read"],
+        "leads": ["read"],
+        "campaigns": ["read"],
+        "reports": ["read"],
+        "integrations": ["read"],
+        "attribution": ["read"],
+        "analytics": ["read"],
+        "user_management": [],
+    },
+    "Campaign Manager": {
+        "dashboard": ["read"],
+        "leads": ["read", "write"],
+        "campaigns": ["read", "write", "delete"],
+        "reports": ["read"],
+        "integrations": ["read", "write"],
+        "attribution": ["read"],
+        "analytics": ["read"],
+        "user_management": [],
+    },
+    "Lead Manager": {
+        "dashboard": ["read"],
+        "leads": ["read", "write", "delete"],
+        "campaigns": ["read"],
+        "reports": ["read"],
+        "integrations": ["read"],
+        "attribution": ["read"],
+        "analytics": ["read"],
+        "user_management": [],
+    },
+    "Full Access": {
+        "dashboard": ["read"],
+        "leads": ["read", "write", "delete"],
+        "campaigns": ["read", "write", "delete"],
+        "reports": ["read"],
+        "integrations": ["read", "write"],
+        "attribution": ["read"],
+        "analytics": ["read"],
+        "user_management": [],
+    },
+}
+
+
+def permission_bit(permission: str) -> int:
+    """Resolve "module:action" to its single-bit mask"""
+    module, _, action = permission.partition(":")
+    if module not in _MODULE_INDEX or action not in _ACTION_INDEX:
+        raise ValueError(f"Unknown permission: {permission}")
+    return 1 << (_MODULE_INDEX[module] * _MODULE_WIDTH + _ACTION_INDEX[action])
+
+
+def _compile_module(actions) -> int:
+    """Action bits for one module, relative to the module's offset"""
+    bits = 0
+    for action in actions or ():
+        index = _ACTION_INDEX.get(action)
+        if index is not None:
+            bits |= 1 << index
+    return bits
+
+
+def compile_permissions(permissions: Optional[dict], base: int = NO_PERMISSIONS) -> int:
+    """Compile a {module: [actions]} dict on top of a base mask.
+
+    A module present in ``permissions`` replaces that module's bits in
+    ``base`` entirely, which is how per-subuser overrides narrow or widen
+    their role template. Unknown modules and actions are ignored.
+    """
+    mask = base
+    for module, actions in (permissions or {}).items():
+        index = _MODULE_INDEX.get(module)
+        if index is None:
+            continue
+        offset = index * _MODULE_WIDTH
+        mask &= ~(_MODULE_MASK << offset)
+        mask |= _compile_module(actions) << offset
+    return mask
+
+
+# Compiled once; the templates are fixed in code like their frontend twin
+_role_masks: Dict[str, int] = {
+    name: compile_permissions(template) for name, template in ROLE_TEMPLATES.items()
+}
+
+
+def compile_user_permissions(user: User) -> int:
+    """Compile a user's effective permissions into one bitset"""
+    if user.role in (UserRole.ADMIN, UserRole.CLIENT):
+        # Admins have everything; clients have everything in their workspace
+        return ALL_PERMISSIONS
+    if user.role != UserRole.SUBUSER or not user.is_active:
+        return NO_PERMISSIONS
+    base = _role_masks.get(user.role_name or "", NO_PERMISSIONS)
+    return compile_permissions(user.permissions, base)
+
@@ -0,0 +1,334 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import hashlib
+import json
+import logging
+import os
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from models.report import ReportResult
+from services.job_queue import job_handler
+from services.tenant_repository import TenantRepository, register_tenant_indexes
+
+logger = logging.getLogger(__name__)
+
+DAY_FORMAT = "%Y-%m-%d"
+MAX_REPORT_DAYS = 366
+PRECOMPUTE_TOP_N = 50
+PRECOMPUTE_VIEW_WINDOW = timedelta(days=7)
+# Writes nobody signals (see mark_data_changed) show up within this long
+REPORT_MAX_STALENESS = timedelta(seconds=int(os.environ.get("REPORT_MAX_STALENESS_SECONDS", "300")))
+# Cached reports not viewed, and partials not refreshed, for this long are dropped
+REPORT_CACHE_RETENTION_SECONDS = int(os.environ.get("REPORT_CACHE_RETENTION_SECONDS", str(14 * 24 * 3600)))
+
+
+class ReportDefinition:
+    """A report computed as per-day partial sums grouped by one field.
+
+    Per-day partials are merged into the final rows, so only days whose
+    data version moved since the last run are re-aggregated.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        title: str,
+        collection: str,
+        time_field: str,
+        group_by: str,
+        metrics: Dict[str, Optional[str]],
+        finalize: Optional[Callable[[List[dict]], List[dict]]] = None,
+        version: int = 1
+    ):
+        self.name = name
+        self.title = title
+        self.collection = collection
+        self.time_field = time_field
+        self.group_by = group_by
+        self.metrics = metrics  # output name -> summed field, None counts documents
+        self.finalize = finalize
+        self.version = version
+
+    def pipeline(self, start: datetime, end: datetime) -> List[dict]:
+        """Aggregate [start, end) into per-day, per-group partial sums"""
+        group = {
+            "_id": {
+                "day": {"$dateToString": {"format": DAY_FORMAT, "date": f"${self.time_field}"}},
+                "key": {"$ifNull": [f"${self.group_by}", "unknown"]},
+            }
+        }
+        for metric, field in self.metrics.items():
+            group[metric] = {"$sum": f"${field}" if field else 1}
+        return [
+            {"$match": {self.time_field: {"$gte": start, "$lt": end}}},
+            {"$group": group},
+        ]
+
+
+FUNNEL_STAGES = ["New", "Qualified", "Won"]
+
+
+def _funnel(rows: List[dict]) -> List[dict]:
+    """Order lead statuses as a funnel; a lead counts as reaching every earlier stage"""
+    counts = {row["key"]: row["leads"] for row in rows}
+    funnel = []
+    reached = sum(counts.get(stage, 0) for stage in FUNNEL_STAGES)
+    previous = None
+    for stage in FUNNEL_STAGES:
+        row = {"key": stage, "leads": reached}
+        row["conversion_rate"] = round(reached / previous, 4) if previous else None
+        funnel.append(row)
+        previous = reached
+        reached -= counts.get(stage, 0)
+    return funnel
+
+
+REPORTS: Dict[str, ReportDefinition] = {
+    definition.name: definition
+    for definition in [
+        ReportDefinition(
+            "spend", "Spend by channel", "campaign_metrics", "date", "channel",
+            {"spend": "spend", "impressions": "impressions", "clicks": "clicks", "conversions": "conversions"},
+        ),
+        ReportDefinition(
+            "leads_by_source", "Leads by source", "leads", "created_at", "source", {"leads": None},
+        ),
+        ReportDefinition(
+            "conversion_funnel", "Lead conversion funnel", "leads", "created_at", "status",
+            {"leads": None}, finalize=_funnel,
+        ),
+    ]
+}
+
+# Source collection -> the time field its reports bucket days by
+REPORT_SOURCES: Dict[str, str] = {definition.collection: definition.time_field for definition in REPORTS.values()}
+
+register_tenant_indexes("campaign_metrics", [("date", ASCENDING)])
+register_tenant_indexes("report_data_versions", [("collection", ASCENDING), ("day", ASCENDING)])
+register_tenant_indexes("report_partials", [("report", ASCENDING), ("day", ASCENDING)])
+register_tenant_indexes("report_cache", [("key", ASCENDING)])
+
+
+def _day(value: datetime) -> str:
+    return value.strftime(DAY_FORMAT)
+
+
+def _days(start: date, end: date) -> List[str]:
+    """Every day in [start, end] as a partial key"""
+    return [_day(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+
+
+def content_key(definition: ReportDefinition, tenant_id: str, start: date, end: date) -> str:
+    """Cache key identifying a report's parameters"""
+    raw = f"{definition.name}|v{definition.version}|{tenant_id}|{start.isoformat()}|{end.isoformat()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def mark_data_changed(db: AsyncIOMotorDatabase, tenant_id: str, collection: str, when: datetime) -> None:
+    """Record that report source data for ``when``'s day changed.
+
+    Call after writing to a report source collection, passing the document's
+    time field; the change-stream watcher does so for writes from other
+    processes. Reads only compare these versions, so a write nobody signals
+    shows up once the cached day is REPORT_MAX_STALENESS old.
+    """
+    await TenantRepository(db, "report_data_versions", tenant_id).update_one(
+        {"collection": collection, "day": _day(when)},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+class ReportEngine:
+    def __init__(self, db: AsyncIOMotorDatabase, tenant_id: str):
+        self.db = db
+        self.tenant_id = tenant_id
+        self.versions = TenantRepository(db, "report_data_versions", tenant_id)
+        self.partials = TenantRepository(db, "report_partials", tenant_id)
+        self.cache = TenantRepository(db, "report_cache", tenant_id)
+
+    @staticmethod
+    async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+        """Cross-tenant index used to pick reports to pre-compute, and expiry of unused entries"""
+        await db.report_cache.create_index([("last_viewed_at", DESCENDING), ("views", DESCENDING)])
+        # Default ranges end today, so every day adds cache keys; drop the ones nobody opens
+        await db.report_cache.create_index(
+            "last_viewed_at", expireAfterSeconds=REPORT_CACHE_RETENTION_SECONDS, name="report_cache_ttl"
+        )
+        await db.report_partials.create_index(
+            "refreshed_at", expireAfterSeconds=REPORT_CACHE_RETENTION_SECONDS, name="report_partials_ttl"
+        )
+
+    @staticmethod
+    def get_definition(name: str) -> ReportDefinition:
+        definition = REPORTS.get(name)
+        if not definition:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Report not found"
+            )
+        return definition
+
+    async def _data_versions(self, definition: ReportDefinition, days: List[str]) -> Dict[str, int]:
+        """Current data version of each day; days never marked changed are 0"""
+        cursor = self.versions.find(
+            {"collection": definition.collection, "day": {"$gte": days[0], "$lte": days[-1]}},
+            {"_id": 0, "day": 1, "version": 1}
+        )
+        versions = {doc["day"]: doc["version"] for doc in await cursor.to_list(len(days))}
+        return {day: versions.get(day, 0) for day in days}
+
+    async def _refresh_partials(
+        self, definition: ReportDefinition, days: List[str], versions: Dict[str, int]
+    ) -> Dict[str, List[dict]]:
+        """Load per-day partials, re-aggregating days whose version moved or that are too old"""
+        cursor = self.partials.find(
+            {"report": definition.name, "day": {"$gte": days[0], "$lte": days[-1]}},
+            {"_id": 0, "day": 1, "data_version": 1, "rows": 1, "report_version": 1, "refreshed_at": 1}
+        )
+        now = datetime.utcnow()
+        partials = {}
+        for doc in await cursor.to_list(len(days)):
+            if (
+                doc.get("data_version") == versions[doc["day"]]
+                and doc.get("report_version") == definition.version
+                and doc.get("refreshed_at", datetime.min) > now - REPORT_MAX_STALENESS
+            ):
+                partials[doc["day"]] = doc["rows"]
+
+        stale = [day for day in days if day not in partials]
+        if not stale:
+            return partials
+
+        # One aggregation over the span of stale days; fresh days in between are ignored
+        span_start = datetime.strptime(stale[0], DAY_FORMAT)
+        span_end = datetime.strptime(stale[-1], DAY_FORMAT) + timedelta(days=1)
+        fresh_rows: Dict[str, List[dict]] = {day: [] for day in stale}
+        source = TenantRepository(self.db, definition.collection, self.tenant_id)
+        async for row in source.aggregate(definition.pipeline(span_start, span_end)):
+            day = row["_id"]["day"]
+            if day in fresh_rows:
+                fresh_rows[day].append({
+                    "key": str(row["_id"]["key"]),
+                    **{metric: row[metric] for metric in definition.metrics},
+                })
+
+        await self.partials.collection.bulk_write([
+            UpdateOne(
+                self.partials.scope({"report": definition.name, "day": day}),
+                {"$set": {
+                    "rows": rows,
+                    "data_version": versions[day],
+                    "report_version": definition.version,
+                    "refreshed_at": now,
+                }},
+                upsert=True
+            )
+            for day, rows in fresh_rows.items()
+        ], ordered=False)
+        partials.update(fresh_rows)
+        logger.info(f"Report {definition.name} refreshed {len(stale)}/{len(days)} days for tenant {self.tenant_id}")
+        return partials
+
+    @staticmethod
+    def _merge(definition: ReportDefinition, partials: Dict[str, List[dict]]) -> Tuple[List[dict], dict]:
+        merged: Dict[str, dict] = {}
+        for day_rows in partials.values():
+            for row in day_rows:
+                target = merged.setdefault(row["key"], {metric: 0 for metric in definition.metrics})
+                for metric in definition.metrics:
+                    target[metric] += row[metric]
+        first_metric = next(iter(definition.metrics))
+        rows = sorted(
+            ({"key": key, **values} for key, values in merged.items()),
+            key=lambda row: row[first_metric],
+            reverse=True
+        )
+        totals = {metric: sum(row[metric] for row in rows) for metric in definition.metrics}
+        if definition.finalize:
+            rows = definition.finalize(rows)
+        return rows, totals
+
+    async def generate(self, name: str, start: date, end: date, count_view: bool = True) -> ReportResult:
+        """Return a report, from cache unless a covered day was marked changed.
+
+        A hit reads only the data versions and the cache entry; entries older
+        than REPORT_MAX_STALENESS are recomputed to pick up unsignalled writes.
+        """
+        definition = self.get_definition(name)
+        if end < start or (end - start).days >= MAX_REPORT_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Date range must be 1-{MAX_REPORT_DAYS} days"
+            )
+
+        days = _days(start, end)
+        key = content_key(definition, self.tenant_id, start, end)
+        versions = await self._data_versions(definition, days)
+        fingerprint = hashlib.sha256(
+            json.dumps(sorted(versions.items())).encode("utf-8")
+        ).hexdigest()
+
+        now = datetime.utcnow()
+        view = {"$inc": {"views": 1}, "$set": {"last_viewed_at": now}} if count_view else None
+        cached = await self.cache.find_one({"key": key}, {"_id": 0})
+        if (
+            cached and cached["fingerprint"] == fingerprint
+            and cached.get("computed_at", datetime.min) > now - REPORT_MAX_STALENESS
+        ):
+            if view:
+                await self.cache.update_one({"key": key}, view)
+            return ReportResult(**cached["result"], cached=True)
+
+        partials = await self._refresh_partials(definition, days, versions)
+        rows, totals = self._merge(definition, partials)
+        result = ReportResult(
+            name=definition.name,
+            title=definition.title,
+            start=start,
+            end=end,
+            rows=rows,
+            totals=totals,
+            computed_at=datetime.utcnow()
+        )
+
+        update = {"$set": {
+            "report": definition.name,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "fingerprint": fingerprint,
+            "computed_at": result.computed_at,
+            "result": json.loads(result.model_dump_json(exclude={"cached"})),
+        }}
+        if view:
+            update["$inc"] = view["$inc"]
+            update["$set"].update(view["$set"])
+        else:
+            # Entries need a view time for the retention TTL
+            update["$setOnInsert"] = {"last_viewed_at": now}
+        await self.cache.update_one({"key": key}, update, upsert=True)
+        return result
+
+
+@job_handler("reports.precompute")
+async def precompute_popular_reports(db: AsyncIOMotorDatabase, payload: dict) -> dict:
+    """Refresh the most-viewed cached reports so opening them stays a cache read"""
+    since = datetime.utcnow() - PRECOMPUTE_VIEW_WINDOW
+    limit = payload.get("limit", PRECOMPUTE_TOP_N)
+    popular = await db.report_cache.find(
+        {"last_viewed_at": {"$gte": since}},
+        {"_id": 0, "tenant_id": 1, "report": 1, "start": 1, "end": 1}
+    ).sort("views", DESCENDING).limit(limit).to_list(limit)
+
+    refreshed = 0
+    for entry in popular:
+        engine = ReportEngine(db, entry["tenant_id"])
+        result = await engine.generate(
+            entry["report"], date.fromisoformat(entry["start"]), date.fromisoformat(entry["end"]),
+            count_view=False
+        )
+        refreshed += not result.cached
+    return {"checked": len(popular), "refreshed": refreshed}
@@ -0,0 +1,178 @@
+from typing import Optional
+from datetime import datetime, timedelta
+import logging
+import os
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from models.status import StatusCheck, StatusPoint, StatusResolution, StatusSeries
+from services.job_queue import job_handler
+
+logger = logging.getLogger(__name__)
+
+# Raw points expire after this; rollups outlive them
+STATUS_RAW_TTL_SECONDS = int(os.environ.get("STATUS_RAW_TTL_SECONDS", str(7 * 24 * 3600)))
+STATUS_MINUTE_TTL_SECONDS = int(os.environ.get("STATUS_MINUTE_TTL_SECONDS", str(90 * 24 * 3600)))
+# Ranges up to this long are served from raw points
+STATUS_RAW_MAX_SPAN = timedelta(hours=1)
+# Rollup series never hold more buckets per client than this
+STATUS_MAX_POINTS = int(os.environ.get("STATUS_MAX_POINTS", "1500"))
+# Points may arrive this late and still be counted in the rollups
+DOWNSAMPLE_LAG = timedelta(minutes=1)
+
+RAW_COLLECTION = "status_checks"
+MINUTE_COLLECTION = "status_checks_minutely"
+HOUR_COLLECTION = "status_checks_hourly"
+ROLLUP_STATE_ID = "status_rollup"
+
+_BUCKET_SIZES = {
+    StatusResolution.MINUTE: timedelta(minutes=1),
+    StatusResolution.HOUR: timedelta(hours=1),
+}
+
+
+def _floor(value: datetime, unit: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    return value - (value - epoch) % unit
+
+
+class StatusService:
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        self.raw = db[RAW_COLLECTION]
+        self.minutely = db[MINUTE_COLLECTION]
+        self.hourly = db[HOUR_COLLECTION]
+
+    async def ensure_collections(self) -> None:
+        """Create the time-series collection and rollup indexes, applying TTL changes"""
+        existing = await self.db.list_collection_names(filter={"name": RAW_COLLECTION})
+        if not existing:
+            await self.db.create_collection(
+                RAW_COLLECTION,
+                timeseries={"timeField": "timestamp", "metaField": "client_name", "granularity": "seconds"},
+                expireAfterSeconds=STATUS_RAW_TTL_SECONDS
+            )
+            logger.info(f"Created time-series collection {RAW_COLLECTION}")
+        else:
+            try:
+                await self.db.command("collMod", RAW_COLLECTION, expireAfterSeconds=STATUS_RAW_TTL_SECONDS)
+            except OperationFailure as e:
+                # Pre-existing plain collection; migrate it by hand to get TTL and bucketing
+                logger.warning(f"{RAW_COLLECTION} is not a time-series collection: {e}")
+
+        await self.raw.create_index([("client_name", ASCENDING), ("timestamp", DESCENDING)])
+        await self.raw.create_index([("timestamp", DESCENDING)])
+        for rollup in (self.minutely, self.hourly):
+            await rollup.create_index([("client_name", ASCENDING), ("bucket", ASCENDING)], unique=True)
+            await rollup.create_index([("bucket", ASCENDING)])
+        await self.minutely.create_index(
+            "updated_at", expireAfterSeconds=STATUS_MINUTE_TTL_SECONDS, name="minute_ttl"
+        )
+
+    async def record(self, client_name: str) -> StatusCheck:
+        status_obj = StatusCheck(client_name=client_name)
+        await self.raw.insert_one(status_obj.dict())
+        return status_obj
+
+    async def _rollup(self, source, time_field: str, count, unit: str, target: str, start: datetime, end: datetime) -> None:
+        """Group [start, end) into ``unit`` buckets per client and upsert them into ``target``"""
+        await source.aggregate([
+            {"$match": {time_field: {"$gte": start, "$lt": end}}},
+            {"$group": {
+                "_id": {
+                    "client_name": "$client_name",
+                    "bucket": {"$dateTrunc": {"date": f"${time_field}", "unit": unit}},
+                },
+                "count": {"$sum": count},
+            }},
+            {"$project": {
+                "_id": 0,
+                "client_name": "$_id.client_name",
+                "bucket": "$_id.bucket",
+                "count": 1,
+                "updated_at": "$$NOW",
+            }},
+            {"$merge": {
+                "into": target,
+                "on": ["client_name", "bucket"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]).to_list(None)
+
+    async def downsample(self, now: Optional[datetime] = None) -> dict:
+        """Roll raw points up to per-minute, then per-hour counts.
+
+        Each run recomputes whole minutes from the previous watermark and the
+        whole hours that overlap them, so re-running is idempotent.
+        """
+        now = now or datetime.utcnow()
+        state = await self.db.rollup_state.find_one({"_id": ROLLUP_STATE_ID}) or {}
+        end = _floor(now - DOWNSAMPLE_LAG, _BUCKET_SIZES[StatusResolution.MINUTE])
+        start = state.get("minute_watermark") or end - timedelta(seconds=STATUS_RAW_TTL_SECONDS)
+        if start >= end:
+            return {"start": start, "end": end, "skipped": True}
+
+        await self._rollup(self.raw, "timestamp", 1, "minute", MINUTE_COLLECTION, start, end)
+        hour_start = _floor(start, _BUCKET_SIZES[StatusResolution.HOUR])
+        await self._rollup(self.minutely, "bucket", "$count", "hour", HOUR_COLLECTION, hour_start, end)
+
+        await self.db.rollup_state.update_one(
+            {"_id": ROLLUP_STATE_ID}, {"$set": {"minute_watermark": end}}, upsert=True
+        )
+        return {"start": start, "end": end}
+
+    @staticmethod
+    def pick_resolution(start: datetime, end: datetime, now: datetime) -> str:
+        """Finest resolution still retained at ``start`` whose bucket count fits the range"""
+        span = end - start
+        age = now - start
+        if span <= STATUS_RAW_MAX_SPAN and age <= timedelta(seconds=STATUS_RAW_TTL_SECONDS):
+            return StatusResolution.RAW
+        minute = _BUCKET_SIZES[StatusResolution.MINUTE]
+        if span / minute <= STATUS_MAX_POINTS and age <= timedelta(seconds=STATUS_MINUTE_TTL_SECONDS):
+            return StatusResolution.MINUTE
+        return StatusResolution.HOUR
+
+    async def series(
+        self, start: datetime, end: datetime, client_name: Optional[str] = None
+    ) -> StatusSeries:
+        """Status check counts over [start, end) at an automatically chosen resolution"""
+        if end <= start:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must be after start"
+            )
+        resolution = self.pick_resolution(start, end, datetime.utcnow())
+
+        if resolution == StatusResolution.RAW:
+            query = {"timestamp": {"$gte": start, "$lt": end}}
+            if client_name:
+                query["client_name"] = client_name
+            cursor = self.raw.find(query, {"_id": 0, "client_name": 1, "timestamp": 1}).sort("timestamp", ASCENDING)
+            points = [
+                StatusPoint(client_name=doc["client_name"], timestamp=doc["timestamp"], count=1)
+                async for doc in cursor
+            ]
+        else:
+            unit = _BUCKET_SIZES[resolution]
+            rollup = self.minutely if resolution == StatusResolution.MINUTE else self.hourly
+            query = {"bucket": {"$gte": _floor(start, unit), "$lt": end}}
+            if client_name:
+                query["client_name"] = client_name
+            cursor = rollup.find(query, {"_id": 0, "client_name": 1, "bucket": 1, "count": 1}).sort("bucket", ASCENDING)
+            points = [
+                StatusPoint(client_name=doc["client_name"], timestamp=doc["bucket"], count=doc["count"])
+                async for doc in cursor
+            ]
+
+        return StatusSeries(resolution=resolution, start=start, end=end, points=points)
+
+
+@job_handler("status.downsample")
+async def downsample_status_checks(db: AsyncIOMotorDatabase, payload: dict) -> dict:
+    """Scheduled rollup of raw status checks"""
+    return await StatusService(db).downsample()
@@ -0,0 +1,166 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from fastapi import HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+# Every tenant-shared document carries this field
+TENANT_KEY = "tenant_id"
+
+IndexKeys = List[Tuple[str, int]]
+
+# Secondary indexes per tenant-shared collection. Each one is created with
+# TENANT_KEY as its leading key so per-tenant queries stay range scans.
+_tenant_indexes: Dict[str, List[IndexKeys]] = {}
+
+
+def register_tenant_indexes(collection: str, *indexes: Sequence[Tuple[str, int]]) -> None:
+    """Declare the secondary indexes a tenant-shared collection needs"""
+    specs = _tenant_indexes.setdefault(collection, [])
+    for keys in indexes:
+        keys = list(keys)
+        if keys not in specs:
+            specs.append(keys)
+
+
+def tenant_index_keys(keys: Sequence[Tuple[str, int]]) -> IndexKeys:
+    """Prefix index keys with the tenant key"""
+    return [(TENANT_KEY, ASCENDING)] + [key for key in keys if key[0] != TENANT_KEY]
+
+
+async def ensure_tenant_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Create tenant-prefixed indexes for every registered collection"""
+    for collection, specs in _tenant_indexes.items():
+        if not specs:
+            await db[collection].create_index([(TENANT_KEY, ASCENDING)])
+        for keys in specs:
+            await db[collection].create_index(tenant_index_keys(keys))
+        logger.info(f"Tenant indexes ensured for {collection}")
+
+
+class TenantScopeError(HTTPException):
+    """An operation reached outside the caller's tenant; surfaces as 403"""
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
+
+# Stages that only transform the documents flowing through the pipeline.
+# Anything else may read other collections ($lookup, $graphLookup, $unionWith)
+# or write to them ($out, $merge), outside the tenant filter.
+TENANT_PIPELINE_STAGES = frozenset({
+    "$match", "$group", "$project", "$sort", "$limit", "$skip",
+    "$unwind", "$count", "$addFields", "$facet",
+})
+
+
+def _check_pipeline(pipeline: List[dict]) -> None:
+    """Raise TenantScopeError for any stage outside TENANT_PIPELINE_STAGES, inside $facet too"""
+    for stage in pipeline:
+        if not isinstance(stage, dict) or len(stage) != 1:
+            raise TenantScopeError("Malformed stage in tenant pipeline")
+        name, spec = next(iter(stage.items()))
+        if name not in TENANT_PIPELINE_STAGES:
+            raise TenantScopeError(f"Stage not allowed in tenant pipeline: {name}")
+        if name == "$facet":
+            if not isinstance(spec, dict):
+                raise TenantScopeError("Malformed $facet in tenant pipeline")
+            for facet in spec.values():
+                _check_pipeline(facet)
+
+
+# Collections mirrored from the frontend's per-client tables
+register_tenant_indexes("leads", [("status", ASCENDING)], [("created_at", -1)])
+register_tenant_indexes("lead_comments", [("lead_ref", ASCENDING), ("created_at", -1)])
+
+
+class TenantRepository:
+    """Collection wrapper that scopes every operation to a single tenant"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection: str, tenant_id: Optional[str]):
+        if not tenant_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Tenant scope required"
+            )
+        self.tenant_id = tenant_id
+        self.collection = db[collection]
+
+    def scope(self, query: Optional[dict] = None) -> dict:
+        """Add the tenant to a filter, refusing filters aimed at another tenant"""
+        query = dict(query or {})
+        requested = query.get(TENANT_KEY, self.tenant_id)
+        if requested != self.tenant_id:
+            raise TenantScopeError(f"Query targets tenant {requested!r} outside scope {self.tenant_id!r}")
+        query[TENANT_KEY] = self.tenant_id
+        return query
+
+    def _guard_update(self, update: dict) -> dict:
+        """Refuse updates that would move a document to another tenant.
+
+        Only $set and $setOnInsert may name the tenant key, and only with the
+        caller's own tenant. Pipeline updates can compute the key from other
+        fields, so they are rejected rather than inspected.
+        """
+        if not isinstance(update, dict):
+            raise TenantScopeError("Pipeline updates are not allowed on tenant-scoped collections")
+        for operator, fields in update.items():
+            if not isinstance(fields, dict):
+                continue
+            if operator == "$rename" and TENANT_KEY in fields.values():
+                raise TenantScopeError(f"Update $rename may not target {TENANT_KEY}")
+            if TENANT_KEY not in fields:
+                continue
+            if operator not in ("$set", "$setOnInsert") or fields[TENANT_KEY] != self.tenant_id:
+                raise TenantScopeError(f"Update {operator} may not change {TENANT_KEY}")
+        return update
+
+    def find(self, query: Optional[dict] = None, *args, **kwargs):
+        return self.collection.find(self.scope(query), *args, **kwargs)
+
+    async def find_one(self, query: Optional[dict] = None, *args, **kwargs) -> Optional[dict]:
+        return await self.collection.find_one(self.scope(query), *args, **kwargs)
+
+    async def count_documents(self, query: Optional[dict] = None, **kwargs) -> int:
+        return await self.collection.count_documents(self.scope(query), **kwargs)
+
+    async def insert_one(self, document: dict, **kwargs):
+        document = self.scope(document)
+        return await self.collection.insert_one(document, **kwargs)
+
+    async def insert_many(self, documents: List[dict], **kwargs):
+        return await self.collection.insert_many([self.scope(doc) for doc in documents], **kwargs)
+
+    async def update_one(self, query: dict, update: dict, **kwargs):
+        return await self.collection.update_one(self.scope(query), self._guard_update(update), **kwargs)
+
+    async def update_many(self, query: dict, update: dict, **kwargs):
+        return await self.collection.update_many(self.scope(query), self._guard_update(update), **kwargs)
+
+    async def find_one_and_update(self, query: dict, update: dict, **kwargs) -> Optional[dict]:
+        return await self.collection.find_one_and_update(
+            self.scope(query), self._guard_update(update), **kwargs
+        )
+
+    async def delete_one(self, query: dict, **kwargs):
+        return await self.collection.delete_one(self.scope(query), **kwargs)
+
+    async def delete_many(self, query: dict, **kwargs):
+        return await self.collection.delete_many(self.scope(query), **kwargs)
+
+    def aggregate(self, pipeline: List[dict], **kwargs):
+        """Run a pipeline whose first stage is the tenant $match.
+
+        Only TENANT_PIPELINE_STAGES may follow, so nothing reads or writes
+        past that filter.
+        """
+        pipeline = list(pipeline)
+        if pipeline and list(pipeline[0]) == ["$match"]:
+            pipeline[0] = {"$match": self.scope(pipeline[0]["$match"])}
+        else:
+            pipeline.insert(0, {"$match": self.scope()})
+        _check_pipeline(pipeline[1:])
+        return self.collection.aggregate(pipeline, **kwargs)
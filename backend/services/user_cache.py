@@ -0,0 +1,95 @@
+from typing import Dict, Optional
+import os
+import time
+
+from models.user import User, UserResponse, UserRole
+from services.permissions import compile_user_permissions
+from utils.etag import make_weak_etag
+
+# How long an authenticated user stays cached before we go back to Mongo
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CachedUser:
+    """An authenticated user plus everything derived from it per request"""
+
+    __slots__ = ("user", "etag", "expires_at", "_response", "_body", "_permissions")
+
+    def __init__(self, user: User, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.user = user
+        self.etag = make_weak_etag(user.id, user.updated_at, user.last_login)
+        self.expires_at = time.monotonic() + ttl
+        self._response: Optional[UserResponse] = None
+        self._body: Optional[bytes] = None
+        self._permissions: Optional[int] = None
+
+    @property
+    def tenant_id(self) -> Optional[str]:
+        """Client workspace this user belongs to; admins have none"""
+        if self.user.role == UserRole.CLIENT:
+            return self.user.id
+        if self.user.role == UserRole.SUBUSER:
+            return self.user.parent_client_id
+        return None
+
+    @property
+    def permissions(self) -> int:
+        """Compiled permission bitset, built once per cache entry"""
+        if self._permissions is None:
+            self._permissions = compile_user_permissions(self.user)
+        return self._permissions
+
+    @property
+    def response(self) -> UserResponse:
+        """UserResponse built once per cache entry"""
+        if self._response is None:
+            self._response = UserResponse(**self.user.dict())
+        return self._response
+
+    @property
+    def body(self) -> bytes:
+        """Serialized UserResponse JSON, built once per cache entry"""
+        if self._body is None:
+            self._body = self.response.model_dump_json().encode("utf-8")
+        return self._body
+
+
+class UserCache:
+    """In-process TTL cache of users keyed by user id"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedUser] = {}
+
+    def get(self, user_id: str) -> Optional[CachedUser]:
+        """Return a live entry or None"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._entries.pop(user_id, None)
+            return None
+        return entry
+
+    def put(self, user: User) -> CachedUser:
+        """Cache a freshly loaded user"""
+        if len(self._entries) >= self.max_entries:
+            # Dicts keep insertion order, so this drops the oldest entry
+            self._entries.pop(next(iter(self._entries)), None)
+        entry = CachedUser(user, self.ttl)
+        self._entries.pop(user.id, None)
+        self._entries[user.id] = entry
+        return entry
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user after it changed in the database"""
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Shared by the auth dependencies and AuthService
+user_cache = UserCache()
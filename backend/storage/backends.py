@@ -0,0 +1,40 @@
+from typing import Tuple, Union
+import logging
+import os
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from storage.memory import MemoryClient, MemoryDatabase, UnsupportedOperation
+
+logger = logging.getLogger(__name__)
+
+# "mongo" (Motor against MONGO_URL) or "memory" (in-process, nothing persisted)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo")
+
+Database = Union[AsyncIOMotorDatabase, MemoryDatabase]
+
+
+def open_storage(db_name: str, backend: str = STORAGE_BACKEND, **client_kwargs) -> Tuple[object, Database]:
+    """Client and database for the configured backend.
+
+    Services are written against the Motor API. The memory backend
+    implements its CRUD, index, cursor and aggregation subset with hash
+    indexes, so the API runs without a mongod. Change streams, $lookup and
+    anything else it lacks raise UnsupportedOperation, answered as 501.
+    """
+    if backend == "memory":
+        logger.warning("Using in-memory storage; data is lost on restart")
+        client = MemoryClient()
+        return client, client[db_name]
+    if backend != "mongo":
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"], **client_kwargs)
+    return client, client[db_name]
+
+
+async def unsupported_operation_handler(request: Request, exc: UnsupportedOperation) -> JSONResponse:
+    """Map features the memory backend lacks to 501 instead of a bare 500"""
+    logger.warning(f"Unsupported on {STORAGE_BACKEND} storage: {request.url.path}: {exc}")
+    return JSONResponse({"detail": str(exc)}, status_code=501)
@@ -0,0 +1,1137 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from itertools import product
+import re
+import time
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+from pymongo.operations import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+# TTL indexes are swept at most this often, on the next operation
+TTL_SWEEP_SECONDS = 1.0
+
+
+class UnsupportedOperation(NotImplementedError):
+    """A query, update, stage or command outside what this engine implements"""
+
+
+class _Missing:
+    """Placeholder for an absent field; matches null like Mongo does"""
+
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def _copy(value: Any) -> Any:
+    """Copy the mutable parts of a document; scalars are shared"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _values(doc: Any, path: str) -> List[Any]:
+    """Every value at a dotted path, descending into arrays like Mongo"""
+    current = [doc]
+    for part in path.split("."):
+        found = []
+        for value in current:
+            if isinstance(value, dict):
+                found.append(value.get(part, MISSING))
+            elif isinstance(value, list):
+                if part.isdigit():
+                    index = int(part)
+                    found.append(value[index] if index < len(value) else MISSING)
+                else:
+                    found.extend(item.get(part, MISSING) for item in value if isinstance(item, dict))
+            else:
+                found.append(MISSING)
+        current = found
+    return current or [MISSING]
+
+
+def _naive(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _category(value: Any) -> Optional[int]:
+    """Mongo's BSON type order, for comparisons and sorting"""
+    if value is MISSING or value is None:
+        return 0
+    if isinstance(value, bool):
+        return 7
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, ObjectId):
+        return 6
+    if isinstance(value, datetime):
+        return 8
+    return None
+
+
+def _eq(value: Any, target: Any) -> bool:
+    if value is MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return any(_eq(item, target) for item in value)
+    if _category(value) != _category(target):
+        return False
+    if isinstance(value, datetime):
+        return _naive(value) == _naive(target)
+    return value == target
+
+
+def _compare(value: Any, target: Any, op: str) -> bool:
+    if isinstance(value, list):
+        return any(_compare(item, target, op) for item in value)
+    category = _category(value)
+    if category is None or category == 0 or category != _category(target):
+        return False
+    if isinstance(value, datetime):
+        value, target = _naive(value), _naive(target)
+    if op == "$gt":
+        return value > target
+    if op == "$gte":
+        return value >= target
+    if op == "$lt":
+        return value < target
+    return value <= target
+
+
+def _is_operator_doc(cond: Any) -> bool:
+    return isinstance(cond, dict) and bool(cond) and all(key.startswith("$") for key in cond)
+
+
+def _match_operators(values: List[Any], cond: dict) -> bool:
+    for op, arg in cond.items():
+        if op == "$eq":
+            ok = any(_eq(v, arg) for v in values)
+        elif op == "$ne":
+            ok = not any(_eq(v, arg) for v in values)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            ok = any(_compare(v, arg, op) for v in values)
+        elif op == "$in":
+            ok = any(_eq(v, target) for v in values for target in arg)
+        elif op == "$nin":
+            ok = not any(_eq(v, target) for v in values for target in arg)
+        elif op == "$exists":
+            ok = bool(arg) == any(v is not MISSING for v in values)
+        elif op == "$regex":
+            pattern = re.compile(arg, re.IGNORECASE if "i" in cond.get("$options", "") else 0)
+            ok = any(isinstance(v, str) and pattern.search(v) for v in values)
+        elif op == "$options":
+            continue
+        elif op == "$not":
+            ok = not _match_operators(values, arg)
+        elif op == "$size":
+            ok = any(isinstance(v, list) and len(v) == arg for v in values)
+        else:
+            raise UnsupportedOperation(f"Query operator {op} is not supported by the in-memory storage")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    """Whether ``doc`` satisfies a Mongo filter (the subset this engine supports)"""
+    for key, cond in (query or {}).items():
+        if key == "$and":
+            ok = all(matches(doc, sub) for sub in cond)
+        elif key == "$or":
+            ok = any(matches(doc, sub) for sub in cond)
+        elif key == "$nor":
+            ok = not any(matches(doc, sub) for sub in cond)
+        elif key.startswith("$"):
+            raise UnsupportedOperation(f"Query operator {key} is not supported by the in-memory storage")
+        elif _is_operator_doc(cond):
+            ok = _match_operators(_values(doc, key), cond)
+        else:
+            ok = any(_eq(v, cond) for v in _values(doc, key))
+        if not ok:
+            return False
+    return True
+
+
+def _sort_key(value: Any) -> tuple:
+    if isinstance(value, list):
+        value = min(value, key=_sort_key) if value else None
+    category = _category(value)
+    if category == 0:
+        return (0,)
+    if category == 8:
+        return (8, _naive(value))
+    if category == 6:
+        return (6, value.binary)
+    if category in (1, 2, 5, 7):
+        return (category, value)
+    return (category or 9, repr(value))
+
+
+def _normalize_keys(keys: Union[str, Sequence], direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(keys, str):
+        return [(keys, direction if direction is not None else ASCENDING)]
+    return [(key, value) for key, value in keys]
+
+
+def _sorted(docs: List[Tuple[int, dict]], sort: List[Tuple[str, int]]) -> List[Tuple[int, dict]]:
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda item: _sort_key(_values(item[1], field)[0]), reverse=direction == -1)
+    return docs
+
+
+def _project(doc: dict, projection: Optional[Union[dict, list]]) -> dict:
+    if not projection:
+        return _copy(doc)
+    if isinstance(projection, list):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    fields = {field: flag for field, flag in projection.items() if field != "_id"}
+    if any(fields.values()):
+        result = {field: _copy(doc[field]) for field, flag in fields.items() if flag and field in doc}
+    else:
+        result = {field: _copy(value) for field, value in doc.items() if field not in fields}
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    elif not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _set_path(doc: dict, path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: dict, path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _get_path(doc: dict, path: str) -> Any:
+    value = _values(doc, path)[0]
+    return None if value is MISSING else value
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False) -> dict:
+    """Apply update operators to a copy of ``doc``, or replace it"""
+    if not any(key.startswith("$") for key in update):
+        replaced = _copy(update)
+        if "_id" in doc:
+            replaced["_id"] = doc["_id"]
+        return replaced
+
+    doc = _copy(doc)
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for path, arg in fields.items():
+            current = _get_path(doc, path)
+            if op in ("$set", "$setOnInsert"):
+                _set_path(doc, path, _copy(arg))
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                _set_path(doc, path, (current or 0) + arg)
+            elif op == "$mul":
+                _set_path(doc, path, (current or 0) * arg)
+            elif op == "$min":
+                if current is None or _sort_key(arg) < _sort_key(current):
+                    _set_path(doc, path, arg)
+            elif op == "$max":
+                if current is None or _sort_key(arg) > _sort_key(current):
+                    _set_path(doc, path, arg)
+            elif op == "$currentDate":
+                _set_path(doc, path, datetime.utcnow())
+            elif op in ("$push", "$addToSet"):
+                items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                array = list(current or [])
+                for item in items:
+                    if op == "$push" or not any(_eq(existing, item) for existing in array):
+                        array.append(_copy(item))
+                _set_path(doc, path, array)
+            elif op == "$pull":
+                if isinstance(current, list):
+                    _set_path(doc, path, [
+                        item for item in current
+                        if not (matches(item, arg) if _is_operator_doc(arg) or isinstance(arg, dict) and isinstance(item, dict) else _eq(item, arg))
+                    ])
+            else:
+                raise UnsupportedOperation(f"Update operator {op} is not supported by the in-memory storage")
+    return doc
+
+
+def _upsert_seed(query: dict) -> dict:
+    """Fields an upsert copies from its filter's equality conditions"""
+    doc: dict = {}
+    for key, cond in query.items():
+        if key == "$and":
+            for sub in cond:
+                doc.update(_upsert_seed(sub))
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_doc(cond):
+            if "$eq" in cond:
+                _set_path(doc, key, _copy(cond["$eq"]))
+        else:
+            _set_path(doc, key, _copy(cond))
+    return doc
+
+
+def _hashable(value: Any) -> Any:
+    if value is MISSING:
+        return None
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, datetime):
+        return _naive(value)
+    return value
+
+
+def _index_values(doc: dict, field: str) -> Set[Any]:
+    """Index keys for one field; arrays are indexed per element and whole"""
+    keys = set()
+    for value in _values(doc, field):
+        keys.add(_hashable(value))
+        if isinstance(value, list):
+            keys.update(_hashable(item) for item in value)
+    return keys
+
+
+def _lookup_values(cond: Any) -> Optional[List[Any]]:
+    """Values an equality or $in condition can match, or None for other conditions"""
+    if _is_operator_doc(cond):
+        if set(cond) == {"$eq"}:
+            return [_hashable(cond["$eq"])]
+        if set(cond) == {"$in"}:
+            return [_hashable(value) for value in cond["$in"]]
+        return None
+    if isinstance(cond, dict):
+        return None
+    return [_hashable(cond)]
+
+
+# -- aggregation ---------------------------------------------------------
+
+_DATE_PARTS = {"%L": lambda value: f"{value.microsecond // 1000:03d}"}
+_TRUNC_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def _field(doc: Any, path: str) -> Any:
+    values = _values(doc, path)
+    return values[0] if len(values) == 1 else [value for value in values if value is not MISSING]
+
+
+def _agg_compare(a: Any, b: Any) -> int:
+    """Three-way comparison in BSON order, as aggregation expressions compare"""
+    left, right = _sort_key(a), _sort_key(b)
+    return (left > right) - (left < right)
+
+
+def _date_to_string(args: dict, doc: dict, variables: dict) -> Any:
+    value = evaluate(args["date"], doc, variables)
+    if value is MISSING or value is None:
+        return evaluate(args.get("onNull"), doc, variables) if "onNull" in args else None
+    value = _naive(value)
+    text = args.get("format", "%Y-%m-%dT%H:%M:%S.%LZ")
+    for token, render in _DATE_PARTS.items():
+        text = text.replace(token, render(value))
+    return value.strftime(text)
+
+
+def _date_trunc(args: dict, doc: dict, variables: dict) -> Any:
+    value = evaluate(args["date"], doc, variables)
+    if value is MISSING or value is None:
+        return None
+    value = _naive(value)
+    unit = args["unit"]
+    size = args.get("binSize", 1)
+    if unit in _TRUNC_SECONDS:
+        step = _TRUNC_SECONDS[unit] * size
+        epoch = datetime(1970, 1, 1)
+        return epoch + timedelta(seconds=int((value - epoch).total_seconds() // step * step))
+    if unit == "month" and size == 1:
+        return datetime(value.year, value.month, 1)
+    if unit == "year" and size == 1:
+        return datetime(value.year, 1, 1)
+    raise UnsupportedOperation(f"$dateTrunc unit {unit} (binSize {size}) is not supported by the in-memory storage")
+
+
+def _numbers(values: Iterable[Any]) -> List[Any]:
+    return [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+
+
+def evaluate(expr: Any, doc: dict, variables: dict) -> Any:
+    """Evaluate an aggregation expression against one document"""
+    if isinstance(expr, str) and expr.startswith("$$"):
+        name, _, path = expr[2:].partition(".")
+        if name not in variables:
+            raise UnsupportedOperation(f"Variable $${name} is not supported by the in-memory storage")
+        value = variables[name] if name != "ROOT" else doc
+        return _field(value, path) if path else value
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _field(doc, expr[1:])
+    if isinstance(expr, list):
+        return [evaluate(item, doc, variables) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if not (len(expr) == 1 and next(iter(expr)).startswith("$")):
+        return {key: evaluate(value, doc, variables) for key, value in expr.items()}
+
+    op, args = next(iter(expr.items()))
+    if op == "$literal":
+        return args
+    if op == "$dateToString":
+        return _date_to_string(args, doc, variables)
+    if op == "$dateTrunc":
+        return _date_trunc(args, doc, variables)
+    if op == "$cond":
+        if isinstance(args, dict):
+            args = [args["if"], args["then"], args["else"]]
+        condition, then, otherwise = args
+        return evaluate(then if _truthy(evaluate(condition, doc, variables)) else otherwise, doc, variables)
+
+    values = [evaluate(arg, doc, variables) for arg in (args if isinstance(args, list) else [args])]
+    if op == "$ifNull":
+        for value in values[:-1]:
+            if value is not MISSING and value is not None:
+                return value
+        return values[-1]
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$cmp"):
+        order = _agg_compare(values[0], values[1])
+        return {
+            "$eq": order == 0, "$ne": order != 0, "$gt": order > 0, "$gte": order >= 0,
+            "$lt": order < 0, "$lte": order <= 0, "$cmp": order,
+        }[op]
+    if op == "$and":
+        return all(_truthy(value) for value in values)
+    if op == "$or":
+        return any(_truthy(value) for value in values)
+    if op == "$not":
+        return not _truthy(values[0])
+    if op == "$in":
+        return any(_agg_compare(values[0], item) == 0 for item in values[1])
+    if op == "$size":
+        return len(values[0])
+    if any(value is MISSING or value is None for value in values):
+        return None
+    if op == "$add":
+        if any(isinstance(value, datetime) for value in values):
+            base = next(value for value in values if isinstance(value, datetime))
+            return base + timedelta(milliseconds=sum(_numbers(values)))
+        return sum(values)
+    if op == "$subtract":
+        left, right = values
+        if isinstance(left, datetime) and isinstance(right, datetime):
+            return int((_naive(left) - _naive(right)).total_seconds() * 1000)
+        if isinstance(left, datetime):
+            return left - timedelta(milliseconds=right)
+        return left - right
+    if op == "$multiply":
+        product_ = 1
+        for value in values:
+            product_ *= value
+        return product_
+    if op == "$divide":
+        return values[0] / values[1]
+    if op == "$toString":
+        return str(values[0])
+    raise UnsupportedOperation(f"Expression operator {op} is not supported by the in-memory storage")
+
+
+def _truthy(value: Any) -> bool:
+    return value not in (MISSING, None, False, 0)
+
+
+def _accumulate(op: str, values: List[Any]) -> Any:
+    present = [value for value in values if value is not MISSING]
+    if op == "$sum":
+        return sum(_numbers(present))
+    if op == "$avg":
+        numbers = _numbers(present)
+        return sum(numbers) / len(numbers) if numbers else None
+    if op in ("$min", "$max"):
+        candidates = [value for value in present if value is not None]
+        if not candidates:
+            return None
+        pick = min if op == "$min" else max
+        return pick(candidates, key=_sort_key)
+    if op == "$first":
+        return values[0] if values and values[0] is not MISSING else None
+    if op == "$last":
+        return values[-1] if values and values[-1] is not MISSING else None
+    if op == "$push":
+        return present
+    if op == "$addToSet":
+        unique: List[Any] = []
+        for value in present:
+            if not any(_agg_compare(value, known) == 0 for known in unique):
+                unique.append(value)
+        return unique
+    raise UnsupportedOperation(f"Accumulator {op} is not supported by the in-memory storage")
+
+
+def _group(docs: List[dict], spec: dict, variables: dict) -> List[dict]:
+    groups: Dict[Any, Tuple[Any, List[dict]]] = {}
+    for doc in docs:
+        key = evaluate(spec["_id"], doc, variables)
+        key = None if key is MISSING else key
+        groups.setdefault(_hashable(key), (key, []))[1].append(doc)
+    results = []
+    for key, members in groups.values():
+        row = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, expr = next(iter(accumulator.items()))
+            if op == "$count":
+                row[field] = len(members)
+            else:
+                row[field] = _accumulate(op, [evaluate(expr, member, variables) for member in members])
+        results.append(row)
+    return results
+
+
+def _project_stage(doc: dict, spec: dict, variables: dict) -> dict:
+    include_id = spec.get("_id", 1) not in (0, False)
+    fields = {key: value for key, value in spec.items() if key != "_id"}
+    if fields and all(value in (0, False) for value in fields.values()):
+        result = _copy(doc)
+        for path in fields:
+            _unset_path(result, path)
+    else:
+        result = {}
+        for path, value in fields.items():
+            if value in (1, True):
+                found = _values(doc, path)[0]
+                if found is not MISSING:
+                    _set_path(result, path, _copy(found))
+            else:
+                computed = evaluate(value, doc, variables)
+                if computed is not MISSING:
+                    _set_path(result, path, computed)
+        if "_id" in spec and spec["_id"] not in (0, 1, False, True):
+            result["_id"] = evaluate(spec["_id"], doc, variables)
+        elif include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def _unwind(docs: List[dict], spec: Union[str, dict]) -> List[dict]:
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec["path"][1:]
+    keep_empty = spec.get("preserveNullAndEmptyArrays", False)
+    results = []
+    for doc in docs:
+        value = _values(doc, path)[0]
+        if isinstance(value, list) and value:
+            for item in value:
+                unwound = _copy(doc)
+                _set_path(unwound, path, _copy(item))
+                results.append(unwound)
+        elif isinstance(value, list) or value is MISSING or value is None:
+            if keep_empty:
+                results.append(doc)
+        else:
+            results.append(doc)
+    return results
+
+
+def run_pipeline(docs: List[dict], pipeline: List[dict], variables: dict) -> List[dict]:
+    """Run every stage except $merge over ``docs`` (copies the caller owns)"""
+    for stage in pipeline:
+        if len(stage) != 1:
+            raise UnsupportedOperation(f"Malformed pipeline stage {stage}")
+        name, spec = next(iter(stage.items()))
+        if name == "$match":
+            docs = [doc for doc in docs if matches(doc, spec)]
+        elif name == "$project":
+            docs = [_project_stage(doc, spec, variables) for doc in docs]
+        elif name in ("$addFields", "$set"):
+            for doc in docs:
+                for path, expr in spec.items():
+                    _set_path(doc, path, evaluate(expr, doc, variables))
+        elif name == "$unset":
+            for doc in docs:
+                for path in [spec] if isinstance(spec, str) else spec:
+                    _unset_path(doc, path)
+        elif name == "$group":
+            docs = _group(docs, spec, variables)
+        elif name == "$sort":
+            docs = [doc for _, doc in _sorted(list(enumerate(docs)), list(spec.items()))]
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$unwind":
+            docs = _unwind(docs, spec)
+        elif name == "$facet":
+            docs = [{
+                field: run_pipeline([_copy(doc) for doc in docs], sub_pipeline, variables)
+                for field, sub_pipeline in spec.items()
+            }]
+        else:
+            raise UnsupportedOperation(f"Pipeline stage {name} is not supported by the in-memory storage")
+    return docs
+
+
+class MemoryIndex:
+    """Hash index over one or more fields.
+
+    Answers equality and $in lookups on all of its fields, or on its leading
+    field alone; range predicates and sorts fall back to a scan. Candidates
+    are always re-checked against the full filter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        keys: List[Tuple[str, int]],
+        unique: bool = False,
+        expire_after: Optional[float] = None,
+        partial_filter: Optional[dict] = None
+    ):
+        self.name = name
+        self.keys = keys
+        self.fields = [field for field, _ in keys]
+        self.unique = unique
+        self.expire_after = expire_after
+        # Only narrows TTL expiry; lookups and unique checks cover every document
+        self.partial_filter = partial_filter
+        self.entries: Dict[tuple, Set[int]] = {}
+        self.leading: Dict[Any, Set[int]] = {}
+
+    def _keys_for(self, doc: dict) -> List[tuple]:
+        return list(product(*(_index_values(doc, field) for field in self.fields)))
+
+    def check_unique(self, doc_id: int, doc: dict) -> None:
+        if not self.unique:
+            return
+        for key in self._keys_for(doc):
+            if self.entries.get(key, set()) - {doc_id}:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error index: {self.name} dup key: {dict(zip(self.fields, key))}",
+                    11000
+                )
+
+    def add(self, doc_id: int, doc: dict) -> None:
+        for key in self._keys_for(doc):
+            self.entries.setdefault(key, set()).add(doc_id)
+            self.leading.setdefault(key[0], set()).add(doc_id)
+
+    def remove(self, doc_id: int, doc: dict) -> None:
+        for key in self._keys_for(doc):
+            for table, entry in ((self.entries, key), (self.leading, key[0])):
+                ids = table.get(entry)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del table[entry]
+
+    def candidates(self, query: dict) -> Optional[Set[int]]:
+        lookups = [_lookup_values(query[field]) if field in query else None for field in self.fields]
+        if all(values is not None for values in lookups):
+            found: Set[int] = set()
+            for key in product(*lookups):
+                found |= self.entries.get(key, set())
+            return found
+        if lookups[0] is not None:
+            found = set()
+            for value in lookups[0]:
+                found |= self.leading.get(value, set())
+            return found
+        return None
+
+
+class MemoryCursor:
+    """The Motor cursor subset: sort, skip, limit, to_list and async iteration"""
+
+    def __init__(self, collection: "MemoryCollection", query: Optional[dict], projection: Optional[dict]):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+        self._position = 0
+
+    def sort(self, key_or_list, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = _normalize_keys(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        if self._results is None:
+            selected = self.collection._select(self.query, self._sort, self._skip, self._limit)
+            self._results = [_project(doc, self.projection) for _, doc in selected]
+        return self._results
+
+    async def to_list(self, length: Optional[int]) -> List[dict]:
+        results = self._evaluate()
+        end = len(results) if length is None else self._position + length
+        batch = results[self._position:end]
+        self._position += len(batch)
+        return batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        results = self._evaluate()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+
+class MemoryAggregateCursor:
+    """Aggregation results, computed on first read like a Motor command cursor"""
+
+    def __init__(self, run):
+        self._run = run
+        self._results: Optional[List[dict]] = None
+        self._position = 0
+
+    def _evaluate(self) -> List[dict]:
+        if self._results is None:
+            self._results = self._run()
+        return self._results
+
+    async def to_list(self, length: Optional[int]) -> List[dict]:
+        results = self._evaluate()
+        end = len(results) if length is None else self._position + length
+        batch = results[self._position:end]
+        self._position += len(batch)
+        return batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        results = self._evaluate()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return results[self._position - 1]
+
+
+class MemoryCollection:
+    """A Motor collection look-alike backed by a dict of documents"""
+
+    def __init__(self, database: "MemoryDatabase", name: str, options: Optional[dict] = None):
+        self.database = database
+        self.name = name
+        self.options = options or {}
+        self._docs: Dict[int, dict] = {}
+        self._next_id = 0
+        self._indexes: Dict[str, MemoryIndex] = {"_id_": MemoryIndex("_id_", [("_id", ASCENDING)], unique=True)}
+        self._last_sweep = 0.0
+        # Like Mongo, a collection only exists once created, written to or indexed
+        self.exists = options is not None
+        self._configure()
+
+    # -- internals -------------------------------------------------------
+
+    def _configure(self) -> None:
+        timeseries = self.options.get("timeseries")
+        if timeseries and self.options.get("expireAfterSeconds") is not None:
+            self._time_field_ttl = (timeseries["timeField"], float(self.options["expireAfterSeconds"]))
+        else:
+            self._time_field_ttl = None
+
+    def _sweep_expired(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < TTL_SWEEP_SECONDS:
+            return
+        self._last_sweep = now
+        rules = [
+            (index.fields[0], index.expire_after, index.partial_filter)
+            for index in self._indexes.values() if index.expire_after is not None
+        ]
+        if self._time_field_ttl:
+            rules.append((*self._time_field_ttl, None))
+        if not rules:
+            return
+        utcnow = datetime.utcnow()
+        for doc_id, doc in list(self._docs.items()):
+            for field, seconds, partial_filter in rules:
+                value = _get_path(doc, field)
+                if (
+                    isinstance(value, datetime) and _naive(value) + timedelta(seconds=seconds) <= utcnow
+                    and (partial_filter is None or matches(doc, partial_filter))
+                ):
+                    self._remove(doc_id)
+                    break
+
+    def _select(
+        self,
+        query: Optional[dict],
+        sort: Optional[List[Tuple[str, int]]] = None,
+        skip: int = 0,
+        limit: int = 0
+    ) -> List[Tuple[int, dict]]:
+        self._sweep_expired()
+        query = query or {}
+        candidates: Optional[Set[int]] = None
+        for index in self._indexes.values():
+            found = index.candidates(query)
+            if found is not None and (candidates is None or len(found) < len(candidates)):
+                candidates = found
+        if candidates is None:
+            pool: Iterable[Tuple[int, dict]] = self._docs.items()
+        else:
+            pool = ((doc_id, self._docs[doc_id]) for doc_id in sorted(candidates))
+        selected = [(doc_id, doc) for doc_id, doc in pool if matches(doc, query)]
+        if sort:
+            selected = _sorted(selected, sort)
+        if skip:
+            selected = selected[skip:]
+        if limit:
+            selected = selected[:limit]
+        return selected
+
+    def _insert(self, document: dict) -> Any:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        stored = _copy(document)
+        doc_id = self._next_id
+        for index in self._indexes.values():
+            index.check_unique(doc_id, stored)
+        self._next_id += 1
+        self._docs[doc_id] = stored
+        self.exists = True
+        for index in self._indexes.values():
+            index.add(doc_id, stored)
+        return document["_id"]
+
+    def _replace(self, doc_id: int, new: dict) -> bool:
+        old = self._docs[doc_id]
+        if new == old:
+            return False
+        for index in self._indexes.values():
+            index.check_unique(doc_id, new)
+        for index in self._indexes.values():
+            index.remove(doc_id, old)
+            index.add(doc_id, new)
+        self._docs[doc_id] = new
+        return True
+
+    def _remove(self, doc_id: int) -> None:
+        doc = self._docs.pop(doc_id)
+        for index in self._indexes.values():
+            index.remove(doc_id, doc)
+
+    def _update(self, query: dict, update: dict, upsert: bool, multi: bool) -> UpdateResult:
+        selected = self._select(query, limit=0 if multi else 1)
+        if not selected and upsert:
+            doc = apply_update(_upsert_seed(query), update, inserting=True)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": self._insert(doc)}, True)
+        modified = sum(self._replace(doc_id, apply_update(doc, update)) for doc_id, doc in selected)
+        return UpdateResult({"n": len(selected), "nModified": modified, "updatedExisting": bool(selected)}, True)
+
+    # -- Motor API -------------------------------------------------------
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("skip"):
+            cursor.skip(kwargs["skip"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, sort=None, **kwargs) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        selected = self._select(filter, _normalize_keys(sort) if sort else None, kwargs.get("skip", 0), 1)
+        return _project(selected[0][1], projection) if selected else None
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        return InsertManyResult([self._insert(document) for document in documents], True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, multi=False)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, update, upsert, multi=True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        return self._update(filter, replacement, upsert, multi=False)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        selected = self._select(filter, limit=1)
+        for doc_id, _ in selected:
+            self._remove(doc_id)
+        return DeleteResult({"n": len(selected)}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        selected = self._select(filter)
+        for doc_id, _ in selected:
+            self._remove(doc_id)
+        return DeleteResult({"n": len(selected)}, True)
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        return len(self._select(filter, skip=kwargs.get("skip", 0), limit=kwargs.get("limit", 0)))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        self._sweep_expired()
+        return len(self._docs)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None, **kwargs) -> List[Any]:
+        seen: List[Any] = []
+        for _, doc in self._select(filter):
+            for value in _values(doc, key):
+                for item in value if isinstance(value, list) else [value]:
+                    if item is not MISSING and not any(_eq(item, known) for known in seen):
+                        seen.append(item)
+        return seen
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict,
+        projection: Optional[dict] = None,
+        sort=None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs
+    ) -> Optional[dict]:
+        selected = self._select(filter, _normalize_keys(sort) if sort else None, limit=1)
+        if not selected:
+            if not upsert:
+                return None
+            doc = apply_update(_upsert_seed(filter), update, inserting=True)
+            self._insert(doc)
+            return _project(doc, projection) if return_document == ReturnDocument.AFTER else None
+        doc_id, before = selected[0]
+        self._replace(doc_id, apply_update(before, update))
+        return _project(self._docs[doc_id] if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None, sort=None, **kwargs) -> Optional[dict]:
+        selected = self._select(filter, _normalize_keys(sort) if sort else None, limit=1)
+        if not selected:
+            return None
+        doc_id, doc = selected[0]
+        self._remove(doc_id)
+        return _project(doc, projection)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        for position, request in enumerate(requests):
+            if isinstance(request, InsertOne):
+                self._insert(request._doc)
+                result["nInserted"] += 1
+            elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                outcome = self._update(
+                    request._filter, request._doc, bool(request._upsert), multi=isinstance(request, UpdateMany)
+                )
+                if outcome.upserted_id is not None:
+                    result["nUpserted"] += 1
+                    result["upserted"].append({"index": position, "_id": outcome.upserted_id})
+                result["nMatched"] += outcome.matched_count
+                result["nModified"] += outcome.modified_count
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                selected = self._select(request._filter, limit=0 if isinstance(request, DeleteMany) else 1)
+                for doc_id, _ in selected:
+                    self._remove(doc_id)
+                result["nRemoved"] += len(selected)
+            else:
+                raise UnsupportedOperation(f"{type(request).__name__} is not supported by the in-memory storage")
+        return BulkWriteResult(result, True)
+
+    async def create_index(
+        self,
+        keys,
+        unique: bool = False,
+        name: Optional[str] = None,
+        expireAfterSeconds: Optional[float] = None,
+        partialFilterExpression: Optional[dict] = None,
+        **kwargs
+    ) -> str:
+        keys = _normalize_keys(keys)
+        self.exists = True
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        if name in self._indexes:
+            return name
+        index = MemoryIndex(name, keys, unique, expireAfterSeconds, partialFilterExpression)
+        for doc_id, doc in self._docs.items():
+            index.check_unique(doc_id, doc)
+            index.add(doc_id, doc)
+        self._indexes[name] = index
+        return name
+
+    async def drop_index(self, name: str) -> None:
+        self._indexes.pop(name, None)
+
+    async def index_information(self) -> Dict[str, dict]:
+        return {
+            name: {"key": index.keys, "unique": index.unique}
+            for name, index in self._indexes.items()
+        }
+
+    async def drop(self) -> None:
+        await self.database.drop_collection(self.name)
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> MemoryAggregateCursor:
+        """Run a pipeline; see run_pipeline for the supported stages, plus a final $merge"""
+        pipeline = list(pipeline)
+        merge = pipeline.pop()["$merge"] if pipeline and "$merge" in pipeline[-1] else None
+
+        def run() -> List[dict]:
+            query = pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else {}
+            docs = [_copy(doc) for _, doc in self._select(query)]
+            results = run_pipeline(docs, pipeline[1:] if query else pipeline, {"NOW": datetime.utcnow()})
+            if merge is None:
+                return results
+            self._merge(results, merge)
+            return []
+
+        return MemoryAggregateCursor(run)
+
+    def _merge(self, results: List[dict], spec: Union[str, dict]) -> None:
+        if isinstance(spec, str):
+            spec = {"into": spec}
+        target = self.database[spec["into"]]
+        on = spec.get("on", "_id")
+        on = [on] if isinstance(on, str) else on
+        when_matched = spec.get("whenMatched", "merge")
+        when_not_matched = spec.get("whenNotMatched", "insert")
+        for doc in results:
+            existing = target._select({field: _get_path(doc, field) for field in on}, limit=1)
+            if existing:
+                doc_id, current = existing[0]
+                if when_matched == "keepExisting":
+                    continue
+                if when_matched == "fail":
+                    raise DuplicateKeyError(f"$merge found an existing document in {target.name}", 11000)
+                if when_matched == "replace":
+                    merged = _copy(doc)
+                elif when_matched == "merge":
+                    merged = {**current, **_copy(doc)}
+                else:
+                    raise UnsupportedOperation(f"$merge whenMatched {when_matched!r} is not supported by the in-memory storage")
+                merged["_id"] = current["_id"]
+                target._replace(doc_id, merged)
+            elif when_not_matched == "insert":
+                target._insert(_copy(doc))
+            elif when_not_matched == "fail":
+                raise UnsupportedOperation(f"$merge found no document to update in {target.name}")
+
+    def watch(self, *args, **kwargs):
+        raise UnsupportedOperation("Change streams are not supported by the in-memory storage")
+
+
+class MemoryDatabase:
+    """A Motor database look-alike; collections are created on first use"""
+
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+
+    def watch(self, *args, **kwargs):
+        raise UnsupportedOperation("Change streams are not supported by the in-memory storage")
+
+    async def list_collection_names(self, filter: Optional[dict] = None, **kwargs) -> List[str]:
+        return [
+            name for name, collection in self._collections.items()
+            if collection.exists and matches({"name": name}, filter)
+        ]
+
+    async def create_collection(self, name: str, **options) -> MemoryCollection:
+        collection = self[name]
+        if collection.exists:
+            raise CollectionInvalid(f"collection {name} already exists")
+        # Handles taken before creation see the options too
+        collection.options = options
+        collection.exists = True
+        collection._configure()
+        return collection
+
+    async def drop_collection(self, name: str) -> None:
+        self._collections.pop(name, None)
+
+    async def command(self, command: str, value: Any = None, **kwargs) -> dict:
+        if command == "ping":
+            return {"ok": 1.0}
+        if command == "collMod":
+            collection = self[value]
+            if "expireAfterSeconds" in kwargs and collection._time_field_ttl:
+                collection._time_field_ttl = (collection._time_field_ttl[0], float(kwargs["expireAfterSeconds"]))
+            return {"ok": 1.0}
+        raise UnsupportedOperation(f"Command {command} is not supported by the in-memory storage")
+
+
+class MemoryClient:
+    """A Motor client look-alike holding in-process databases"""
+
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(self, name)
+        return database
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+
+    async def drop_database(self, name: str) -> None:
+        self._databases.pop(getattr(name, "name", name), None)
+
+    def close(self) -> None:
+        pass
@@ -5,6 +5,8 @@ from passlib.context import CryptContext
 from fastapi import HTTPException, status
 import os
 
+from utils.profiling import SPAN_PASSWORD_HASH, span
+
 # JWT Configuration
 SECRET_KEY = os.environ.get("SECRET_KEY", "your-super-secret-key-change-in-production")
 ALGORITHM = "HS256"
@@ -17,12 +19,14 @@ class AuthUtils:
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        with span(SPAN_PASSWORD_HASH):
+            return pwd_context.verify(plain_password, hashed_password)
     
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Generate password hash"""
-        return pwd_context.hash(password)
+        with span(SPAN_PASSWORD_HASH):
+            return pwd_context.hash(password)
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import time
+
+import pymongo
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Budget for routes without their own entry below
+REQUEST_DEADLINE_MS = int(os.environ.get("REQUEST_DEADLINE_MS", "5000"))
+# Requests handled concurrently before new ones start queueing
+MAX_IN_FLIGHT = int(os.environ.get("MAX_IN_FLIGHT", "256"))
+# Share of its budget a request may spend queued before it is shed
+SHED_QUEUE_FRACTION = float(os.environ.get("SHED_QUEUE_FRACTION", "0.5"))
+
+# Longest matching path prefix wins; None means no deadline (long-lived streams)
+ROUTE_DEADLINES_MS: Dict[str, Optional[int]] = {
+    "/api/events": None,
+    "/api/auth/login": 3000,
+    "/api/auth/register": 3000,
+    "/api/reports": 15000,
+    "/api/admin/stats": 3000,
+}
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None without a deadline"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Bound everything in the block by ``seconds``.
+
+    pymongo.timeout() makes every Motor call inside the block send the
+    remaining budget as maxTimeMS and use it as its client-side socket
+    timeout. Motor copies the context into its executor, so this reaches
+    calls made anywhere down the request's call stack.
+    """
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        with pymongo.timeout(seconds):
+            yield
+    finally:
+        _deadline.reset(token)
+
+
+def route_budget_ms(path: str) -> Optional[int]:
+    match = None
+    for prefix in ROUTE_DEADLINES_MS:
+        if path.startswith(prefix) and (match is None or len(prefix) > len(match)):
+            match = prefix
+    return REQUEST_DEADLINE_MS if match is None else ROUTE_DEADLINES_MS[match]
+
+
+class LoopLagMonitor:
+    """Tracks how late the event loop runs a periodic timer (queueing we cannot see directly)"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+            # Rise fast, decay slowly
+            self.lag = lag if lag > self.lag else self.lag * 0.8 + lag * 0.2
+
+
+class DeadlineMiddleware:
+    """Per-route deadlines, in-flight tracking and load shedding.
+
+    Requests over MAX_IN_FLIGHT wait for a slot. A request is shed with 503
+    once its queueing delay, meaning slot wait plus event-loop lag, uses up
+    SHED_QUEUE_FRACTION of its budget. It would likely miss its deadline
+    anyway, and serving it would only push later requests past theirs.
+    Admitted requests run under deadline() with whatever budget is left.
+    """
+
+    def __init__(self, app, max_in_flight: int = MAX_IN_FLIGHT, shed_fraction: float = SHED_QUEUE_FRACTION):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.shed_fraction = shed_fraction
+        self.in_flight = 0
+        self.shed_count = 0
+        self.loop_lag = LoopLagMonitor()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _shed(self, scope, receive, send, waited: float) -> None:
+        self.shed_count += 1
+        logger.debug(f"Shedding {scope['path']} after {waited * 1000:.0f} ms queued ({self.in_flight} in flight)")
+        response = JSONResponse(
+            {"detail": "Server is overloaded, retry shortly"},
+            status_code=503,
+            headers={"Retry-After": "1"}
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        budget_ms = route_budget_ms(scope["path"])
+        if budget_ms is None:
+            return await self.app(scope, receive, send)
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.loop_lag.ensure_started()
+        budget = budget_ms / 1000
+        max_queue = budget * self.shed_fraction
+        start = time.monotonic()
+
+        if self.loop_lag.lag > max_queue:
+            return await self._shed(scope, receive, send, self.loop_lag.lag)
+        if self._slots.locked():
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=max_queue - self.loop_lag.lag)
+            except asyncio.TimeoutError:
+                return await self._shed(scope, receive, send, time.monotonic() - start)
+        else:
+            await self._slots.acquire()
+
+        self.in_flight += 1
+        try:
+            left = budget - (time.monotonic() - start)
+            with deadline(left):
+                await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+
+async def database_error_handler(request: Request, exc: PyMongoError) -> JSONResponse:
+    """Map Mongo timeouts (maxTimeMS, socket or server selection) to 504"""
+    if exc.timeout:
+        return JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
+    logger.error(f"Database error on {request.url.path}: {exc}")
+    return JSONResponse({"detail": "Database error"}, status_code=500)
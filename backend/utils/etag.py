@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional
+import hashlib
+
+from fastapi import Request, Response
+
+# Bump whenever the shape of a cached response body changes so clients holding
+# an ETag from an older deploy do not get a 304 for a body they never saw.
+RESPONSE_CONTENT_VERSION = 2
+
+
+def _stamp(value) -> str:
+    """Render an ETag component in a stable form"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else str(value)
+
+
+def make_weak_etag(*parts, version: int = RESPONSE_CONTENT_VERSION) -> str:
+    """Build a weak ETag from timestamps/ids plus the content version"""
+    raw = "|".join(_stamp(part) for part in parts) + f"|v{version}"
+    digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    """Strip the weak prefix; If-None-Match uses weak comparison"""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(candidate) == wanted for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current ETag"""
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,294 @@
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional
+import functools
+import os
+import random
+import sys
+import threading
+import time
+
+import fastapi.routing
+from pymongo import monitoring
+
+# Stack samples per second while a profiling session runs
+PROFILE_SAMPLE_HZ = int(os.environ.get("PROFILE_SAMPLE_HZ", "200"))
+# Longest session an admin can start
+PROFILE_MAX_SECONDS = 600
+# Finished traces kept for GET /admin/profile/traces
+TRACE_BUFFER_SIZE = 500
+
+# Span categories recorded per traced request
+SPAN_DB = "db"
+SPAN_PASSWORD_HASH = "password_hash"
+SPAN_VALIDATION = "validation"
+SPAN_SERIALIZATION = "serialization"
+
+_trace: ContextVar[Optional["Trace"]] = ContextVar("request_trace", default=None)
+
+
+class Trace:
+    """Time a single request spent in each span category.
+
+    Span times are exclusive: a span excludes time already recorded by spans
+    or DB calls that ran inside it, so the categories never double count.
+    """
+
+    __slots__ = ("method", "path", "started_at", "duration", "status_code", "spans", "db_calls", "_accounted")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.status_code: Optional[int] = None
+        self.spans: Dict[str, float] = {}
+        self.db_calls = 0
+        self._accounted = 0.0
+
+    def add(self, category: str, seconds: float) -> None:
+        self.spans[category] = self.spans.get(category, 0.0) + seconds
+        self._accounted += seconds
+
+    def to_dict(self) -> dict:
+        spans_ms = {name: round(seconds * 1000, 3) for name, seconds in self.spans.items()}
+        return {
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration * 1000, 3),
+            "db_calls": self.db_calls,
+            "spans_ms": spans_ms,
+            "other_ms": round(max(0.0, self.duration - self._accounted) * 1000, 3),
+        }
+
+
+@contextmanager
+def span(category: str):
+    """Record the block's exclusive time under ``category`` if the request is traced"""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    accounted = trace._accounted
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        trace.add(category, max(0.0, elapsed - (trace._accounted - accounted)))
+
+
+class _CommandTimer(monitoring.CommandListener):
+    """Adds the server round trip of each Mongo command to the current trace.
+
+    Motor runs commands in its executor with the caller's context copied, so
+    the request's trace is visible from these callbacks.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        trace = _trace.get()
+        if trace is not None:
+            trace.db_calls += 1
+            trace.add(SPAN_DB, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+command_timer = _CommandTimer()
+
+
+class StackSampler:
+    """Samples the event-loop thread's Python stack from a background thread.
+
+    Output is collapsed-stack text ("outer;inner;leaf count" per line), the
+    input format of flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, hz: int = PROFILE_SAMPLE_HZ):
+        self.interval = 1.0 / hz
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, target_thread_id: int, seconds: float) -> None:
+        self.stop()
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(target_thread_id, time.monotonic() + seconds),
+            name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self, target_thread_id: int, until: float) -> None:
+        while not self._stop.wait(self.interval) and time.monotonic() < until:
+            frame = sys._current_frames().get(target_thread_id)
+            if frame is not None:
+                self.counts[self._collapse(frame)] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class Profiler:
+    """Runtime-switchable request tracing and stack sampling.
+
+    Off by default. While off, the middleware's only cost per request is one
+    attribute check, and span() and the Mongo listener one context lookup.
+    """
+
+    def __init__(self):
+        self.active_until = 0.0
+        self.sample_rate = 0.0
+        self.sampler = StackSampler()
+        self.traces: Deque[dict] = deque(maxlen=TRACE_BUFFER_SIZE)
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() < self.active_until
+
+    def start(self, seconds: float, sample_rate: float, stacks: bool) -> None:
+        self.traces.clear()
+        self.sample_rate = sample_rate
+        self.active_until = time.monotonic() + seconds
+        if stacks:
+            # Called from a request handler, i.e. on the event-loop thread
+            self.sampler.start(threading.get_ident(), seconds)
+
+    def stop(self) -> None:
+        self.active_until = 0.0
+        self.sampler.stop()
+
+    def status(self) -> dict:
+        return {
+            "active": self.active,
+            "seconds_left": round(max(0.0, self.active_until - time.monotonic()), 3),
+            "sample_rate": self.sample_rate,
+            "traces": len(self.traces),
+            "stack_samples": self.sampler.samples,
+            "sampling_stacks": self.sampler.running,
+        }
+
+    def summary(self) -> List[dict]:
+        """Mean span breakdown per route over the buffered traces"""
+        routes: Dict[str, dict] = {}
+        for trace in self.traces:
+            route = routes.setdefault(f"{trace['method']} {trace['path']}", {"count": 0, "duration_ms": 0.0, "spans_ms": Counter()})
+            route["count"] += 1
+            route["duration_ms"] += trace["duration_ms"]
+            route["spans_ms"].update(trace["spans_ms"])
+        return [
+            {
+                "route": name,
+                "count": route["count"],
+                "mean_ms": round(route["duration_ms"] / route["count"], 3),
+                "mean_spans_ms": {k: round(v / route["count"], 3) for k, v in route["spans_ms"].items()},
+            }
+            for name, route in sorted(routes.items(), key=lambda item: -item[1]["duration_ms"])
+        ]
+
+    def span_stacks(self) -> str:
+        """Traced time as collapsed stacks (route;category microseconds)"""
+        counts: Counter = Counter()
+        for trace in self.traces:
+            route = f"{trace['method']} {trace['path']}"
+            for name, ms in trace["spans_ms"].items():
+                counts[f"{route};{name}"] += int(ms * 1000)
+            counts[f"{route};other"] += int(trace["other_ms"] * 1000)
+        return "".join(f"{stack} {value}\n" for stack, value in counts.most_common() if value)
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Traces the configured fraction of requests while profiling is on"""
+
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not self.profiler.active
+            or random.random() >= self.profiler.sample_rate
+        ):
+            return await self.app(scope, receive, send)
+
+        trace = Trace(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+            await send(message)
+
+        token = _trace.set(trace)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            trace.duration = time.perf_counter() - start
+            # Group by route template (/api/jobs/{job_id}), not one entry per id;
+            # the router records the matched route in the scope
+            route = scope.get("route")
+            trace.path = getattr(route, "path", None) or scope["path"]
+            _trace.reset(token)
+            self.profiler.traces.append(trace.to_dict())
+
+
+def _timed(category: str, fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if _trace.get() is None:
+            return await fn(*args, **kwargs)
+        with span(category):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+
+_installed = False
+
+
+def install_route_spans() -> None:
+    """Time FastAPI's request validation and response serialization.
+
+    The route handler looks both functions up in fastapi.routing at call
+    time, so wrapping the module attributes covers every route. Dependency
+    resolution is part of validation; DB calls made by dependencies are
+    subtracted from it like any nested span.
+    """
+    global _installed
+    if _installed:
+        return
+    fastapi.routing.solve_dependencies = _timed(SPAN_VALIDATION, fastapi.routing.solve_dependencies)
+    fastapi.routing.serialize_response = _timed(SPAN_SERIALIZATION, fastapi.routing.serialize_response)
+    _installed = True
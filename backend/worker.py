@@ -0,0 +1,181 @@
+"""
+Background job worker.
+
+Run alongside the API (from backend/):
+    python worker.py --concurrency 8 --processes 2
+
+I/O-bound handlers run as coroutines on this process's event loop, up to
+``--concurrency`` at a time. CPU-bound handlers are shipped to a process pool
+of ``--processes`` workers so they never stall the loop.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from pathlib import Path
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import socket
+import uuid
+
+from models.job import Job
+from services.job_queue import JobQueue, JOB_HANDLERS, VISIBILITY_TIMEOUT_SECONDS
+from storage.backends import open_storage
+from utils.profiling import command_timer
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Modules whose import registers @job_handler functions
+HANDLER_MODULES = [
+    "services.archive",
+    "services.lead_scoring",
+    "services.reports",
+    "services.status_service",
+]
+
+# (job type, interval in seconds) enqueued on a fixed schedule
+SCHEDULED_JOBS = [
+    ("reports.precompute", 15 * 60),
+    ("status.downsample", 60),
+    ("archive.run", 6 * 3600),
+    ("leads.score", 5 * 60),
+]
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("worker")
+
+
+class Worker:
+    def __init__(self, db, concurrency: int, processes: int, poll_interval: float, job_types=None):
+        self.queue = JobQueue(db)
+        self.db = db
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.job_types = job_types or list(JOB_HANDLERS)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.process_pool = ProcessPoolExecutor(max_workers=processes) if processes else None
+        self._stopping = asyncio.Event()
+
+    async def _heartbeat(self, job: Job, work: asyncio.Task) -> None:
+        """Keep the lease alive while the handler runs, and stop the handler if it is lost"""
+        while True:
+            await asyncio.sleep(VISIBILITY_TIMEOUT_SECONDS / 3)
+            if not await self.queue.extend_lease(job.id, self.worker_id):
+                # Another worker has leased the job; running on would duplicate its work.
+                # A CPU-bound call already in the process pool still runs to completion.
+                logger.warning(f"Lost lease on job {job.id}, cancelling it")
+                work.cancel()
+                return
+
+    async def _execute(self, job: Job):
+        handler = JOB_HANDLERS[job.type]
+        if handler.cpu_bound:
+            if self.process_pool is None:
+                raise RuntimeError(f"CPU-bound job {job.type} needs --processes > 0")
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(self.process_pool, handler.func, job.payload)
+        else:
+            call = handler.func(self.db, job.payload)
+        return await asyncio.wait_for(call, timeout=handler.timeout)
+
+    async def run_job(self, job: Job) -> None:
+        if job.type not in JOB_HANDLERS:
+            await self.queue.fail(job, self.worker_id, f"No handler for job type {job.type}")
+            return
+        if job.attempts > job.max_attempts:
+            # Leased again after a crash with no attempts left
+            await self.queue.fail(job, self.worker_id, job.last_error or "Worker lost the job")
+            return
+
+        work = asyncio.create_task(self._execute(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, work))
+        try:
+            result = await work
+        except asyncio.CancelledError:
+            if not (work.cancelled() and heartbeat.done()):
+                # The worker itself is shutting down
+                raise
+            logger.warning(f"Job {job.id} ({job.type}) abandoned to its new lease holder")
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.type}) attempt {job.attempts} failed")
+            await self.queue.fail(job, self.worker_id, f"{type(e).__name__}: {e}")
+        else:
+            await self.queue.complete(job, self.worker_id, result)
+            logger.info(f"Job {job.id} ({job.type}) succeeded")
+        finally:
+            heartbeat.cancel()
+
+    async def _slot(self) -> None:
+        """One concurrent lease-and-run loop"""
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.lease(self.worker_id, self.job_types)
+            except Exception as e:
+                logger.error(f"Leasing failed: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+
+    async def _scheduler(self) -> None:
+        """Enqueue scheduled jobs; safe to run in every worker process"""
+        while not self._stopping.is_set():
+            for job_type, interval in SCHEDULED_JOBS:
+                if job_type not in self.job_types:
+                    continue
+                try:
+                    if await self.queue.enqueue_periodic(job_type, interval):
+                        logger.info(f"Scheduled {job_type}")
+                except Exception as e:
+                    logger.error(f"Scheduling {job_type} failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=30)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> None:
+        await self.queue.ensure_indexes()
+        logger.info(f"Worker {self.worker_id} serving: {', '.join(self.job_types) or 'nothing'}")
+        try:
+            await asyncio.gather(self._scheduler(), *(self._slot() for _ in range(self.concurrency)))
+        finally:
+            if self.process_pool:
+                self.process_pool.shutdown(wait=True)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+
+async def main(args) -> None:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+    # Same storage backend and client listeners as the API
+    client, db = open_storage(os.environ['DB_NAME'], event_listeners=[command_timer])
+    worker = Worker(db, args.concurrency, args.processes, args.poll_interval, args.job_type)
+    try:
+        await worker.run()
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CRM Musitech background job worker")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent jobs on the event loop")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="process pool size for CPU-bound jobs")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds to wait when the queue is empty")
+    parser.add_argument("--job-type", action="append", help="only serve these job types (repeatable)")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        logger.info("Worker stopped")
@@ -2,6 +2,9 @@
 """
 Backend Authentication System Test Suite
 Tests the JWT-based authentication system with MongoDB
+
+Runs against a live server by default. With --in-process the app is loaded
+here on in-memory storage, so no server or mongod is needed.
 """
 
 import requests
@@ -13,10 +16,19 @@ from datetime import datetime
 # Get backend URL from environment
 BACKEND_URL = "http://localhost:8000/api"
 
+def in_process_session():
+    """Serve the app in this process on in-memory storage"""
+    os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ.setdefault("DB_NAME", "crm_test")
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from fastapi.testclient import TestClient
+    from server import app
+    return TestClient(app, base_url="http://testserver")
+
 class AuthenticationTester:
-    def __init__(self):
-        self.base_url = BACKEND_URL
-        self.session = requests.Session()
+    def __init__(self, session=None, base_url=BACKEND_URL):
+        self.base_url = base_url
+        self.session = session or requests.Session()
         self.admin_token = None
         self.test_results = []
         
@@ -236,6 +248,46 @@ class AuthenticationTester:
             self.log_test("Profile Endpoint Test", False, f"Request error: {str(e)}")
             return False
     
+    def test_profile_conditional_get(self):
+        """Test GET /api/auth/profile returns 304 for a matching If-None-Match"""
+        if not self.admin_token:
+            self.log_test("Profile Conditional GET Test", False, "No admin token available")
+            return False
+        
+        try:
+            headers = {"Authorization": f"Bearer {self.admin_token}"}
+            
+            response = self.session.get(f"{self.base_url}/auth/profile", headers=headers)
+            etag = response.headers.get("ETag")
+            if response.status_code != 200 or not etag:
+                self.log_test(
+                    "Profile Conditional GET Test", 
+                    False, 
+                    f"Expected 200 with ETag, got HTTP {response.status_code} ETag={etag}"
+                )
+                return False
+            
+            headers["If-None-Match"] = etag
+            response = self.session.get(f"{self.base_url}/auth/me", headers=headers)
+            if response.status_code != 304 or response.content:
+                self.log_test(
+                    "Profile Conditional GET Test", 
+                    False, 
+                    f"Expected empty 304, got HTTP {response.status_code}"
+                )
+                return False
+            
+            self.log_test(
+                "Profile Conditional GET Test", 
+                True, 
+                f"Matching ETag {etag} returned 304 Not Modified"
+            )
+            return True
+            
+        except Exception as e:
+            self.log_test("Profile Conditional GET Test", False, f"Request error: {str(e)}")
+            return False
+    
     def test_profile_endpoint_without_token(self):
         """Test GET /api/auth/profile without token"""
         try:
@@ -421,6 +473,7 @@ class AuthenticationTester:
             self.test_admin_login,
             self.test_invalid_credentials,
             self.test_profile_endpoint_with_token,
+            self.test_profile_conditional_get,
             self.test_profile_endpoint_without_token,
             self.test_profile_endpoint_invalid_token,
             self.test_jwt_token_structure,
@@ -472,6 +525,11 @@ class AuthenticationTester:
         return passed == total
 
 if __name__ == "__main__":
-    tester = AuthenticationTester()
-    success = tester.run_all_tests()
+    if "--in-process" in sys.argv:
+        with in_process_session() as session:
+            tester = AuthenticationTester(session, "http://testserver/api")
+            success = tester.run_all_tests()
+    else:
+        tester = AuthenticationTester()
+        success = tester.run_all_tests()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level packages (services, models, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+os.environ.setdefault("DB_NAME", "crm_test")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import services.archive as archive_module
+from services.archive import DATASETS, ArchiveService, ArchiveStore
+from services.status_service import StatusService
+from storage.memory import MemoryClient
+
+pytestmark = pytest.mark.anyio
+
+AUDIT = DATASETS["audit_logs"]
+STATUS = DATASETS["status_checks"]
+NOW = datetime(2024, 6, 1, 12)
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()["archive_test"]
+
+
+@pytest.fixture
+def service(db, tmp_path):
+    return ArchiveService(db, ArchiveStore(tmp_path))
+
+
+def old_day(days_past_cutoff: int, dataset=AUDIT) -> datetime:
+    return ArchiveService.hot_cutoff(dataset, NOW) - timedelta(days=days_past_cutoff)
+
+
+async def insert_audit(db, day: datetime, count: int, user_id: str = "u1") -> None:
+    await db.audit_logs.insert_many([
+        {"user_id": user_id, "action": "login", "created_at": day + timedelta(minutes=i)} for i in range(count)
+    ])
+
+
+def archived_rows(service: ArchiveService, dataset, day: datetime) -> int:
+    return len(service.store.scan(dataset, day, day + timedelta(days=1)))
+
+
+async def test_unarchived_rows_past_cutoff_are_read_from_mongo(service, db):
+    day = old_day(3)
+    await insert_audit(db, day, 1)
+    rows = await service.query("audit_logs", day, day + timedelta(days=1))
+    assert len(rows) == 1
+
+
+async def test_query_routes_each_day_to_its_source(service, db):
+    first, second = old_day(3), old_day(2)
+    await insert_audit(db, first, 2)
+    await service.archive_dataset(AUDIT, now=NOW)
+    assert await db.audit_logs.count_documents({}) == 0
+
+    # A day past the cutoff the archiver has not reached yet
+    await insert_audit(db, second, 3)
+    rows = await service.query("audit_logs", first, second + timedelta(days=1))
+    assert [row["created_at"] for row in rows] == (
+        [first + timedelta(minutes=i) for i in range(2)] + [second + timedelta(minutes=i) for i in range(3)]
+    )
+
+
+async def test_query_filters_and_limit_span_sources(service, db):
+    first, second = old_day(3), old_day(2)
+    await insert_audit(db, first, 2, user_id="u1")
+    await insert_audit(db, first + timedelta(hours=1), 2, user_id="u2")
+    await service.archive_dataset(AUDIT, now=NOW)
+    await insert_audit(db, second, 2, user_id="u2")
+
+    rows = await service.query("audit_logs", first, second + timedelta(days=1), {"user_id": "u2"})
+    assert [row["user_id"] for row in rows] == ["u2"] * 4
+    rows = await service.query("audit_logs", first, second + timedelta(days=1), {"user_id": "u2"}, limit=3)
+    assert len(rows) == 3
+
+
+async def test_crash_before_delete_does_not_duplicate(service, db, monkeypatch):
+    day = old_day(3)
+    await insert_audit(db, day, 5)
+    monkeypatch.setattr(archive_module, "ARCHIVE_BATCH_SIZE", 2)
+
+    async def crash(*args, **kwargs):
+        raise Crash()
+
+    monkeypatch.setattr(db.audit_logs, "delete_many", crash)
+    with pytest.raises(Crash):
+        await service.archive_dataset(AUDIT, now=NOW)
+    monkeypatch.undo()
+    monkeypatch.setattr(archive_module, "ARCHIVE_BATCH_SIZE", 2)
+
+    result = await service.archive_dataset(AUDIT, now=NOW)
+    assert result["rows"] == 0
+    assert archived_rows(service, AUDIT, day) == 5
+    assert await db.audit_logs.count_documents({}) == 0
+
+
+async def test_crash_mid_day_rewrites_the_day(service, db, monkeypatch):
+    day = old_day(3)
+    await insert_audit(db, day, 5)
+    monkeypatch.setattr(archive_module, "ARCHIVE_BATCH_SIZE", 2)
+    write_partition = service.store.write_partition
+    calls = []
+
+    def write_then_crash(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise Crash()
+        return write_partition(*args)
+
+    monkeypatch.setattr(service.store, "write_partition", write_then_crash)
+    with pytest.raises(Crash):
+        await service.archive_dataset(AUDIT, now=NOW)
+    assert await db.audit_logs.count_documents({}) == 5
+    # The half-written day is not served from Parquet
+    assert len(await service.query("audit_logs", day, day + timedelta(days=1))) == 5
+
+    monkeypatch.setattr(service.store, "write_partition", write_partition)
+    await service.archive_dataset(AUDIT, now=NOW)
+    assert archived_rows(service, AUDIT, day) == 5
+    assert await db.audit_logs.count_documents({}) == 0
+    assert len(await service.query("audit_logs", day, day + timedelta(days=1))) == 5
+
+
+async def test_late_rows_for_an_archived_day_are_added_once(service, db):
+    day = old_day(3)
+    await insert_audit(db, day, 2)
+    await service.archive_dataset(AUDIT, now=NOW)
+    await insert_audit(db, day + timedelta(hours=5), 1)
+
+    assert (await service.archive_dataset(AUDIT, now=NOW))["rows"] == 1
+    assert (await service.archive_dataset(AUDIT, now=NOW))["rows"] == 0
+    assert archived_rows(service, AUDIT, day) == 3
+    assert await db.audit_logs.count_documents({}) == 0
+
+
+async def test_copy_only_dataset_keeps_rows_and_is_not_recopied(service, db):
+    day = old_day(1, STATUS)
+    await db.status_checks.insert_many([{"client_name": "a", "timestamp": day + timedelta(minutes=i)} for i in range(3)])
+    await service.archive_dataset(STATUS, now=NOW)
+    await service.archive_dataset(STATUS, now=NOW)
+    assert archived_rows(service, STATUS, day) == 3
+    assert await db.status_checks.count_documents({}) == 3
+    assert len(await service.query("status_checks", day, day + timedelta(days=1), {"client_name": "a"})) == 3
+
+
+async def test_status_day_is_archived_before_the_ttl_drops_any_point(service, db, monkeypatch):
+    monkeypatch.setattr("storage.memory.TTL_SWEEP_SECONDS", 0)
+    await StatusService(db).ensure_collections()
+    now = datetime.utcnow()
+    # The newest day a run at `now` archives; every earlier day went in earlier runs
+    day = ArchiveService.hot_cutoff(STATUS, now) - timedelta(days=1)
+    points = [{"client_name": "a", "timestamp": day + timedelta(minutes=10 * i)} for i in range(6 * 24)]
+    await db.status_checks.insert_many(points)
+
+    # The time-series TTL sweeps on every read here
+    assert await db.status_checks.count_documents({}) == len(points)
+    await service.archive_dataset(STATUS, now=now)
+    assert archived_rows(service, STATUS, day) == len(points)
+
+
+async def test_nested_fields_read_back_the_same_from_both_sources(service, db):
+    first, second = old_day(3), old_day(2)
+    details = {"ip": "10.0.0.1", "changes": [{"field": "role", "to": "admin"}]}
+    await db.audit_logs.insert_many([
+        {"user_id": "u1", "action": "update", "created_at": first, "details": details},
+        {"user_id": "u1", "action": "update", "created_at": first + timedelta(minutes=1), "details": "plain"},
+        {"user_id": "u1", "action": "login", "created_at": first + timedelta(minutes=2), "details": None},
+    ])
+    await service.archive_dataset(AUDIT, now=NOW)
+    await db.audit_logs.insert_one({"user_id": "u1", "action": "update", "created_at": second, "details": details})
+
+    rows = await service.query("audit_logs", first, second + timedelta(days=1))
+    assert [row["details"] for row in rows] == [details, "plain", None, details]
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from cryptography.fernet import Fernet
+from fastapi import HTTPException
+
+import services.credentials as credentials_module
+from services.credentials import CredentialManager, OAuthProvider, TokenCipher
+from storage.memory import MemoryClient
+
+pytestmark = pytest.mark.anyio
+
+LATENCY = 0.05
+
+
+class FakeOAuthServer:
+    """Token endpoint speaking both refresh styles, counting the requests it serves"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.requests = 0
+        self.response = None  # (status, body) override for every request
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, params: dict):
+                server.requests += 1
+                time.sleep(server.latency)
+                if server.response is not None:
+                    code, body = server.response
+                else:
+                    grant = params.get("grant_type", [""])[0]
+                    body = {"access_token": f"{grant}-token-{server.requests}", "expires_in": 3600}
+                    if grant == "refresh_token":
+                        body["refresh_token"] = f"rotated-{server.requests}"
+                    code = 200
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self._respond(parse_qs(self.rfile.read(length).decode()))
+
+            def do_GET(self):
+                self._respond(parse_qs(urlparse(self.path).query))
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/token"
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+
+@pytest.fixture
+def fake():
+    server = FakeOAuthServer(LATENCY)
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture
+def cipher():
+    return TokenCipher(Fernet.generate_key().decode())
+
+
+@pytest.fixture
+async def db():
+    db = MemoryClient()["credentials_test"]
+    now = datetime.utcnow()
+    await db.user_credentials.insert_many([
+        {"user_id": "expired", "provider": "google", "access_token": "stale", "refresh_token": "r1", "expires_at": now - timedelta(minutes=5)},
+        {"user_id": "in-margin", "provider": "google", "access_token": "nearly", "refresh_token": "r2",
+         "expires_at": now + timedelta(seconds=credentials_module.REFRESH_MARGIN_SECONDS / 2)},
+        {"user_id": "fresh", "provider": "google", "access_token": "good", "refresh_token": "r3", "expires_at": now + timedelta(hours=1)},
+        {"user_id": "prefetch", "provider": "facebook", "access_token": "fb-long-lived",
+         "expires_at": now + timedelta(seconds=credentials_module.REFRESH_MARGIN_SECONDS + 30)},
+    ])
+    return db
+
+
+@pytest.fixture
+def manager(db, fake, cipher):
+    providers = {
+        "google": OAuthProvider("google", fake.url, "id", "secret", "refresh_token"),
+        "facebook": OAuthProvider("facebook", fake.url, "id", "secret", "fb_exchange_token", 60 * 24 * 3600),
+    }
+    return CredentialManager(db, providers, cipher)
+
+
+async def test_stampede_on_expired_token_makes_one_refresh(manager, fake):
+    tokens = await asyncio.gather(*(manager.get_access_token("expired", "google") for _ in range(500)))
+    assert fake.requests == 1
+    assert set(tokens) == {"refresh_token-token-1"}
+    assert manager.metrics.refreshes == 1
+
+
+async def test_refreshed_tokens_are_stored_encrypted(manager, db, cipher):
+    token = await manager.get_access_token("expired", "google")
+    stored = await db.user_credentials.find_one({"user_id": "expired"})
+    assert stored["access_token"].startswith("fernet:")
+    assert cipher.decrypt(stored["access_token"]) == token
+    assert cipher.decrypt(stored["refresh_token"]) == "rotated-1"
+    assert stored["expires_at"] > datetime.utcnow() + timedelta(minutes=59)
+
+
+async def test_cached_lookups_never_reach_the_provider(manager, fake, db):
+    await manager.get_access_token("expired", "google")
+    await db.user_credentials.delete_many({})
+    for _ in range(1000):
+        assert await manager.get_access_token("expired", "google") == "refresh_token-token-1"
+    assert fake.requests == 1
+    assert manager.metrics.hits == 1000
+
+
+async def test_valid_stored_token_is_used_without_refresh(manager, fake):
+    assert await manager.get_access_token("fresh", "google") == "good"
+    assert fake.requests == 0
+
+
+async def test_token_inside_refresh_margin_counts_as_expired(manager, fake):
+    assert await manager.get_access_token("in-margin", "google") == "refresh_token-token-1"
+    assert fake.requests == 1
+
+
+async def test_near_expiry_hit_refreshes_in_background(manager, fake):
+    assert await manager.get_access_token("prefetch", "facebook") == "fb-long-lived"
+    start = time.perf_counter()
+    assert await manager.get_access_token("prefetch", "facebook") == "fb-long-lived"
+    assert time.perf_counter() - start < LATENCY
+    await asyncio.sleep(LATENCY * 3 + 0.2)
+    assert (await manager.get_access_token("prefetch", "facebook")).startswith("fb_exchange_token-")
+    assert manager.metrics.background_refreshes == 1
+
+
+async def test_background_refresh_uses_a_token_another_worker_stored(manager, fake, db, cipher):
+    assert await manager.get_access_token("prefetch", "facebook") == "fb-long-lived"
+    # Another process refreshed it in the meantime
+    await db.user_credentials.update_one({"user_id": "prefetch"}, {"$set": {
+        "access_token": cipher.encrypt("from-other-worker"),
+        "expires_at": datetime.utcnow() + timedelta(hours=1),
+    }})
+    assert await manager.get_access_token("prefetch", "facebook") == "fb-long-lived"
+    await asyncio.sleep(0.2)
+    assert await manager.get_access_token("prefetch", "facebook") == "from-other-worker"
+    assert fake.requests == 0
+
+
+async def test_rejected_refresh_raises_502(manager, fake):
+    fake.response = (400, {"error": "invalid_grant"})
+    with pytest.raises(HTTPException) as error:
+        await manager.get_access_token("expired", "google")
+    assert error.value.status_code == 502
+    assert manager.metrics.refresh_failures == 1
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"access_token": ""},
+    {"access_token": None, "expires_in": 3600},
+    {"access_token": "t", "expires_in": "soon"},
+    ["not", "an", "object"],
+])
+async def test_malformed_success_response_raises_502(manager, fake, body):
+    fake.response = (200, body)
+    with pytest.raises(HTTPException) as error:
+        await manager.get_access_token("expired", "google")
+    assert error.value.status_code == 502
+    assert manager.metrics.refresh_failures == 1
+
+
+async def test_missing_credentials_raise_404(manager):
+    with pytest.raises(HTTPException) as error:
+        await manager.get_access_token("nobody", "google")
+    assert error.value.status_code == 404
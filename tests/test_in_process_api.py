@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client():
+    # conftest selects STORAGE_BACKEND=memory before the app is imported
+    from server import app
+    with TestClient(app, base_url="http://testserver") as test_client:
+        yield test_client
+
+
+def login(client: TestClient, email: str, password: str) -> dict:
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="module")
+def admin_headers(client):
+    return login(client, "admin@musitech.com", "admin")
+
+
+@pytest.fixture(scope="module")
+def client_headers(client):
+    response = client.post("/api/auth/register", json={"email": "owner@example.com", "password": "secret123"})
+    assert response.status_code == 200, response.text
+    return login(client, "owner@example.com", "secret123")
+
+
+def test_admin_stats(client, admin_headers):
+    response = client.get("/api/admin/stats", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["total_admins"] == 1
+    assert body["total_users"] >= 1
+
+
+def test_job_metrics(client, admin_headers):
+    response = client.get("/api/jobs/metrics", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["ready"] == 0
+
+
+@pytest.mark.parametrize("name", ["spend", "leads_by_source", "conversion_funnel"])
+def test_reports(client, client_headers, name):
+    response = client.get(f"/api/reports/{name}", headers=client_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["name"] == name
@@ -0,0 +1,313 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from storage.memory import MemoryClient, UnsupportedOperation, apply_update, matches
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()["memory_test"]
+
+
+@pytest.fixture
+async def people(db):
+    await db.people.insert_many([
+        {"name": "ada", "age": 36, "tags": ["math", "code"], "team": {"name": "core"}, "joined": datetime(2024, 1, 5, 9)},
+        {"name": "bob", "age": 25, "tags": ["ops"], "team": {"name": "infra"}, "joined": datetime(2024, 1, 5, 17)},
+        {"name": "cy", "age": 41, "tags": [], "joined": datetime(2024, 1, 6, 8)},
+        {"name": "dee", "age": None, "joined": datetime(2024, 1, 7, 12)},
+    ])
+    return db.people
+
+
+# -- query operators ---------------------------------------------------------
+
+@pytest.mark.parametrize("query, expected", [
+    ({}, ["ada", "bob", "cy", "dee"]),
+    ({"age": 36}, ["ada"]),
+    ({"age": {"$gt": 30}}, ["ada", "cy"]),
+    ({"age": {"$gte": 25, "$lt": 41}}, ["ada", "bob"]),
+    ({"age": {"$lte": 25}}, ["bob"]),
+    ({"age": {"$ne": 36}}, ["bob", "cy", "dee"]),
+    ({"age": {"$in": [25, 41]}}, ["bob", "cy"]),
+    ({"age": {"$nin": [25, 41]}}, ["ada", "dee"]),
+    ({"age": None}, ["dee"]),
+    ({"team": None}, ["cy", "dee"]),
+    ({"team": {"$exists": True}}, ["ada", "bob"]),
+    ({"team.name": "infra"}, ["bob"]),
+    ({"tags": "code"}, ["ada"]),
+    ({"tags": {"$size": 0}}, ["cy"]),
+    ({"name": {"$regex": "^[a-b]"}}, ["ada", "bob"]),
+    ({"name": {"$regex": "^D", "$options": "i"}}, ["dee"]),
+    ({"age": {"$not": {"$gt": 30}}}, ["bob", "dee"]),
+    ({"$or": [{"age": 25}, {"name": "cy"}]}, ["bob", "cy"]),
+    ({"$and": [{"age": {"$gt": 20}}, {"age": {"$lt": 40}}]}, ["ada", "bob"]),
+    ({"$nor": [{"age": 25}, {"age": None}]}, ["ada", "cy"]),
+    ({"joined": {"$gte": datetime(2024, 1, 6)}}, ["cy", "dee"]),
+])
+async def test_query_operators(people, query, expected):
+    docs = await people.find(query, {"_id": 0, "name": 1}).sort("name", 1).to_list(None)
+    assert [doc["name"] for doc in docs] == expected
+
+
+def test_unknown_query_operator_is_unsupported():
+    with pytest.raises(UnsupportedOperation):
+        matches({"a": 1}, {"a": {"$elemMatch": {"b": 1}}})
+    with pytest.raises(NotImplementedError):
+        matches({"a": 1}, {"$where": "true"})
+
+
+# -- projection and sort -----------------------------------------------------
+
+async def test_inclusion_and_exclusion_projection(people):
+    doc = await people.find_one({"name": "ada"}, {"_id": 0, "name": 1, "age": 1})
+    assert doc == {"name": "ada", "age": 36}
+    doc = await people.find_one({"name": "ada"}, {"tags": 0, "team": 0, "joined": 0})
+    assert set(doc) == {"_id", "name", "age"}
+    doc = await people.find_one({"name": "ada"}, ["name"])
+    assert set(doc) == {"_id", "name"}
+
+
+async def test_results_are_copies(people):
+    doc = await people.find_one({"name": "ada"})
+    doc["tags"].append("mutated")
+    assert (await people.find_one({"name": "ada"}))["tags"] == ["math", "code"]
+
+
+async def test_sort_orders_by_bson_type_then_value(people):
+    names = [doc["name"] for doc in await people.find().sort("age", 1).to_list(None)]
+    assert names == ["dee", "bob", "ada", "cy"]
+    names = [doc["name"] for doc in await people.find().sort([("age", -1)]).to_list(None)]
+    assert names == ["cy", "ada", "bob", "dee"]
+
+
+async def test_compound_sort_skip_limit(db):
+    await db.rows.insert_many([{"g": i % 2, "n": i} for i in range(6)])
+    cursor = db.rows.find({}, {"_id": 0}).sort([("g", 1), ("n", -1)]).skip(1).limit(3)
+    assert await cursor.to_list(None) == [{"g": 0, "n": 2}, {"g": 0, "n": 0}, {"g": 1, "n": 5}]
+
+
+async def test_to_list_batches(db):
+    await db.rows.insert_many([{"n": i} for i in range(5)])
+    cursor = db.rows.find({}, {"_id": 0}).sort("n", 1)
+    assert [doc["n"] for doc in await cursor.to_list(2)] == [0, 1]
+    assert [doc["n"] async for doc in cursor] == [2, 3, 4]
+
+
+# -- updates ---------------------------------------------------------------
+
+def test_update_operators():
+    doc = {"n": 1, "low": 5, "high": 5, "tags": ["a"], "gone": True, "nested": {"x": 1}}
+    updated = apply_update(doc, {
+        "$set": {"nested.y": 2},
+        "$inc": {"n": 2, "fresh": 1},
+        "$mul": {"low": 2},
+        "$min": {"low": 3},
+        "$max": {"high": 9},
+        "$unset": {"gone": ""},
+        "$push": {"tags": "b"},
+        "$addToSet": {"set": {"$each": ["x", "x", "y"]}},
+    })
+    assert updated == {
+        "n": 3, "fresh": 1, "low": 3, "high": 9, "tags": ["a", "b"],
+        "set": ["x", "y"], "nested": {"x": 1, "y": 2},
+    }
+    assert doc["n"] == 1
+
+
+def test_pull_and_current_date():
+    updated = apply_update({"tags": ["a", "b", "a"], "items": [{"k": 1}, {"k": 2}]}, {
+        "$pull": {"tags": "a", "items": {"k": 2}},
+        "$currentDate": {"seen": True},
+    })
+    assert updated["tags"] == ["b"]
+    assert updated["items"] == [{"k": 1}]
+    assert isinstance(updated["seen"], datetime)
+
+
+def test_set_on_insert_only_applies_when_inserting():
+    assert apply_update({}, {"$setOnInsert": {"a": 1}}) == {}
+    assert apply_update({}, {"$setOnInsert": {"a": 1}}, inserting=True) == {"a": 1}
+
+
+async def test_update_counts(people):
+    result = await people.update_many({"age": {"$gt": 30}}, {"$set": {"senior": True}})
+    assert (result.matched_count, result.modified_count) == (2, 2)
+    result = await people.update_one({"name": "ada"}, {"$set": {"senior": True}})
+    assert (result.matched_count, result.modified_count) == (1, 0)
+
+
+async def test_upsert_seeds_from_equality_filter(db):
+    result = await db.rows.update_one(
+        {"key": "a", "day": {"$eq": "2024-01-01"}, "n": {"$gt": 0}},
+        {"$inc": {"n": 1}, "$setOnInsert": {"created": True}},
+        upsert=True
+    )
+    assert result.upserted_id is not None
+    doc = await db.rows.find_one({"key": "a"}, {"_id": 0})
+    assert doc == {"key": "a", "day": "2024-01-01", "n": 1, "created": True}
+
+    result = await db.rows.update_one({"key": "a"}, {"$inc": {"n": 1}, "$setOnInsert": {"created": False}}, upsert=True)
+    assert result.upserted_id is None
+    assert await db.rows.find_one({"key": "a"}, {"_id": 0}) == {"key": "a", "day": "2024-01-01", "n": 2, "created": True}
+
+
+async def test_find_one_and_update_return_document(db):
+    await db.rows.insert_one({"key": "a", "n": 1})
+    before = await db.rows.find_one_and_update({"key": "a"}, {"$inc": {"n": 1}}, projection={"_id": 0})
+    assert before == {"key": "a", "n": 1}
+    after = await db.rows.find_one_and_update(
+        {"key": "a"}, {"$inc": {"n": 1}}, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    assert after == {"key": "a", "n": 3}
+    assert await db.rows.find_one_and_update({"key": "b"}, {"$set": {"n": 1}}) is None
+    upserted = await db.rows.find_one_and_update(
+        {"key": "b"}, {"$set": {"n": 1}}, projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    assert upserted == {"key": "b", "n": 1}
+
+
+async def test_find_one_and_update_picks_by_sort(db):
+    await db.jobs.insert_many([{"id": i, "priority": p} for i, p in enumerate([1, 5, 3])])
+    leased = await db.jobs.find_one_and_update(
+        {}, {"$set": {"leased": True}}, sort=[("priority", -1)], return_document=ReturnDocument.AFTER
+    )
+    assert leased["id"] == 1 and leased["leased"]
+
+
+async def test_bulk_write_upserts(db):
+    result = await db.rows.bulk_write([
+        UpdateOne({"key": "a"}, {"$set": {"n": 1}}, upsert=True),
+        UpdateOne({"key": "a"}, {"$set": {"n": 2}}, upsert=True),
+    ])
+    assert (result.upserted_count, result.modified_count) == (1, 1)
+    assert await db.rows.count_documents({}) == 1
+
+
+async def test_unique_index(db):
+    await db.rows.create_index("key", unique=True)
+    await db.rows.insert_one({"key": "a"})
+    with pytest.raises(DuplicateKeyError):
+        await db.rows.insert_one({"key": "a"})
+    await db.rows.insert_one({"key": "b"})
+    with pytest.raises(DuplicateKeyError):
+        await db.rows.update_one({"key": "b"}, {"$set": {"key": "a"}})
+
+
+async def test_partial_ttl_index_only_expires_matching_documents(db, monkeypatch):
+    monkeypatch.setattr("storage.memory.TTL_SWEEP_SECONDS", 0)
+    await db.jobs.create_index(
+        "finished_at", expireAfterSeconds=60, partialFilterExpression={"status": {"$in": ["succeeded", "failed"]}}
+    )
+    old = datetime.utcnow() - timedelta(minutes=5)
+    await db.jobs.insert_many([
+        {"id": "done", "status": "succeeded", "finished_at": old},
+        {"id": "odd", "status": "running", "finished_at": old},
+        {"id": "recent", "status": "failed", "finished_at": datetime.utcnow()},
+    ])
+    assert sorted(await db.jobs.distinct("id")) == ["odd", "recent"]
+
+
+async def test_time_series_ttl_applies_to_handles_taken_before_creation(db, monkeypatch):
+    monkeypatch.setattr("storage.memory.TTL_SWEEP_SECONDS", 0)
+    points = db.points
+    assert await db.list_collection_names() == []
+    await db.create_collection("points", timeseries={"timeField": "ts"}, expireAfterSeconds=60)
+    assert await db.list_collection_names(filter={"name": "points"}) == ["points"]
+    await points.insert_many([{"ts": datetime.utcnow() - timedelta(minutes=5)}, {"ts": datetime.utcnow()}])
+    assert await points.count_documents({}) == 1
+
+
+# -- aggregation -----------------------------------------------------------
+
+async def test_group_by_day_with_accumulators(people):
+    rows = await people.aggregate([
+        {"$match": {"joined": {"$gte": datetime(2024, 1, 1)}}},
+        {"$group": {
+            "_id": {"day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$joined"}}},
+            "count": {"$sum": 1},
+            "ages": {"$sum": "$age"},
+            "oldest": {"$max": "$age"},
+            "youngest": {"$min": "$age"},
+            "names": {"$push": "$name"},
+            "team": {"$first": {"$ifNull": ["$team.name", "none"]}},
+        }},
+        {"$sort": {"_id.day": 1}},
+    ]).to_list(None)
+    assert rows == [
+        {"_id": {"day": "2024-01-05"}, "count": 2, "ages": 61, "oldest": 36, "youngest": 25, "names": ["ada", "bob"], "team": "core"},
+        {"_id": {"day": "2024-01-06"}, "count": 1, "ages": 41, "oldest": 41, "youngest": 41, "names": ["cy"], "team": "none"},
+        {"_id": {"day": "2024-01-07"}, "count": 1, "ages": 0, "oldest": None, "youngest": None, "names": ["dee"], "team": "none"},
+    ]
+
+
+async def test_cond_and_comparison_expressions(people):
+    rows = await people.aggregate([
+        {"$group": {
+            "_id": None,
+            "over_30": {"$sum": {"$cond": [{"$gte": ["$age", 30]}, 1, 0]}},
+            "named_a": {"$sum": {"$cond": {"if": {"$eq": ["$name", "ada"]}, "then": 1, "else": 0}}},
+        }},
+    ]).to_list(None)
+    assert rows == [{"_id": None, "over_30": 2, "named_a": 1}]
+
+
+async def test_project_facet_count_limit(people):
+    [result] = await people.aggregate([
+        {"$project": {"_id": 0, "name": 1, "age": 1, "decade": {"$multiply": [10, 1]}, "team": "$team.name"}},
+        {"$facet": {
+            "adults": [{"$match": {"age": {"$gte": 30}}}, {"$count": "count"}],
+            "nobody": [{"$match": {"age": {"$gte": 100}}}, {"$count": "count"}],
+            "top": [{"$sort": {"age": -1}}, {"$limit": 2}],
+        }},
+    ]).to_list(1)
+    assert result["adults"] == [{"count": 2}]
+    assert result["nobody"] == []
+    assert result["top"] == [
+        {"name": "cy", "age": 41, "decade": 10},
+        {"name": "ada", "age": 36, "decade": 10, "team": "core"},
+    ]
+
+
+async def test_date_trunc_and_now(db):
+    await db.points.insert_many([
+        {"at": datetime(2024, 1, 5, 9, 12, 30)},
+        {"at": datetime(2024, 1, 5, 9, 48)},
+        {"at": datetime(2024, 1, 5, 10, 1)},
+    ])
+    rows = await db.points.aggregate([
+        {"$group": {"_id": {"$dateTrunc": {"date": "$at", "unit": "hour"}}, "count": {"$sum": 1}}},
+        {"$project": {"_id": 0, "bucket": "$_id", "count": 1, "seen": "$$NOW"}},
+        {"$sort": {"bucket": 1}},
+    ]).to_list(None)
+    assert [(row["bucket"], row["count"]) for row in rows] == [
+        (datetime(2024, 1, 5, 9), 2), (datetime(2024, 1, 5, 10), 1),
+    ]
+    assert all(isinstance(row["seen"], datetime) for row in rows)
+
+
+async def test_merge_upserts_into_target(db):
+    await db.rollup.insert_one({"client": "a", "bucket": 1, "count": 99, "keep": True})
+    await db.raw.insert_many([{"client": "a", "bucket": 1}, {"client": "a", "bucket": 1}, {"client": "b", "bucket": 1}])
+    pipeline = [
+        {"$group": {"_id": {"client": "$client", "bucket": "$bucket"}, "count": {"$sum": 1}}},
+        {"$project": {"_id": 0, "client": "$_id.client", "bucket": "$_id.bucket", "count": 1}},
+        {"$merge": {"into": "rollup", "on": ["client", "bucket"], "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    assert await db.raw.aggregate(pipeline).to_list(None) == []
+    rows = await db.rollup.find({}, {"_id": 0}).sort("client", 1).to_list(None)
+    assert rows == [{"client": "a", "bucket": 1, "count": 2}, {"client": "b", "bucket": 1, "count": 1}]
+
+
+async def test_unsupported_stage_and_change_streams(db):
+    with pytest.raises(UnsupportedOperation):
+        await db.rows.aggregate([{"$lookup": {"from": "x", "localField": "a", "foreignField": "b", "as": "c"}}]).to_list(None)
+    with pytest.raises(UnsupportedOperation):
+        db.rows.watch()
+    with pytest.raises(UnsupportedOperation):
+        db.watch()
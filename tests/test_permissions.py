@@ -0,0 +1,144 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from models.user import User, UserRole
+from routers.auth import get_current_principal, require
+from services.permissions import (
+    ALL_PERMISSIONS,
+    NO_PERMISSIONS,
+    PERMISSION_ACTIONS,
+    PERMISSION_MODULES,
+    ROLE_TEMPLATES,
+    compile_permissions,
+    compile_user_permissions,
+    permission_bit,
+)
+from services.user_cache import CachedUser
+
+
+def subuser(role_name=None, permissions=None, is_active=True) -> User:
+    return User(
+        email="sub@example.com",
+        password_hash="x",
+        role=UserRole.SUBUSER,
+        parent_client_id="client-1",
+        role_name=role_name,
+        permissions=permissions or {},
+        is_active=is_active,
+    )
+
+
+def bits(*permissions: str) -> int:
+    mask = NO_PERMISSIONS
+    for permission in permissions:
+        mask |= permission_bit(permission)
+    return mask
+
+
+def test_every_permission_has_its_own_bit():
+    all_bits = [permission_bit(f"{m}:{a}") for m in PERMISSION_MODULES for a in PERMISSION_ACTIONS]
+    assert len(set(all_bits)) == len(all_bits)
+    assert sum(all_bits) == ALL_PERMISSIONS
+
+
+def test_unknown_permission_is_rejected():
+    with pytest.raises(ValueError):
+        permission_bit("leads:launch")
+    with pytest.raises(ValueError):
+        permission_bit("billing:read")
+
+
+def test_compile_ignores_unknown_modules_and_actions():
+    assert compile_permissions({"leads": ["read", "launch"], "billing": ["read"]}) == bits("leads:read")
+
+
+def test_override_replaces_whole_module():
+    base = bits("leads:read", "leads:write", "campaigns:read")
+    assert compile_permissions({"leads": ["delete"]}, base) == bits("leads:delete", "campaigns:read")
+    assert compile_permissions({"leads": []}, base) == bits("campaigns:read")
+
+
+def test_role_templates_never_grant_user_management():
+    # Mirrors the frontend, where every role has user_management: []
+    for name, template in ROLE_TEMPLATES.items():
+        assert template["user_management"] == [], name
+        mask = compile_permissions(template)
+        for action in PERMISSION_ACTIONS:
+            assert not mask & permission_bit(f"user_management:{action}"), name
+
+
+def test_full_access_template():
+    assert compile_user_permissions(subuser("Full Access")) == bits(
+        "dashboard:read",
+        "leads:read", "leads:write", "leads:delete",
+        "campaigns:read", "campaigns:write", "campaigns:delete",
+        "reports:read",
+        "integrations:read", "integrations:write",
+        "attribution:read",
+        "analytics:read",
+    )
+
+
+def test_role_plus_per_user_grant_and_revoke():
+    mask = compile_user_permissions(subuser("Analytics Viewer", {"leads": ["read", "write"], "reports": []}))
+    assert mask & permission_bit("leads:write")
+    assert not mask & permission_bit("reports:read")
+    assert mask & permission_bit("campaigns:read")
+
+
+def test_unknown_role_gets_only_its_overrides():
+    assert compile_user_permissions(subuser("Intern")) == NO_PERMISSIONS
+    assert compile_user_permissions(subuser("Intern", {"leads": ["read"]})) == bits("leads:read")
+
+
+def test_owner_roles_and_inactive_subusers():
+    assert compile_user_permissions(User(email="a@example.com", password_hash="x", role=UserRole.ADMIN)) == ALL_PERMISSIONS
+    assert compile_user_permissions(User(email="c@example.com", password_hash="x", role=UserRole.CLIENT)) == ALL_PERMISSIONS
+    assert compile_user_permissions(subuser("Full Access", is_active=False)) == NO_PERMISSIONS
+
+
+def make_client(user: User) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/leads")
+    async def list_leads(principal: CachedUser = Depends(require("leads:read"))):
+        return {"id": principal.user.id}
+
+    @app.delete("/leads")
+    async def delete_leads(principal: CachedUser = Depends(require("leads:delete"))):
+        return {"id": principal.user.id}
+
+    @app.get("/users")
+    async def list_users(principal: CachedUser = Depends(require("user_management:read"))):
+        return {"id": principal.user.id}
+
+    app.dependency_overrides[get_current_principal] = lambda: CachedUser(user)
+    return TestClient(app)
+
+
+def test_require_allows_role_permission():
+    client = make_client(subuser("Lead Manager"))
+    assert client.get("/leads").status_code == 200
+    assert client.delete("/leads").status_code == 200
+
+
+def test_require_applies_revoke_override():
+    client = make_client(subuser("Lead Manager", {"leads": ["read"]}))
+    assert client.get("/leads").status_code == 200
+    response = client.delete("/leads")
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Missing permission: leads:delete"
+
+
+def test_require_applies_grant_override():
+    client = make_client(subuser("Analytics Viewer", {"leads": ["read", "delete"]}))
+    assert client.delete("/leads").status_code == 200
+
+
+def test_require_denies_unknown_role():
+    assert make_client(subuser("Intern")).get("/leads").status_code == 403
+
+
+def test_require_denies_user_management_to_full_access():
+    assert make_client(subuser("Full Access")).get("/users").status_code == 403
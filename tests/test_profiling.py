@@ -0,0 +1,53 @@
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from utils.profiling import Profiler, ProfilingMiddleware
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def profiler():
+    profiler = Profiler()
+    profiler.start(60, 1.0, stacks=False)
+    yield profiler
+    profiler.stop()
+
+
+@pytest.fixture
+def client(profiler):
+    app = FastAPI()
+    router = APIRouter(prefix="/jobs")
+
+    @router.get("/{job_id}")
+    async def get_job(job_id: str):
+        return {"id": job_id}
+
+    @app.get("/api/leads/{lead_ref}/comments")
+    async def comments(lead_ref: str):
+        return []
+
+    app.include_router(router, prefix="/api")
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_traces_are_grouped_by_route_template(client, profiler):
+    async with client:
+        for job_id in ("a1", "b2", "c3"):
+            assert (await client.get(f"/api/jobs/{job_id}")).status_code == 200
+        await client.get("/api/leads/lead-1/comments")
+        await client.get("/api/leads/lead-2/comments")
+
+    routes = {row["route"]: row["count"] for row in profiler.summary()}
+    assert routes == {"GET /api/jobs/{job_id}": 3, "GET /api/leads/{lead_ref}/comments": 2}
+    stacks = profiler.span_stacks()
+    assert "GET /api/jobs/{job_id};other" in stacks
+    assert "/api/jobs/a1" not in stacks
+
+
+async def test_unmatched_path_falls_back_to_raw_path(client, profiler):
+    async with client:
+        assert (await client.get("/nowhere")).status_code == 404
+    assert [row["route"] for row in profiler.summary()] == ["GET /nowhere"]
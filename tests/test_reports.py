@@ -0,0 +1,140 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import services.reports as reports_module
+from services.events import _mark_report_days
+from services.reports import ReportEngine, mark_data_changed
+from storage.memory import MemoryClient
+
+pytestmark = pytest.mark.anyio
+
+TENANT = "tenant-a"
+DAY = date(2024, 3, 4)
+
+
+DAY_START = datetime.combine(DAY, datetime.min.time())
+
+
+def lead(lead_id: str, source: str, status: str = "New", hours: int = 9) -> dict:
+    created = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=hours)
+    return {"id": lead_id, "tenant_id": TENANT, "source": source, "status": status, "created_at": created, "updated_at": created}
+
+
+@pytest.fixture
+async def db():
+    db = MemoryClient()["reports_test"]
+    await db.leads.insert_one(lead("1", "ads"))
+    return db
+
+
+async def test_unchanged_data_is_served_from_cache(db):
+    engine = ReportEngine(db, TENANT)
+    first = await engine.generate("leads_by_source", DAY, DAY)
+    second = await engine.generate("leads_by_source", DAY, DAY)
+    assert not first.cached
+    assert second.cached
+    assert second.rows == first.rows == [{"key": "ads", "leads": 1}]
+
+
+async def test_cache_hit_does_not_read_the_source(db, monkeypatch):
+    engine = ReportEngine(db, TENANT)
+    await engine.generate("leads_by_source", DAY - timedelta(days=30), DAY)
+
+    def scan(*args, **kwargs):
+        raise AssertionError("cache hit aggregated the source collection")
+
+    monkeypatch.setattr(db.leads, "aggregate", scan)
+    assert (await engine.generate("leads_by_source", DAY - timedelta(days=30), DAY)).cached
+
+
+async def test_insert_marked_changed_updates_result(db):
+    engine = ReportEngine(db, TENANT)
+    assert (await engine.generate("leads_by_source", DAY, DAY)).rows == [{"key": "ads", "leads": 1}]
+
+    await db.leads.insert_one(lead("2", "ads", hours=10))
+    await mark_data_changed(db, TENANT, "leads", DAY_START + timedelta(hours=10))
+    result = await engine.generate("leads_by_source", DAY, DAY)
+    assert not result.cached
+    assert result.rows == [{"key": "ads", "leads": 2}]
+
+
+async def test_delete_marked_changed_updates_result(db):
+    engine = ReportEngine(db, TENANT)
+    await db.leads.insert_one(lead("2", "email", hours=10))
+    assert len((await engine.generate("leads_by_source", DAY, DAY)).rows) == 2
+    await db.leads.delete_one({"id": "2"})
+    await mark_data_changed(db, TENANT, "leads", DAY_START)
+    assert (await engine.generate("leads_by_source", DAY, DAY)).rows == [{"key": "ads", "leads": 1}]
+
+
+async def test_unsignalled_write_shows_up_once_stale(db, monkeypatch):
+    engine = ReportEngine(db, TENANT)
+    before = await engine.generate("conversion_funnel", DAY, DAY)
+    assert before.rows[1]["leads"] == 0
+
+    await db.leads.update_one({"id": "1"}, {"$set": {"status": "Qualified"}})
+    assert (await engine.generate("conversion_funnel", DAY, DAY)).cached
+    monkeypatch.setattr(reports_module, "REPORT_MAX_STALENESS", timedelta(0))
+    after = await engine.generate("conversion_funnel", DAY, DAY)
+    assert not after.cached
+    assert after.rows[1] == {"key": "Qualified", "leads": 1, "conversion_rate": 1.0}
+
+
+@pytest.mark.parametrize("change", [
+    {"operationType": "insert", "fullDocument": lead("2", "ads", hours=10)},
+    {"operationType": "delete", "fullDocumentBeforeChange": lead("1", "ads")},
+])
+async def test_change_stream_events_mark_the_day_changed(db, change):
+    engine = ReportEngine(db, TENANT)
+    await engine.generate("leads_by_source", DAY, DAY)
+    await _mark_report_days(db, "leads", change)
+    assert not (await engine.generate("leads_by_source", DAY, DAY)).cached
+
+
+async def test_update_moving_a_document_marks_both_days(db):
+    moved = lead("1", "ads")
+    moved["created_at"] += timedelta(days=1)
+    await _mark_report_days(db, "leads", {
+        "operationType": "update", "fullDocumentBeforeChange": lead("1", "ads"), "fullDocument": moved,
+    })
+    assert sorted(await db.report_data_versions.distinct("day")) == ["2024-03-04", "2024-03-05"]
+
+
+async def test_only_changed_days_are_reaggregated(db):
+    engine = ReportEngine(db, TENANT)
+    start = DAY - timedelta(days=2)
+    await engine.generate("leads_by_source", start, DAY)
+    partial = await db.report_partials.find_one({"report": "leads_by_source", "day": "2024-03-02"})
+
+    await db.leads.insert_one(lead("2", "ads", hours=11))
+    await mark_data_changed(db, TENANT, "leads", DAY_START)
+    result = await engine.generate("leads_by_source", start, DAY)
+    assert result.rows == [{"key": "ads", "leads": 2}]
+    # The untouched day kept its partial
+    assert await db.report_partials.find_one({"report": "leads_by_source", "day": "2024-03-02"}) == partial
+
+
+async def test_other_tenants_data_does_not_invalidate(db):
+    engine = ReportEngine(db, TENANT)
+    await engine.generate("leads_by_source", DAY, DAY)
+    other = lead("9", "ads")
+    other["tenant_id"] = "tenant-b"
+    await db.leads.insert_one(other)
+    await mark_data_changed(db, "tenant-b", "leads", DAY_START)
+    assert (await engine.generate("leads_by_source", DAY, DAY)).cached
+
+
+async def test_unused_cache_entries_and_partials_expire(db, monkeypatch):
+    monkeypatch.setattr("storage.memory.TTL_SWEEP_SECONDS", 0)
+    await ReportEngine.ensure_indexes(db)
+    engine = ReportEngine(db, TENANT)
+    await engine.generate("leads_by_source", DAY, DAY)
+    await engine.generate("spend", DAY, DAY, count_view=False)
+    assert await db.report_cache.count_documents({}) == 2
+
+    old = datetime.utcnow() - timedelta(seconds=reports_module.REPORT_CACHE_RETENTION_SECONDS + 60)
+    await db.report_cache.update_many({"report": "spend"}, {"$set": {"last_viewed_at": old}})
+    await db.report_partials.update_many({"report": "spend"}, {"$set": {"refreshed_at": old}})
+    assert await db.report_cache.distinct("report") == ["leads_by_source"]
+    assert await db.report_partials.distinct("report") == ["leads_by_source"]
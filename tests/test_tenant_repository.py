@@ -0,0 +1,166 @@
+import pytest
+from fastapi import HTTPException
+
+from services.tenant_repository import TENANT_KEY, TenantRepository, TenantScopeError
+from storage.memory import MemoryClient
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()["tenant_test"]
+
+
+@pytest.fixture
+def repo(db):
+    return TenantRepository(db, "leads", "tenant-a")
+
+
+class RecordingCollection:
+    """Captures the pipeline handed to aggregate()"""
+
+    def __init__(self):
+        self.pipeline = None
+
+    def aggregate(self, pipeline, **kwargs):
+        self.pipeline = pipeline
+        return pipeline
+
+
+def test_missing_tenant_is_forbidden(db):
+    with pytest.raises(HTTPException) as error:
+        TenantRepository(db, "leads", None)
+    assert error.value.status_code == 403
+
+
+def test_scope_error_is_a_403():
+    error = TenantScopeError("nope")
+    assert isinstance(error, HTTPException)
+    assert error.status_code == 403
+
+
+async def test_reads_only_see_own_tenant(db, repo):
+    await db.leads.insert_many([
+        {"id": "1", TENANT_KEY: "tenant-a"},
+        {"id": "2", TENANT_KEY: "tenant-b"},
+    ])
+    docs = await repo.find({}, {"_id": 0}).to_list(None)
+    assert [doc["id"] for doc in docs] == ["1"]
+    assert await repo.find_one({"id": "2"}) is None
+    assert await repo.count_documents() == 1
+
+
+async def test_foreign_tenant_in_filter_is_rejected(repo):
+    with pytest.raises(TenantScopeError):
+        await repo.find_one({TENANT_KEY: "tenant-b"})
+    with pytest.raises(TenantScopeError):
+        repo.find({TENANT_KEY: {"$in": ["tenant-a", "tenant-b"]}})
+    with pytest.raises(TenantScopeError):
+        await repo.delete_many({TENANT_KEY: "tenant-b"})
+    with pytest.raises(TenantScopeError):
+        await repo.insert_one({"id": "3", TENANT_KEY: "tenant-b"})
+
+
+async def test_inserts_are_stamped_with_tenant(db, repo):
+    await repo.insert_one({"id": "1"})
+    assert (await db.leads.find_one({"id": "1"}))[TENANT_KEY] == "tenant-a"
+
+
+@pytest.mark.parametrize("update", [
+    {"$set": {TENANT_KEY: "tenant-b"}},
+    {"$setOnInsert": {TENANT_KEY: "tenant-b"}},
+    {"$unset": {TENANT_KEY: ""}},
+    {"$unset": {TENANT_KEY: "tenant-a"}},
+    {"$rename": {TENANT_KEY: "former_tenant"}},
+    {"$rename": {"owner": TENANT_KEY}},
+    {"$inc": {TENANT_KEY: 1}},
+])
+async def test_updates_may_not_change_tenant(db, repo, update):
+    await db.leads.insert_one({"id": "1", TENANT_KEY: "tenant-a", "owner": "tenant-b"})
+    with pytest.raises(TenantScopeError):
+        await repo.update_one({"id": "1"}, update)
+    with pytest.raises(TenantScopeError):
+        await repo.update_many({}, update)
+    with pytest.raises(TenantScopeError):
+        await repo.find_one_and_update({"id": "1"}, update)
+    assert (await db.leads.find_one({"id": "1"}))[TENANT_KEY] == "tenant-a"
+
+
+async def test_setting_own_tenant_is_allowed(db, repo):
+    await db.leads.insert_one({"id": "1", TENANT_KEY: "tenant-a"})
+    result = await repo.update_one({"id": "1"}, {"$set": {TENANT_KEY: "tenant-a", "status": "won"}})
+    assert result.modified_count == 1
+
+
+async def test_pipeline_updates_are_rejected(db, repo):
+    await db.leads.insert_one({"id": "1", TENANT_KEY: "tenant-a", "owner": "tenant-b"})
+    with pytest.raises(TenantScopeError):
+        await repo.update_one({"id": "1"}, [{"$set": {TENANT_KEY: "$owner"}}])
+
+
+async def test_upsert_lands_in_own_tenant(db, repo):
+    await repo.update_one({"id": "new"}, {"$set": {"status": "open"}}, upsert=True)
+    doc = await db.leads.find_one({"id": "new"})
+    assert doc[TENANT_KEY] == "tenant-a"
+    assert doc["status"] == "open"
+    with pytest.raises(TenantScopeError):
+        await repo.update_one({"id": "other", TENANT_KEY: "tenant-b"}, {"$set": {"status": "open"}}, upsert=True)
+    assert await db.leads.count_documents({TENANT_KEY: "tenant-b"}) == 0
+
+
+def test_aggregate_without_match_gets_tenant_match():
+    recorder = RecordingCollection()
+    repo = TenantRepository({"leads": recorder}, "leads", "tenant-a")
+    repo.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}])
+    assert recorder.pipeline[0] == {"$match": {TENANT_KEY: "tenant-a"}}
+    assert recorder.pipeline[1] == {"$group": {"_id": "$status", "n": {"$sum": 1}}}
+
+
+def test_aggregate_leading_match_is_scoped():
+    recorder = RecordingCollection()
+    repo = TenantRepository({"leads": recorder}, "leads", "tenant-a")
+    repo.aggregate([{"$match": {"status": "open"}}])
+    assert recorder.pipeline == [{"$match": {"status": "open", TENANT_KEY: "tenant-a"}}]
+    with pytest.raises(TenantScopeError):
+        repo.aggregate([{"$match": {TENANT_KEY: "tenant-b"}}])
+
+
+@pytest.mark.parametrize("stage", [
+    {"$lookup": {"from": "users", "localField": "owner", "foreignField": "id", "as": "owner"}},
+    {"$unionWith": "leads"},
+    {"$graphLookup": {
+        "from": "leads", "startWith": "$id", "connectFromField": "id", "connectToField": "parent", "as": "tree",
+    }},
+    {"$facet": {"owners": [{"$lookup": {"from": "users", "localField": "owner", "foreignField": "id", "as": "o"}}]}},
+    {"$facet": {"all": [{"$unionWith": "leads"}], "count": [{"$count": "n"}]}},
+    {"$out": "stolen"},
+    {"$merge": {"into": "users"}},
+    {"$replaceWith": "$owner"},
+    {"$match": {}, "$out": "stolen"},
+])
+def test_aggregate_rejects_stages_outside_the_allowlist(stage):
+    recorder = RecordingCollection()
+    repo = TenantRepository({"leads": recorder}, "leads", "tenant-a")
+    with pytest.raises(TenantScopeError):
+        repo.aggregate([{"$match": {}}, stage])
+    with pytest.raises(TenantScopeError):
+        repo.aggregate([stage])
+    assert recorder.pipeline is None
+
+
+def test_aggregate_allows_transforming_stages_and_facets():
+    recorder = RecordingCollection()
+    repo = TenantRepository({"leads": recorder}, "leads", "tenant-a")
+    pipeline = [
+        {"$addFields": {"day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}}},
+        {"$unwind": "$tags"},
+        {"$facet": {
+            "by_tag": [{"$group": {"_id": "$tags", "n": {"$sum": 1}}}, {"$sort": {"n": -1}}, {"$limit": 5}],
+            "total": [{"$count": "n"}],
+        }},
+        {"$project": {"by_tag": 1, "total": 1}},
+        {"$skip": 0},
+    ]
+    repo.aggregate(pipeline)
+    assert recorder.pipeline[1:] == pipeline
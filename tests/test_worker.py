@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import worker as worker_module
+from models.job import JobStatus
+from services.job_queue import JOB_RETENTION_SECONDS, RETRY_BASE_SECONDS, JobQueue, job_handler
+from storage.memory import MemoryClient
+from worker import Worker
+
+pytestmark = pytest.mark.anyio
+
+handler_state = {}
+
+
+@job_handler("test.slow")
+async def slow_handler(db, payload):
+    handler_state["started"] = True
+    try:
+        await asyncio.sleep(30)
+    except asyncio.CancelledError:
+        handler_state["cancelled"] = True
+        raise
+    handler_state["finished"] = True
+
+
+@job_handler("test.flaky")
+async def flaky_handler(db, payload):
+    handler_state["calls"] = handler_state.get("calls", 0) + 1
+    raise ValueError("upstream unavailable")
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()["worker_test"]
+
+
+async def test_finished_jobs_expire_by_ttl_index(db):
+    queue = JobQueue(db)
+    await queue.ensure_indexes()
+    index = db.jobs._indexes["finished_ttl"]
+    assert index.fields == ["finished_at"]
+    assert index.expire_after == JOB_RETENTION_SECONDS
+
+
+async def test_handler_is_cancelled_when_lease_is_lost(db, monkeypatch):
+    monkeypatch.setattr(worker_module, "VISIBILITY_TIMEOUT_SECONDS", 0.15)
+    handler_state.clear()
+    queue = JobQueue(db)
+    await queue.enqueue("test.slow")
+    worker = Worker(db, concurrency=1, processes=0, poll_interval=0.01, job_types=["test.slow"])
+    job = await queue.lease(worker.worker_id, ["test.slow"])
+
+    run = asyncio.create_task(worker.run_job(job))
+    await asyncio.sleep(0.02)
+    # Another worker takes the job over after our lease expired
+    await db.jobs.update_one({"id": job.id}, {"$set": {"locked_by": "other-worker"}})
+    await asyncio.wait_for(run, timeout=2)
+
+    assert handler_state == {"started": True, "cancelled": True}
+    doc = await db.jobs.find_one({"id": job.id})
+    assert doc["status"] == JobStatus.RUNNING
+    assert doc["locked_by"] == "other-worker"
+
+
+async def test_worker_shutdown_still_propagates(db):
+    handler_state.clear()
+    queue = JobQueue(db)
+    await queue.enqueue("test.slow")
+    worker = Worker(db, concurrency=1, processes=0, poll_interval=0.01, job_types=["test.slow"])
+    job = await queue.lease(worker.worker_id, ["test.slow"])
+
+    run = asyncio.create_task(worker.run_job(job))
+    await asyncio.sleep(0.02)
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+    assert handler_state.get("cancelled")
+
+
+async def test_lease_takes_highest_priority_then_oldest(db):
+    queue = JobQueue(db)
+    low = await queue.enqueue("test.slow", priority=0)
+    high = await queue.enqueue("test.slow", priority=10)
+    await queue.enqueue("test.slow", priority=20, delay=60)
+    mid_old = await queue.enqueue("test.slow", priority=5)
+    mid_new = await queue.enqueue("test.slow", priority=5)
+    await db.jobs.update_one({"id": mid_old.id}, {"$set": {"run_at": datetime.utcnow() - timedelta(minutes=1)}})
+
+    leased = [(await queue.lease("w1")).id for _ in range(4)]
+    assert leased == [high.id, mid_old.id, mid_new.id, low.id]
+    # The delayed job is not ready yet
+    assert await queue.lease("w1") is None
+
+
+async def test_failed_attempt_is_retried_with_backoff(db):
+    handler_state.clear()
+    queue = JobQueue(db)
+    await queue.enqueue("test.flaky", max_attempts=3)
+    worker = Worker(db, concurrency=1, processes=0, poll_interval=0.01, job_types=["test.flaky"])
+    job = await queue.lease(worker.worker_id)
+    await worker.run_job(job)
+
+    doc = await db.jobs.find_one({"id": job.id})
+    assert doc["status"] == JobStatus.QUEUED
+    assert doc["attempts"] == 1
+    assert doc["locked_by"] is None
+    assert doc["last_error"] == "ValueError: upstream unavailable"
+    delay = (doc["run_at"] - datetime.utcnow()).total_seconds()
+    assert RETRY_BASE_SECONDS / 2 - 1 < delay <= RETRY_BASE_SECONDS
+    assert await queue.lease(worker.worker_id) is None
+
+
+async def test_job_fails_once_attempts_run_out(db):
+    handler_state.clear()
+    queue = JobQueue(db)
+    await queue.enqueue("test.flaky", max_attempts=2)
+    worker = Worker(db, concurrency=1, processes=0, poll_interval=0.01, job_types=["test.flaky"])
+    for attempt in (1, 2):
+        # Skip the backoff
+        await db.jobs.update_many({}, {"$set": {"run_at": datetime.utcnow()}})
+        job = await queue.lease(worker.worker_id)
+        assert job.attempts == attempt
+        await worker.run_job(job)
+
+    doc = await db.jobs.find_one({"id": job.id})
+    assert doc["status"] == JobStatus.FAILED
+    assert doc["finished_at"] is not None
+    assert handler_state["calls"] == 2
+    await db.jobs.update_many({}, {"$set": {"run_at": datetime.utcnow()}})
+    assert await queue.lease(worker.worker_id) is None
+
+
+async def test_expired_lease_is_recovered_by_another_worker(db):
+    queue = JobQueue(db)
+    queued = await queue.enqueue("test.slow")
+    crashed = await queue.lease("crashed-worker", visibility_timeout=0.05)
+    assert await queue.lease("w2") is None
+    await asyncio.sleep(0.1)
+
+    job = await queue.lease("w2")
+    assert job.id == queued.id
+    assert job.attempts == 2
+    assert job.locked_by == "w2"
+    # The original holder can no longer finish it
+    assert not await queue.complete(crashed, "crashed-worker")
+    assert await queue.complete(job, "w2")
+
+
+async def test_recovered_job_without_attempts_left_fails_without_running(db):
+    handler_state.clear()
+    queue = JobQueue(db)
+    await queue.enqueue("test.flaky", max_attempts=1)
+    await queue.lease("crashed-worker", visibility_timeout=0.05)
+    await asyncio.sleep(0.1)
+    worker = Worker(db, concurrency=1, processes=0, poll_interval=0.01, job_types=["test.flaky"])
+    job = await queue.lease(worker.worker_id)
+    await worker.run_job(job)
+
+    doc = await db.jobs.find_one({"id": job.id})
+    assert doc["status"] == JobStatus.FAILED
+    assert doc["last_error"] == "Worker lost the job"
+    assert "calls" not in handler_state